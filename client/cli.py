@@ -94,6 +94,33 @@ def parse_args() -> argparse.Namespace:
         default=3,
         help="Maximum number of retry attempts"
     )
+    parser.add_argument(
+        "--max-concurrency",
+        "-j",
+        type=int,
+        default=4,
+        help="Maximum number of files whose changes are applied concurrently"
+    )
+    parser.add_argument(
+        "--requests-per-minute",
+        "--rpm",
+        type=float,
+        default=0,
+        help="Maximum number of model requests per minute, shared by all concurrent requests (0 means unlimited)"
+    )
+    parser.add_argument(
+        "--file-select-top-k",
+        type=int,
+        default=150,
+        help="Number of candidate files pre-ranked locally with BM25 and sent to the model for file selection (0 sends all files)"
+    )
+    parser.add_argument(
+        "--edit-format",
+        type=str,
+        choices=["diff", "search_replace"],
+        default="diff",
+        help="Format the model uses to describe code changes: unified diff or SEARCH/REPLACE blocks"
+    )
     parser.add_argument(
         "--default-branch", 
         "--branch",
@@ -194,6 +221,10 @@ def build_config_from_args(args: argparse.Namespace) -> Dict[str, Any]:
         "core_template": core_temperature,  # Note: using template to match original param name
         "data_template": data_temperature,  # Note: using template to match original param name
         "max_retry": args.max_retry, 
+        "max_concurrency": args.max_concurrency,
+        "edit_format": args.edit_format,
+        "requests_per_minute": args.requests_per_minute,
+        "file_select_top_k": args.file_select_top_k,
         "default_branch": args.base_branch,
         "mode": args.mode
     }
@@ -22,6 +22,11 @@ def init_file_memory(
     base_url: Optional[str] = None,
     remote_url: Optional[str] = None,
     auth_token: Optional[str] = None,
+    workers: int = 4,
+    requests_per_minute: float = 0,
+    deep: bool = False,
+    use_cache: bool = True,
+    use_tiktoken: bool = False,
 ) -> FileMemory:
     """
     Initialize a FileMemory instance with GitManager (no LogManager).
@@ -34,6 +39,11 @@ def init_file_memory(
         base_url: Base URL for AI service (will use default if None)
         remote_url: Git remote URL (will use env var if None)
         auth_token: Git authentication token (will use env var if None)
+        workers: Number of description batches generated concurrently
+        requests_per_minute: Maximum model requests per minute (0 means unlimited)
+        deep: Describe every file with the model instead of using static descriptions first
+        use_cache: Reuse descriptions of identical file contents from the user-level cache
+        use_tiktoken: Count tokens with tiktoken when packing batches (requires the tiktoken extra)
         
     Returns:
         Initialized FileMemory instance
@@ -46,7 +56,8 @@ def init_file_memory(
         model_name=model_name,
         temperature=temperature,
         api_key=api_key,
-        base_url=base_url
+        base_url=base_url,
+        requests_per_minute=requests_per_minute
     )
     
     # Create Git config
@@ -64,7 +75,11 @@ def init_file_memory(
         project_dir=project_dir,
         git_manager=git_manager,
         ai_config=ai_config,
-        log_manager=None  # Explicitly None as per requirements
+        log_manager=None,  # Explicitly None as per requirements
+        workers=workers,
+        deep=deep,
+        use_cache=use_cache,
+        use_tiktoken=use_tiktoken
     )
     
     return FileMemory(config=file_memory_config)
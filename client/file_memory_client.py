@@ -33,6 +33,11 @@ def initialize_file_memory(
     base_url: Optional[str] = None,
     remote_url: Optional[str] = None,
     auth_token: Optional[str] = None,
+    workers: int = 4,
+    requests_per_minute: float = 0,
+    deep: bool = False,
+    use_cache: bool = True,
+    use_tiktoken: bool = False,
 ) -> FileMemory:
     """
     Initialize FileMemory using GitManager without LogManager.
@@ -45,6 +50,11 @@ def initialize_file_memory(
         base_url: Base URL for AI service (will use default if None)
         remote_url: Git remote URL (will use env var if None)
         auth_token: Git authentication token (will use env var if None)
+        workers: Number of description batches generated concurrently
+        requests_per_minute: Maximum model requests per minute (0 means unlimited)
+        deep: Describe every file with the model instead of using static descriptions first
+        use_cache: Reuse descriptions of identical file contents from the user-level cache
+        use_tiktoken: Count tokens with tiktoken when packing batches (requires the tiktoken extra)
         
     Returns:
         Initialized FileMemory instance
@@ -54,7 +64,8 @@ def initialize_file_memory(
         model_name=model_name,
         temperature=temperature,
         api_key=api_key,
-        base_url=base_url
+        base_url=base_url,
+        requests_per_minute=requests_per_minute
     )
     
     # Create Git config
@@ -73,7 +84,11 @@ def initialize_file_memory(
         project_dir=project_dir,
         git_manager=git_manager,
         ai_config=ai_config,
-        log_manager=None  # Explicitly set to None as per requirements
+        log_manager=None,  # Explicitly set to None as per requirements
+        workers=workers,
+        deep=deep,
+        use_cache=use_cache,
+        use_tiktoken=use_tiktoken
     )
     
     return FileMemory(config=file_memory_config)
@@ -122,6 +137,11 @@ def main() -> None:
     parser.add_argument("--git-token", help="Git auth token (defaults to GITHUB_TOKEN env var)")
     parser.add_argument("-l", "--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default="INFO", help="Logging level")
     parser.add_argument("--failed-only", action="store_true", help="Process only previously failed files")
+    parser.add_argument("--rpm", "--requests-per-minute", dest="requests_per_minute", type=float, default=0, help="Maximum model requests per minute (default: 0, unlimited)")
+    parser.add_argument("-j", "--jobs", type=int, default=4, help="Number of description batches generated concurrently (default: 4)")
+    parser.add_argument("--deep", action="store_true", help="Describe every file with the model, replacing static descriptions")
+    parser.add_argument("--no-cache", action="store_true", help="Do not use the user-level description cache (~/.cache/bella-issues-bot/descriptions)")
+    parser.add_argument("--tiktoken", action="store_true", help="Count tokens with tiktoken when packing batches (requires the tiktoken extra)")
     parser.add_argument("-md", "--mode", default="client", help="Project directory path (default: current directory)")
     args = parser.parse_args()
     
@@ -150,7 +170,12 @@ def main() -> None:
             api_key=args.api_key,
             base_url=args.base_url,
             remote_url=args.git_url,
-            auth_token=args.git_token
+            auth_token=args.git_token,
+            workers=args.jobs,
+            requests_per_minute=args.requests_per_minute,
+            deep=args.deep,
+            use_cache=not args.no_cache,
+            use_tiktoken=args.tiktoken
         )
 
 
@@ -162,7 +187,7 @@ def main() -> None:
             update_file_descriptions(file_memory)
             logger.info("Updated descriptions files")
         if args.mode == "bot":
-            file_memory.git_manager.commit("Update file memory [skip memory]", add_all=False, files=[".eng/memory/file_details.txt", ".eng/memory/git_id"])
+            file_memory.git_manager.commit("Update file memory [skip memory]", add_all=False, files=[".eng/memory/file_details.txt", ".eng/memory/file_hashes.json", ".eng/memory/git_id"])
             file_memory.git_manager.pull()
             file_memory.git_manager.push()
             file_memory.git_manager.delete_local_repository()
@@ -22,6 +22,10 @@ def run_workflow(
     core_temperature: float = 0.7,
     data_temperature: float = 0.7,
     max_retry: int = 3,
+    max_concurrency: int = 4,
+    edit_format: str = "diff",
+    requests_per_minute: float = 0,
+    file_select_top_k: int = 150,
     default_branch: str = "main",
     mode: str = "client",
     base_url: Optional[str] = None,
@@ -59,7 +63,9 @@ def run_workflow(
         core_template=core_temperature, data_template=data_temperature,
         max_retry=max_retry, default_branch=default_branch, mode=mode, 
         base_url=base_url, api_key=api_key, github_remote_url=github_remote_url,
-        github_token=github_token
+        github_token=github_token, max_concurrency=max_concurrency,
+        edit_format=edit_format, requests_per_minute=requests_per_minute,
+        file_select_top_k=file_select_top_k
     )
     
     # Run the workflow engine
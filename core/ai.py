@@ -1,5 +1,7 @@
+import threading
+
 from dataclasses import dataclass
-from typing import Any, List, Optional
+from typing import Any, Callable, List, Optional
 
 from dotenv import load_dotenv
 from langchain.agents import AgentExecutor, create_openai_tools_agent
@@ -10,6 +12,7 @@ from langchain_core.tools import BaseTool, Tool
 from langchain_openai import ChatOpenAI
 
 from core.log_config import get_logger
+from core.rate_limiter import get_rate_limiter
 
 logger = get_logger(__name__)
 
@@ -19,11 +22,13 @@ class AIConfig:
     model_name: str = "gpt-4o"
     temperature: float = 0.7
     verbose: bool = True
-    max_retries: int = 3
+    max_retries: int = 3  # 可重试错误的最大重试次数，由进程共享的重试策略执行
     request_timeout: int = 180
     sys_prompt: str = "You are a helpful AI assistant."
     base_url: Optional[str] = None
     api_key: Optional[str] = None
+    max_concurrency: int = 1  # 使用该配置时允许同时发出的请求数，默认逐个处理
+    requests_per_minute: float = 0  # 同一模型服务每分钟最多发出的请求数，进程内共享，0 表示不限制
 
 
 class AIAssistant:
@@ -39,8 +44,14 @@ class AIAssistant:
         """
         self.config = config
         self.tools = tools or []
+        # 同一模型服务的所有 AIAssistant 共享限流器和重试策略
+        self.rate_limiter = get_rate_limiter(
+            self.config.base_url, self.config.api_key, self.config.requests_per_minute
+        )
         self.llm = self._init_llm()
         self.agent = None
+        # 多个线程共享同一个 AIAssistant 时，保护代理的创建和替换
+        self._agent_lock = threading.Lock()
 
         # Initialize agent if tools are provided
         if self.tools:
@@ -56,7 +67,9 @@ class AIAssistant:
             model=self.config.model_name,
             temperature=self.config.temperature,
             timeout=self.config.request_timeout,
-            max_retries=self.config.max_retries,
+            # 重试由共享的 RateLimiter 负责，避免与客户端自带的重试叠加
+            max_retries=0,
+            rate_limiter=self.rate_limiter.bucket,
             callbacks=callbacks,
         )
 
@@ -114,10 +127,20 @@ class AIAssistant:
         self.tools.append(tool)
         
         # 重新初始化代理
-        self.agent = self._init_agent()
+        with self._agent_lock:
+            self.agent = self._init_agent()
+
+    def ensure_agent(self) -> Optional[AgentExecutor]:
+        """创建代理（如果还没有创建），在多个线程使用同一个助手之前调用，没有工具时返回 None"""
+        if self.agent is None and self.tools:
+            with self._agent_lock:
+                if self.agent is None:
+                    self.agent = self._init_agent()
+        return self.agent
 
     def generate_response(
-        self, prompt: str, use_tools: bool = False, **kwargs: Any
+        self, prompt: str, use_tools: bool = False,
+        on_chunk: Optional[Callable[[str], None]] = None, **kwargs: Any
     ) -> Any:
         """
         生成响应
@@ -125,6 +148,7 @@ class AIAssistant:
         Args:
             prompt: 用户的提示词
             use_tools: 是否使用工具
+            on_chunk: 流式输出时每收到一个片段调用一次，使用工具时不生效
             **kwargs: 其他参数
 
         Returns:
@@ -133,23 +157,30 @@ class AIAssistant:
         try:
             if use_tools and self.tools:
                 # 确保代理已初始化
-                if self.agent is None:
-                    self.agent = self._init_agent()
-                    
+                agent = self.ensure_agent()
+
                 # 使用代理生成响应
-                response = self.agent.invoke({"input": prompt})
+                response = self.rate_limiter.call(
+                    lambda: agent.invoke({"input": prompt}), self.config.max_retries
+                )
                 return response["output"]
             else:
                 # 使用简单链生成响应，始终使用流式输出
                 chain = self._create_simple_chain()
-                
-                # 使用流式输出
                 response_chunks = []
-                for chunk in chain.stream({"input": prompt}):
-                    response_chunks.append(chunk)
-                
-                # response_chunks 连接起来就是完整的响应结果
-                return "".join(response_chunks)
+
+                def stream() -> str:
+                    for chunk in chain.stream({"input": prompt}):
+                        response_chunks.append(chunk)
+                        if on_chunk is not None:
+                            on_chunk(chunk)
+                    # response_chunks 连接起来就是完整的响应结果
+                    return "".join(response_chunks)
+
+                # 已经输出过片段时不能重试，否则 on_chunk 会收到重复的内容
+                return self.rate_limiter.call(
+                    stream, self.config.max_retries, retry_if=lambda e: not response_chunks
+                )
         except Exception as e:
             logger.error(f"生成响应时出错: {str(e)}")
             raise
@@ -0,0 +1,68 @@
+"""
+批次装箱模块
+
+将若干带有 token 开销的条目装入容量为 token 预算的批次，使用首次适应递减（first-fit decreasing）：
+先按开销从大到小排序，再把每个条目放入第一个放得下的批次。与按到达顺序贪心切分相比，
+小文件会填进大文件留下的空隙，批次数更少、每批更满。
+"""
+
+from dataclasses import dataclass, field
+from typing import Callable, Generic, List, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class Batch(Generic[T]):
+    """一个批次及其 token 开销"""
+    items: List[T] = field(default_factory=list)
+    tokens: int = 0
+
+
+@dataclass
+class PackResult(Generic[T]):
+    """装箱结果"""
+    batches: List[Batch[T]]
+    budget: int
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(batch.tokens for batch in self.batches)
+
+    @property
+    def fill_ratio(self) -> float:
+        """平均填充率：已用 token 占全部批次容量的比例，超出预算的单个条目按满批计算"""
+        if not self.batches:
+            return 0.0
+        used = sum(min(batch.tokens, self.budget) for batch in self.batches)
+        return used / (len(self.batches) * self.budget)
+
+
+def pack_first_fit_decreasing(items: Sequence[T], cost: Callable[[T], int], budget: int,
+                              max_items: int = 0) -> PackResult[T]:
+    """
+    按首次适应递减装箱
+
+    开销超过预算的条目单独成为一个批次，由调用方决定如何处理。
+
+    Args:
+        items: 待装箱的条目
+        cost: 计算条目 token 开销的函数
+        budget: 每个批次的 token 预算
+        max_items: 每个批次的最大条目数，0 表示不限制
+
+    Returns:
+        PackResult: 装箱结果，批次按创建顺序排列
+    """
+    costed = sorted(((cost(item), index, item) for index, item in enumerate(items)),
+                    key=lambda entry: (-entry[0], entry[1]))
+    batches: List[Batch[T]] = []
+    for tokens, _, item in costed:
+        for batch in batches:
+            if batch.tokens + tokens <= budget and (max_items <= 0 or len(batch.items) < max_items):
+                batch.items.append(item)
+                batch.tokens += tokens
+                break
+        else:
+            batches.append(Batch(items=[item], tokens=tokens))
+    return PackResult(batches=batches, budget=budget)
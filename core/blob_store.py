@@ -0,0 +1,82 @@
+"""
+内容寻址的文件内容存储
+
+以内容的 SHA-256 作为键保存文件内容，相同内容只保存一份。修改日志中只记录内容的引用，
+同一个大文件在多轮修改中被反复记录时不会重复占用磁盘，读取日志时也无需解析整份文件内容。
+"""
+
+import hashlib
+import os
+import uuid
+
+from typing import Optional
+
+from core.log_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class BlobStore:
+    """内容寻址存储，位于 .eng/memory/blobs/ 下，按哈希前两位分目录"""
+
+    BLOB_DIR = ".eng/memory/blobs"
+
+    def __init__(self, project_dir: str):
+        """
+        初始化内容存储
+
+        Args:
+            project_dir: 项目根目录
+        """
+        self.blobs_path = os.path.join(project_dir, self.BLOB_DIR)
+
+    @staticmethod
+    def hash_content(content: str) -> str:
+        """计算内容的引用（UTF-8 编码后的 SHA-256）"""
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def _path(self, ref: str) -> str:
+        return os.path.join(self.blobs_path, ref[:2], ref[2:])
+
+    def put(self, content: str) -> str:
+        """
+        保存内容，已存在相同内容时直接返回引用
+
+        Args:
+            content: 文件内容
+
+        Returns:
+            str: 内容的引用
+        """
+        ref = self.hash_content(content)
+        path = self._path(ref)
+        if os.path.exists(path):
+            return ref
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再重命名，并发写入同一内容时也不会读到不完整的文件
+        temp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(temp_path, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+        os.replace(temp_path, path)
+        return ref
+
+    def get(self, ref: str) -> Optional[str]:
+        """
+        读取内容
+
+        Args:
+            ref: 内容的引用
+
+        Returns:
+            Optional[str]: 内容，不存在时返回 None
+        """
+        path = self._path(ref)
+        if not os.path.exists(path):
+            logger.warning(f"内容存储中找不到引用: {ref}")
+            return None
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            return f.read()
+
+    def exists(self, ref: str) -> bool:
+        """内容是否已保存"""
+        return os.path.exists(self._path(ref))
@@ -0,0 +1,151 @@
+"""
+代码块扫描模块
+
+单次线性扫描模型响应，按出现顺序识别其中的 ``` 代码块，并区分类型：
+- diff: ```diff 代码块
+- file: 第一行为 "File: 路径" 或 "文件: 路径" 的完整文件内容代码块
+- code: 其他代码块
+
+支持一次性扫描完整文本，也支持流式逐段输入。Diff 和 CommentFormatter 共用该扫描器。
+"""
+
+import re
+
+from dataclasses import dataclass
+from typing import List, Optional
+
+FENCE = "```"
+FILE_HEADER_PATTERN = re.compile(r'(?:# )?(?:File|文件):\s*([^\n]+)')
+
+
+@dataclass
+class CodeBlock:
+    """扫描得到的代码块"""
+    kind: str  # "diff"、"file" 或 "code"
+    info: str  # 开始标记后的语言标识，例如 "diff"、"python"
+    body: str  # 代码块内容，不包含开始和结束标记；file 类型不包含文件头
+    start: int  # 开始标记在文本中的位置
+    body_start: int  # 内容在文本中的起始位置
+    end: int  # 结束标记之后的位置
+    file_path: Optional[str] = None  # file 类型代码块的文件路径
+
+
+class BlockScanner:
+    """
+    增量代码块扫描器
+
+    开始和结束标记都必须位于行首（允许前导空白），因此 diff 中以 +/- 开头的 ``` 行
+    不会被误认为结束标记。每个字符最多被检查常数次，整体为线性时间。
+    """
+
+    def __init__(self):
+        # 尚未处理完的文本，已完成的代码块对应的文本会被丢弃
+        self.buffer = ""
+        # buffer 第一个字符在完整文本中的位置
+        self.base = 0
+        # 下一次查找标记的起始位置（相对于 buffer）
+        self.search_from = 0
+        # 当前所在代码块的开始标记位置和内容起始位置（相对于 buffer），不在代码块中时为 None
+        self.open_start: Optional[int] = None
+        self.body_start = 0
+        self.info = ""
+
+    def feed(self, chunk: str) -> List[CodeBlock]:
+        """
+        输入一段文本
+
+        Args:
+            chunk: 新的文本片段
+
+        Returns:
+            List[CodeBlock]: 本次输入后完成的代码块
+        """
+        self.buffer += chunk
+        blocks = []
+        while True:
+            fence = self._find_fence(self.search_from)
+            if fence < 0:
+                # 末尾可能是不完整的标记，下次从这里重新查找
+                self.search_from = max(self.search_from, len(self.buffer) - len(FENCE) + 1, 0)
+                break
+            if self.open_start is None:
+                line_end = self.buffer.find("\n", fence)
+                if line_end < 0:
+                    # 开始标记所在行尚未结束
+                    self.search_from = fence
+                    break
+                self.open_start = fence
+                self.info = self.buffer[fence + len(FENCE):line_end].strip()
+                self.body_start = line_end + 1
+                self.search_from = self.body_start
+            else:
+                blocks.append(self._make_block(fence))
+                self.open_start = None
+                self.search_from = fence + len(FENCE)
+        self._compact()
+        return blocks
+
+    def _find_fence(self, position: int) -> int:
+        """从 position 开始查找位于行首的 ``` 标记，找不到时返回 -1"""
+        while True:
+            fence = self.buffer.find(FENCE, position)
+            if fence < 0:
+                return -1
+            line_start = self.buffer.rfind("\n", 0, fence) + 1
+            if not self.buffer[line_start:fence].strip():
+                return fence
+            position = fence + len(FENCE)
+
+    def _make_block(self, close: int) -> CodeBlock:
+        """根据结束标记位置生成代码块"""
+        line_start = self.buffer.rfind("\n", 0, close) + 1
+        body_start = self.body_start
+        body = self.buffer[body_start:max(line_start, body_start)]
+        kind = "code"
+        file_path = None
+        if self.info.split()[:1] == ["diff"]:
+            kind = "diff"
+        else:
+            first_line_end = body.find("\n")
+            match = FILE_HEADER_PATTERN.fullmatch(body[:first_line_end]) if first_line_end >= 0 else None
+            if match:
+                kind = "file"
+                file_path = match.group(1).strip()
+                body = body[first_line_end + 1:]
+                body_start += first_line_end + 1
+        return CodeBlock(
+            kind=kind,
+            info=self.info,
+            body=body,
+            start=self.base + self.open_start,
+            body_start=self.base + body_start,
+            end=self.base + close + len(FENCE),
+            file_path=file_path,
+        )
+
+    def _compact(self) -> None:
+        """丢弃已经处理完的文本，避免流式输入时缓冲区无限增长"""
+        keep_from = self.open_start if self.open_start is not None else self.search_from
+        # 保留当前行，行首判断需要用到
+        keep_from = self.buffer.rfind("\n", 0, keep_from) + 1
+        if keep_from <= 0:
+            return
+        self.buffer = self.buffer[keep_from:]
+        self.base += keep_from
+        self.search_from -= keep_from
+        if self.open_start is not None:
+            self.open_start -= keep_from
+            self.body_start -= keep_from
+
+
+def scan_blocks(text: str) -> List[CodeBlock]:
+    """
+    扫描完整文本中的所有代码块，未闭合的代码块会被忽略
+
+    Args:
+        text: 要扫描的文本
+
+    Returns:
+        List[CodeBlock]: 按出现顺序排列的代码块
+    """
+    return BlockScanner().feed(text)
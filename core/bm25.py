@@ -0,0 +1,75 @@
+"""
+BM25 文本检索
+
+为文件路径和文件描述分词并计算 BM25 相关性得分，DescriptionStore 用它维护倒排索引，
+FileSelector 用它在请求模型之前预先筛选与需求相关的文件。
+
+分词规则：
+- 英文和数字按标识符拆分，驼峰和下划线命名会拆成单词，并保留完整的标识符，统一转为小写
+- 中文没有空格分隔，连续的汉字按相邻两个字（bigram）切分，单个汉字单独作为一个词
+"""
+
+import math
+import re
+
+from collections import Counter
+from typing import List
+
+# BM25 参数
+K1 = 1.2
+B = 0.75
+# 路径中的词在文档中重复的次数，文件名与需求匹配时比描述中的匹配更可信
+PATH_WEIGHT = 2
+
+_TOKEN_PATTERN = re.compile(r"[A-Za-z0-9]+|[\u3400-\u4dbf\u4e00-\u9fff]+")
+_IDENTIFIER_PART_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+_STOP_WORDS = {"a", "an", "and", "the", "of", "to", "in", "is", "for", "on", "with", "be", "or", "as", "by", "it"}
+
+
+def _is_cjk(text: str) -> bool:
+    return text[0] >= "\u3400"
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    分词
+
+    Args:
+        text: 文件路径、描述或需求
+
+    Returns:
+        List[str]: 词列表，保留重复的词用于统计词频
+    """
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(text):
+        word = match.group()
+        if _is_cjk(word):
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+            continue
+        parts = [part.lower() for part in _IDENTIFIER_PART_PATTERN.findall(word)]
+        if len(parts) > 1:
+            tokens.append(word.lower())
+        tokens.extend(part for part in parts if len(part) > 1 and part not in _STOP_WORDS)
+    return tokens
+
+
+def document_terms(path: str, description: str) -> Counter:
+    """文件的词频，路径中的词按 PATH_WEIGHT 加权"""
+    terms = Counter(tokenize(description))
+    for term in tokenize(path):
+        terms[term] += PATH_WEIGHT
+    return terms
+
+
+def idf(document_frequency: int, document_count: int) -> float:
+    """逆文档频率，使用 Lucene 的形式，出现在大多数文档中的词得分接近 0 而不会为负"""
+    return math.log(1 + (document_count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+
+def term_score(term_frequency: int, document_length: int, average_length: float, term_idf: float) -> float:
+    """单个词对文档的 BM25 得分"""
+    norm = K1 * (1 - B + B * document_length / average_length) if average_length else K1
+    return term_idf * term_frequency * (K1 + 1) / (term_frequency + norm)
@@ -7,6 +7,7 @@ from typing_extensions import Optional
 
 from core.ai import AIAssistant, AIConfig
 from core.diff import Diff
+from core.edit_blocks import parse_edit_blocks
 from core.log_manager import LogManager, LogConfig
 from core.log_config import get_logger
 
@@ -19,11 +20,41 @@ class CodeEngineerConfig:
     ai_config: AIConfig
     system_prompt: Optional[str] = None
     max_retries: int = 3
+    edit_format: str = "diff"  # 模型输出修改的格式: "diff" 为 unified diff，"search_replace" 为 SEARCH/REPLACE 编辑块
 
-DEFAULT_PROMPT :str = '''
+# 与输出格式无关的角色和代码要求
+CODE_PROMPT_BASE :str = '''
 You will get instructions for code to write.
 You will write a very long answer. Make sure that every detail of the architecture is, in the end, implemented as code.
 Think step by step and reason yourself to the correct decisions to make sure we get it right.
+As far as compatible with the user request, start with the "entrypoint" file, then go to the ones that are imported by that file, and so on.
+Please note that the code should be fully functional. No placeholders.
+
+Follow a language and framework appropriate best practice file naming convention.
+Make sure that files contain all imports, types etc.  The code should be fully functional. Make sure that code in different files are compatible with each other.
+Ensure to implement all code, if you are unsure, write a plausible implementation.
+Include module dependency or package manager dependency definition file.
+Before you finish, double check that all parts of the architecture is present in the files.
+
+When you are done, write finish with "this concludes a fully working implementation".
+
+Useful to know:
+Almost always put different classes in different files.
+Always use the programming language the user asks for.
+For Python, you always create an appropriate requirements.txt file.
+For NodeJS, you always create an appropriate package.json file.
+Always add a comment briefly describing the purpose of the function definition.
+Add comments explaining very complex bits of logic.
+Always follow the best practices for the requested languages for folder/file structure and how to package the project.
+
+
+Python toolbelt preferences:
+- pytest
+- dataclasses
+'''
+
+# unified diff 格式的说明
+DIFF_FORMAT_PROMPT :str = '''
 Make changes to existing code and implement new code in the unified git diff syntax. When implementing new code, First lay out the names of the core classes, functions, methods that will be necessary, As well as a quick comment on their purpose.
 
 You will output the content of each file necessary to achieve the goal, including ALL code.
@@ -67,32 +98,65 @@ RULES:
 -EACH LINE IN THE SOURCE FILES STARTS WITH A LINE NUMBER, WHICH IS NOT PART OF THE SOURCE CODE. NEVER TRANSFER THESE LINE NUMBERS TO THE DIFF HUNKS.
 -AVOID STARTING A HUNK WITH AN EMPTY LINE.
 -ENSURE ALL CHANGES ARE PROVIDED IN A SINGLE DIFF CHUNK PER FILE TO PREVENT MULTIPLE DIFFS ON THE SAME FILE.
+'''
 
+# SEARCH/REPLACE 编辑块格式的说明
+SEARCH_REPLACE_FORMAT_PROMPT :str = '''
+Make changes to existing code and implement new code with SEARCH/REPLACE blocks. When implementing new code, First lay out the names of the core classes, functions, methods that will be necessary, As well as a quick comment on their purpose.
+
+Every SEARCH/REPLACE block uses this format:
+1. The relative path of the file, alone on a line.
+2. The opening fence and code language, eg: ```python
+3. The start of search block: <<<<<<< SEARCH
+4. A contiguous chunk of lines to search for in the existing source code
+5. The dividing line: =======
+6. The lines to replace into the source code
+7. The end of the replace block: >>>>>>> REPLACE
+8. The closing fence: ```
+
+Example of changing an existing file:
+
+example.py
+```python
+<<<<<<< SEARCH
+def greet(name):
+    print("Hello " + name)
+=======
+def greet(name):
+    print(f"Hello {name}")
+>>>>>>> REPLACE
+```
 
-As far as compatible with the user request, start with the "entrypoint" file, then go to the ones that are imported by that file, and so on.
-Please note that the code should be fully functional. No placeholders.
+Example of creating a new file, the SEARCH section is empty:
 
-Follow a language and framework appropriate best practice file naming convention.
-Make sure that files contain all imports, types etc.  The code should be fully functional. Make sure that code in different files are compatible with each other.
-Ensure to implement all code, if you are unsure, write a plausible implementation.
-Include module dependency or package manager dependency definition file.
-Before you finish, double check that all parts of the architecture is present in the files.
+new_file.txt
+```
+<<<<<<< SEARCH
+=======
+First example line
 
-When you are done, write finish with "this concludes a fully working implementation".
+Last example line
+>>>>>>> REPLACE
+```
 
-Useful to know:
-Almost always put different classes in different files.
-Always use the programming language the user asks for.
-For Python, you always create an appropriate requirements.txt file.
-For NodeJS, you always create an appropriate package.json file.
-Always add a comment briefly describing the purpose of the function definition.
-Add comments explaining very complex bits of logic.
-Always follow the best practices for the requested languages for folder/file structure and how to package the project.
+RULES:
+-A program will apply the blocks you generate exactly to the code, so blocks must be precise and unambiguous!
+-The SEARCH section must EXACTLY MATCH the existing file content, character for character, including all comments, docstrings and whitespace.
+-EACH LINE IN THE SOURCE FILES STARTS WITH A LINE NUMBER, WHICH IS NOT PART OF THE SOURCE CODE. NEVER TRANSFER THESE LINE NUMBERS TO THE BLOCKS.
+-Include enough lines in the SEARCH section to uniquely match one place in the file, but keep it small. Do not include long runs of unchanging lines.
+-Use several small SEARCH/REPLACE blocks for several changes in one file. Blocks are applied in order.
+-To move code within a file, use 2 blocks: one to delete it from its current location, one to insert it in the new location.
+-To create a new file, use a block with an empty SEARCH section containing the whole file content.
+'''
 
+EDIT_FORMAT_PROMPTS = {"diff": DIFF_FORMAT_PROMPT, "search_replace": SEARCH_REPLACE_FORMAT_PROMPT}
 
-Python toolbelt preferences:
-- pytest
-- dataclasses
+DEFAULT_PROMPT :str = CODE_PROMPT_BASE + DIFF_FORMAT_PROMPT
+SEARCH_REPLACE_PROMPT :str = CODE_PROMPT_BASE + SEARCH_REPLACE_FORMAT_PROMPT
+
+# 自定义系统提示词中的格式说明可能与所选格式不一致，追加格式说明时放在最前面
+CUSTOM_PROMPT_FORMAT_NOTICE :str = '''
+IMPORTANT: The output format described below overrides any output format instructions above.
 '''
 
 class CodeEngineer:
@@ -114,7 +178,7 @@ class CodeEngineer:
 
 
         if config.system_prompt:
-            self.system_prompt = config.system_prompt
+            self.system_prompt = self._with_edit_format(config.system_prompt)
         else:
             # 读取系统提示词
             self.system_prompt = self._read_system_prompt()
@@ -134,17 +198,34 @@ class CodeEngineer:
         Returns:
             str: 系统提示词内容
         """
+        default_prompt = SEARCH_REPLACE_PROMPT if self.config.edit_format == "search_replace" else DEFAULT_PROMPT
         try:
             system_prompt_path = os.path.join(self.config.project_dir, ".eng/system.txt")
             if os.path.exists(system_prompt_path):
                 with open(system_prompt_path, "r", encoding="utf-8") as f:
-                    return f.read()
+                    return self._with_edit_format(f.read())
             else:
                 logger.warning(f"系统提示词文件不存在: {system_prompt_path}，使用默认提示词")
-                return DEFAULT_PROMPT
+                return default_prompt
         except Exception as e:
             logger.error(f"读取系统提示词失败: {str(e)}")
-            return DEFAULT_PROMPT
+            return default_prompt
+
+    def _with_edit_format(self, system_prompt: str) -> str:
+        """
+        自定义系统提示词（.eng/system.txt 或配置中的 system_prompt）通常按 unified diff 格式编写，
+        使用其他输出格式时在末尾追加该格式的说明，否则模型仍按 diff 输出，解析时找不到编辑块
+
+        Args:
+            system_prompt: 自定义系统提示词
+
+        Returns:
+            str: 追加了格式说明的系统提示词，使用 diff 格式时原样返回
+        """
+        if self.config.edit_format == "diff":
+            return system_prompt
+        logger.warning(f"使用自定义系统提示词，并追加 {self.config.edit_format} 格式的说明")
+        return system_prompt + CUSTOM_PROMPT_FORMAT_NOTICE + EDIT_FORMAT_PROMPTS[self.config.edit_format]
 
     def process_prompt(self, prompt: str) ->  tuple[bool, Optional[str]]:
         """
@@ -165,18 +246,36 @@ class CodeEngineer:
             # 设置 AI 助手的系统提示词
             self.ai_assistant.config.sys_prompt = self.system_prompt
             
-            # 调用 AI 模型生成响应
-            response = self.ai_assistant.generate_response(prompt)
-            
-            # 解析响应中的 diff
-            diffs = Diff.parse_diffs_from_text(response)
-            
-            if not diffs:
-                logger.warning("未找到有效的 diff")
-                return (False, None)
-            
-            # 处理每个 diff
-            self.failed_files, self.diff_infos  = self.diff.process_diffs(diffs, self.config.project_dir)
+            if self.config.edit_format == "search_replace":
+                response = self.ai_assistant.generate_response(prompt)
+                # 编辑块在本地应用，响应中没有编辑块时按 diff 或完整文件内容解析
+                edit_blocks = parse_edit_blocks(response)
+                if edit_blocks:
+                    self.failed_files, self.diff_infos = self.diff.process_edit_blocks(edit_blocks, self.config.project_dir)
+                else:
+                    diffs = Diff.parse_diffs_from_text(response)
+                    if not diffs:
+                        logger.warning("未找到有效的编辑块或 diff")
+                        return (False, None)
+                    self.failed_files, self.diff_infos = self.diff.process_diffs(diffs, self.config.project_dir)
+            else:
+                with self.diff.stream_diffs(self.config.project_dir) as session:
+                    # 调用 AI 模型生成响应，生成过程中完成的 diff 会立即开始应用
+                    response = self.ai_assistant.generate_response(prompt, on_chunk=session.feed)
+
+                    if session.diff_count:
+                        # 等待已提交的 diff 处理完成
+                        self.failed_files, self.diff_infos = session.collect()
+                    else:
+                        # 响应中没有 diff 代码块时，按完整文本解析文件内容
+                        diffs = Diff.parse_diffs_from_text(response)
+
+                        if not diffs:
+                            logger.warning("未找到有效的 diff")
+                            return (False, None)
+
+                        # 处理每个 diff
+                        self.failed_files, self.diff_infos  = self.diff.process_diffs(diffs, self.config.project_dir)
             
             # 归档日志
             self.log_manager.archive_logs(
@@ -1,10 +1,13 @@
 import re
 from typing import List, Optional
 
+from core.block_scanner import scan_blocks
 from core.log_config import get_logger
 
 logger = get_logger(__name__)
 
+PATH_LINE_PATTERN = re.compile(r'(?:---|\+\+\+)\s')
+
 
 class CommentFormatter:
     """
@@ -25,29 +28,29 @@ class CommentFormatter:
         """
         logger.info(f"开始处理评论中的 diff 块，分支名称: {branch_name}")
 
-        # 提取所有 ```diff 代码块
-        pattern = r'(```diff\s+)(.*?)(```)'
-        
-        def replace_diff_block(match):
-            # 获取 diff 块的内容
-            diff_start = match.group(1)  # ```diff 开头
-            diff_content = match.group(2)  # diff 内容
-            diff_end = match.group(3)  # ``` 结尾
+        # 单次扫描提取所有 ```diff 代码块，逐段拼接替换后的评论
+        parts = []
+        position = 0
+        for block in scan_blocks(comment_text):
+            if block.kind != "diff":
+                continue
+            diff_start = comment_text[block.start:block.body_start]  # ```diff 开头
+            diff_end = comment_text[block.end - 3:block.end]  # ``` 结尾
+            parts.append(comment_text[position:block.start])
             
             # 提取文件路径信息
-            file_paths = CommentFormatter._extract_file_paths(diff_content)
+            file_paths = CommentFormatter._extract_file_paths(block.body)
             
             if file_paths:
                 # 保留文件路径信息，替换其余内容
                 file_info = "\n".join(file_paths)
-                replacement = f"{diff_start}{file_info}\n在{branch_name}分支可查看详细代码\n{diff_end}"
-                return replacement
+                parts.append(f"{diff_start}{file_info}\n在{branch_name}分支可查看详细代码\n{diff_end}")
             else:
                 # 如果没有找到文件路径信息，直接替换整个代码块
-                return f"{diff_start}在{branch_name}分支可查看详细代码\n{diff_end}"
-        
-        # 替换所有匹配的 diff 块
-        formatted_text = re.sub(pattern, replace_diff_block, comment_text, flags=re.DOTALL)
+                parts.append(f"{diff_start}在{branch_name}分支可查看详细代码\n{diff_end}")
+            position = block.end
+        parts.append(comment_text[position:])
+        formatted_text = "".join(parts)
         
         logger.info("评论中的 diff 块处理完成")
         return formatted_text
@@ -63,21 +66,18 @@ class CommentFormatter:
         Returns:
             文件路径信息列表
         """
-        file_paths = []
-        
-        # 匹配 --- 和 +++ 开头的行，这些通常包含文件路径信息
-        path_lines = re.findall(r'^(---\s+.*|\+\+\+\s+.*)', diff_content, re.MULTILINE)
-        
-        # 如果找到了文件路径行，添加到结果列表
-        if path_lines:
-            file_paths.extend(path_lines)
+        path_lines = []
+        git_diff_lines = []
         
-        # 也可能有 diff --git 格式的行
-        git_diff_lines = re.findall(r'^(diff --git .*)', diff_content, re.MULTILINE)
-        if git_diff_lines:
-            file_paths.extend(git_diff_lines)
+        for line in diff_content.splitlines():
+            # 匹配 --- 和 +++ 开头的行，这些通常包含文件路径信息
+            if PATH_LINE_PATTERN.match(line):
+                path_lines.append(line)
+            # 也可能有 diff --git 格式的行
+            elif line.startswith("diff --git "):
+                git_diff_lines.append(line)
         
-        return file_paths
+        return path_lines + git_diff_lines
 
 
 if __name__ == "__main__":
@@ -0,0 +1,125 @@
+"""
+用户级文件描述缓存
+
+bot 模式下每次运行都会克隆到新的临时目录，不同的运行和分支会重复描述内容相同的文件。
+该缓存位于用户缓存目录（默认 ~/.cache/bella-issues-bot/descriptions，遵循 XDG_CACHE_HOME），
+以 文件内容哈希 + 模型 + 提示词版本 为键保存模型生成的描述，在所有克隆之间共享。
+
+读取时更新文件的修改时间，超出大小上限时按修改时间淘汰最久未使用的条目（LRU）。
+"""
+
+import hashlib
+import os
+import uuid
+
+from typing import Dict, Optional
+
+from core.log_config import get_logger
+
+logger = get_logger(__name__)
+
+# 默认的缓存大小上限
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def default_cache_dir() -> str:
+    """默认的缓存目录"""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "bella-issues-bot", "descriptions")
+
+
+class DescriptionCache:
+    """按内容哈希、模型和提示词版本缓存文件描述，按哈希前两位分目录"""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            cache_dir: 缓存目录，None 表示使用默认目录
+            max_bytes: 缓存大小上限，超出时淘汰最久未使用的条目
+        """
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(content_hash: str, model: str, prompt_version: str) -> str:
+        """缓存键，任一部分变化都会使缓存失效"""
+        return hashlib.sha256(f"{prompt_version}\0{model}\0{content_hash}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key[2:])
+
+    def get(self, key: str) -> Optional[str]:
+        """读取描述，命中时更新最近使用时间"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                description = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return description or None
+
+    def put(self, key: str, description: str) -> None:
+        """保存描述，写入失败只记录日志"""
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先写临时文件再重命名，并发运行时不会读到不完整的描述
+            temp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(description)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"写入描述缓存失败: {str(e)}")
+
+    def get_many(self, keys: Dict[str, str]) -> Dict[str, str]:
+        """
+        批量读取
+
+        Args:
+            keys: 文件路径到缓存键的映射
+
+        Returns:
+            Dict[str, str]: 命中缓存的文件路径到描述的映射
+        """
+        descriptions = {}
+        for filepath, key in keys.items():
+            description = self.get(key)
+            if description is not None:
+                descriptions[filepath] = description
+        return descriptions
+
+    def evict(self) -> int:
+        """
+        缓存超出大小上限时，按最近使用时间删除最旧的条目，直到降到上限的 90%
+
+        Returns:
+            int: 删除的条目数
+        """
+        entries = []
+        total = 0
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        target = self.max_bytes * 0.9
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        logger.info(f"描述缓存超出上限，淘汰了 {removed} 个条目")
+        return removed
@@ -0,0 +1,370 @@
+"""
+文件描述存储模块
+
+使用 SQLite 按文件路径索引保存文件描述和生成描述时的内容哈希，支持按键查询和局部更新，
+不需要每次读取或重写全部描述。
+
+.eng/memory/file_details.txt 与 file_hashes.json 作为导出视图保留，便于在 git diff 中查看记忆的变化；
+数据库不存在或视图被外部更新（例如 git pull）时，从视图重新导入。
+数据库文件是本地缓存，创建时在所在目录的 .gitignore 中忽略，不会被 git add -A 提交。
+
+描述写入或删除时同步更新路径和描述的 BM25 倒排索引，FileSelector 通过 search 在本地预先筛选候选文件。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from core import bm25
+from core.log_config import get_logger
+
+logger = get_logger(__name__)
+
+# SQLite 单条语句的参数数量上限较低，批量查询时分段进行
+_QUERY_CHUNK_SIZE = 500
+
+# 分词规则变化时递增，打开旧索引时会重建
+SEARCH_INDEX_VERSION = "1"
+
+
+class DescriptionStore:
+    """基于 SQLite 的文件描述存储"""
+
+    def __init__(self, db_path: str):
+        """
+        打开或创建存储
+
+        Args:
+            db_path: 数据库文件路径
+        """
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self._ignore_in_git()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, description TEXT, hash TEXT, source TEXT)"
+            )
+            # 旧版本的数据库没有 source 列
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(files)")}
+            if "source" not in columns:
+                self._conn.execute("ALTER TABLE files ADD COLUMN source TEXT")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            # 源码文件的公开符号和导入，用于判断依赖文件的描述是否需要刷新
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS modules ("
+                "path TEXT PRIMARY KEY, hash TEXT, public_symbols TEXT, imports TEXT)"
+            )
+            # 路径和描述的倒排索引：词 -> (文件, 词频)，以及每个文件的词数
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS postings ("
+                "term TEXT, path TEXT, tf INTEGER, PRIMARY KEY (term, path)) WITHOUT ROWID"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS postings_path ON postings (path)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS doc_lengths (path TEXT PRIMARY KEY, length INTEGER)"
+            )
+        if self._get_meta("search_index_version") != SEARCH_INDEX_VERSION:
+            self._rebuild_search_index()
+
+    def _ignore_in_git(self) -> None:
+        """在数据库所在目录的 .gitignore 中忽略数据库文件及其日志文件"""
+        gitignore_path = os.path.join(os.path.dirname(self.db_path), ".gitignore")
+        pattern = f"{os.path.basename(self.db_path)}*"
+        try:
+            content = ""
+            if os.path.exists(gitignore_path):
+                with open(gitignore_path, "r", encoding="utf-8") as f:
+                    content = f.read()
+            if pattern in content.splitlines():
+                return
+            with open(gitignore_path, "a", encoding="utf-8") as f:
+                if content and not content.endswith("\n"):
+                    f.write("\n")
+                f.write(f"{pattern}\n")
+        except OSError as e:
+            logger.warning(f"写入 {gitignore_path} 失败: {str(e)}")
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    def get(self, path: str) -> Optional[str]:
+        """获取单个文件的描述"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT description FROM files WHERE path = ? AND description IS NOT NULL", (path,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, paths: Iterable[str]) -> Dict[str, str]:
+        """获取多个文件的描述，没有描述的文件不会出现在结果中"""
+        paths = list(dict.fromkeys(paths))
+        descriptions = {}
+        with self._lock:
+            for i in range(0, len(paths), _QUERY_CHUNK_SIZE):
+                chunk = paths[i:i + _QUERY_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT path, description FROM files "
+                    f"WHERE path IN ({placeholders}) AND description IS NOT NULL", chunk
+                )
+                descriptions.update(rows)
+        return descriptions
+
+    def get_all(self) -> Dict[str, str]:
+        """获取所有文件的描述"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, description FROM files WHERE description IS NOT NULL ORDER BY path"
+            ).fetchall()
+        return dict(rows)
+
+    def hashes(self) -> Dict[str, str]:
+        """获取所有文件生成描述时的内容哈希"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, hash FROM files WHERE hash IS NOT NULL ORDER BY path"
+            ).fetchall()
+        return dict(rows)
+
+    def paths(self) -> Set[str]:
+        """获取存储中的所有文件路径"""
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT path FROM files")}
+
+    def paths_with_source(self, source: str) -> Set[str]:
+        """获取描述来源为 source 的文件路径"""
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT path FROM files WHERE source = ?", (source,))}
+
+    def upsert_descriptions(self, descriptions: Dict[str, str], source: Optional[str] = None) -> None:
+        """
+        新增或更新文件描述，不影响其他文件
+
+        Args:
+            descriptions: 文件路径到描述的映射
+            source: 描述的来源，例如 "static" 表示静态分析生成，None 表示模型生成
+        """
+        if not descriptions:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO files (path, description, source) VALUES (?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET description = excluded.description, source = excluded.source",
+                ((path, description, source) for path, description in descriptions.items())
+            )
+            self._index_documents(descriptions)
+
+    def set_hashes(self, hashes: Dict[str, str]) -> None:
+        """新增或更新文件的内容哈希，不影响其他文件"""
+        if not hashes:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO files (path, hash) VALUES (?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET hash = excluded.hash",
+                hashes.items()
+            )
+
+    def delete(self, paths: Iterable[str]) -> None:
+        """删除文件的描述和哈希"""
+        paths = list(paths)
+        if not paths:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM files WHERE path = ?", ((path,) for path in paths))
+            self._conn.executemany("DELETE FROM modules WHERE path = ?", ((path,) for path in paths))
+            self._unindex_documents(paths)
+
+    def _unindex_documents(self, paths: Iterable[str]) -> None:
+        """从倒排索引中移除文件，调用方需持有锁并在事务中"""
+        paths = list(paths)
+        self._conn.executemany("DELETE FROM postings WHERE path = ?", ((path,) for path in paths))
+        self._conn.executemany("DELETE FROM doc_lengths WHERE path = ?", ((path,) for path in paths))
+
+    def _index_documents(self, descriptions: Dict[str, str]) -> None:
+        """更新文件在倒排索引中的词频，调用方需持有锁并在事务中"""
+        self._unindex_documents(descriptions)
+        for path, description in descriptions.items():
+            terms = bm25.document_terms(path, description or "")
+            self._conn.executemany(
+                "INSERT INTO postings (term, path, tf) VALUES (?, ?, ?)",
+                ((term, path, tf) for term, tf in terms.items())
+            )
+            self._conn.execute(
+                "INSERT INTO doc_lengths (path, length) VALUES (?, ?)", (path, sum(terms.values()))
+            )
+
+    def _rebuild_search_index(self) -> None:
+        """根据全部描述重建倒排索引"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM doc_lengths")
+            self._index_documents(dict(self._conn.execute(
+                "SELECT path, description FROM files WHERE description IS NOT NULL"
+            ).fetchall()))
+        self._set_meta("search_index_version", SEARCH_INDEX_VERSION)
+
+    def search(self, query: str, limit: int, paths: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """
+        按 BM25 得分检索与查询相关的文件
+
+        Args:
+            query: 查询文本，例如用户需求
+            limit: 返回的文件数上限
+            paths: 只在这些文件中检索，None 表示不限制
+
+        Returns:
+            List[Tuple[str, float]]: (文件路径, 得分)，按得分从高到低排列，不包含与查询没有共同词的文件
+        """
+        terms = set(bm25.tokenize(query))
+        scores: Dict[str, float] = defaultdict(float)
+        with self._lock:
+            document_count, total_length = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM doc_lengths"
+            ).fetchone()
+            if not document_count or not terms:
+                return []
+            average_length = total_length / document_count
+            for term in terms:
+                rows = self._conn.execute(
+                    "SELECT p.path, p.tf, d.length FROM postings p JOIN doc_lengths d ON d.path = p.path "
+                    "WHERE p.term = ?", (term,)
+                ).fetchall()
+                if not rows:
+                    continue
+                term_idf = bm25.idf(len(rows), document_count)
+                for path, tf, length in rows:
+                    scores[path] += bm25.term_score(tf, length, average_length, term_idf)
+        ranked = sorted(
+            ((path, score) for path, score in scores.items() if paths is None or path in paths),
+            key=lambda item: (-item[1], item[0])
+        )
+        return ranked[:limit]
+
+    def get_modules(self) -> Dict[str, Tuple[str, Set[str], Set[str]]]:
+        """获取所有文件分析时的内容哈希、公开符号和导入的模块"""
+        with self._lock:
+            rows = self._conn.execute("SELECT path, hash, public_symbols, imports FROM modules").fetchall()
+        return {
+            path: (file_hash, set(json.loads(public_symbols)), set(json.loads(imports)))
+            for path, file_hash, public_symbols, imports in rows
+        }
+
+    def set_modules(self, modules: Dict[str, Tuple[str, Set[str], Set[str]]]) -> None:
+        """新增或更新文件的分析结果，值为 (内容哈希, 公开符号, 导入的模块)"""
+        if not modules:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO modules (path, hash, public_symbols, imports) VALUES (?, ?, ?, ?)",
+                ((path, file_hash, json.dumps(sorted(public_symbols)), json.dumps(sorted(imports)))
+                 for path, (file_hash, public_symbols, imports) in modules.items())
+            )
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (key, value)
+            )
+
+    @staticmethod
+    def _views_stamp(text_path: str, hashes_path: str) -> str:
+        """根据导出视图的修改时间和大小生成标记，用于在不读取内容的情况下判断视图是否被外部修改"""
+        parts = []
+        for path in (text_path, hashes_path):
+            try:
+                stat = os.stat(path)
+                parts.append(f"{stat.st_mtime_ns}:{stat.st_size}")
+            except OSError:
+                parts.append("-")
+        return "|".join(parts)
+
+    def sync_from_views(self, text_path: str, hashes_path: str) -> None:
+        """
+        视图与上次导出时不一致（数据库刚创建，或视图被 git 等外部更新）时，从视图重新导入
+
+        Args:
+            text_path: file_details.txt 路径
+            hashes_path: file_hashes.json 路径
+        """
+        if not os.path.exists(text_path) and not os.path.exists(hashes_path):
+            return
+        stamp = self._views_stamp(text_path, hashes_path)
+        if self._get_meta("views_stamp") == stamp:
+            return
+        self.import_views(text_path, hashes_path)
+        self._set_meta("views_stamp", stamp)
+
+    def import_views(self, text_path: str, hashes_path: str) -> None:
+        """用导出视图的内容替换存储中的全部数据"""
+        descriptions = read_text_view(text_path)
+        hashes = {}
+        if os.path.exists(hashes_path):
+            try:
+                with open(hashes_path, "r", encoding="utf-8") as f:
+                    hashes = json.load(f)
+            except Exception as e:
+                logger.error(f"读取文件哈希失败: {str(e)}")
+        with self._lock, self._conn:
+            # 视图中不记录描述来源，描述没有变化的文件保留原来的来源
+            sources = {
+                path: source for path, description, source
+                in self._conn.execute("SELECT path, description, source FROM files WHERE source IS NOT NULL")
+                if descriptions.get(path) == description
+            }
+            self._conn.execute("DELETE FROM files")
+            self._conn.executemany(
+                "INSERT INTO files (path, description, hash, source) VALUES (?, ?, ?, ?)",
+                ((path, descriptions.get(path), hashes.get(path), sources.get(path))
+                 for path in set(descriptions) | set(hashes))
+            )
+            self._conn.execute("DELETE FROM postings")
+            self._conn.execute("DELETE FROM doc_lengths")
+            self._index_documents(descriptions)
+        logger.info(f"从 {text_path} 导入了 {len(descriptions)} 个文件描述")
+
+    def export_views(self, text_path: str, hashes_path: str) -> None:
+        """
+        导出 file_details.txt 和 file_hashes.json 视图
+
+        Args:
+            text_path: file_details.txt 路径
+            hashes_path: file_hashes.json 路径
+        """
+        with open(text_path, "w", encoding="utf-8") as f:
+            for path, description in self.get_all().items():
+                f.write(f"{path}:{description}\n")
+        with open(hashes_path, "w", encoding="utf-8") as f:
+            json.dump(self.hashes(), f, ensure_ascii=False, indent=0)
+        self._set_meta("views_stamp", self._views_stamp(text_path, hashes_path))
+
+
+def read_text_view(text_path: str) -> Dict[str, str]:
+    """解析 file_details.txt，每行格式为 路径:描述"""
+    details = {}
+    if not os.path.exists(text_path):
+        return details
+    with open(text_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if ":" in line:
+                filename, description = line.strip().split(":", 1)
+                details[filename] = description
+    return details
+
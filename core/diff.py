@@ -1,12 +1,21 @@
 import os
 import re
-from typing import List, Tuple
+from copy import copy
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
 
 from dotenv import load_dotenv
 from langchain_core.tools import StructuredTool
 from pydantic import BaseModel, Field
 
 from core.ai import AIAssistant, AIConfig
+from core.block_scanner import BlockScanner, scan_blocks
+from core.edit_blocks import EditBlock, apply_edit_blocks
+from core.file_index import FileIndex
+from core.file_transaction import FileTransaction
+from core.file_validator import FileValidator
+from core.hunk_applier import Hunk, HunkApplier, is_unified_diff, normalize_line, parse_hunks
 from core.log_config import get_logger
 
 logger = get_logger(__name__)
@@ -16,26 +25,56 @@ class DiffInfo(BaseModel):
     file_name: str = ""  # 文件路径
     content: str = ""    # diff内容或新文件内容
     file_content: str = ""  # 文件的原始内容（如果是修改文件）
+    file_content_ref: str = ""  # 原始内容在 BlobStore 中的引用，归档日志时用它代替 file_content
     is_create: bool = False  # 是否为新建文件
     is_modify: bool = False  # 是否为修改文件
     is_delete: bool = False  # 是否为删除文件
 
 
+@dataclass
+class DiffConfig:
+    """diff 处理配置"""
+    local_apply: bool = True  # 是否优先在本地应用 hunk，无法定位时才请求模型
+    fuzz: int = 2  # 定位 hunk 时最多忽略首尾各多少行上下文，含义同 patch --fuzz
+    fallback_mode: str = "window"  # 需要模型处理时的方式: "window" 只发送 hunk 附近的片段，"file" 发送完整文件
+    window_context_lines: int = 20  # window 模式下 hunk 前后附带的上下文行数
+    validate: bool = True  # 提交前是否对修改后的文件做本地语法校验
+    repair_retries: int = 1  # 校验失败时请求模型重新生成该文件的次数
+
+
+@dataclass
+class DiffApplyStats:
+    """一次 process_diffs 的处理统计"""
+    local_files: int = 0  # 完全在本地应用的文件数
+    model_files: int = 0  # 需要模型参与处理的文件数
+
+
 class Diff:
     """
     处理Git diff格式的工具类
-    使用 AI 模型生成新文件内容
+    优先在本地应用 hunk，无法定位时使用 AI 模型生成新文件内容
     """
     
-    def __init__(self, ai_config: AIConfig):
+    def __init__(self, ai_config: AIConfig, config: Optional[DiffConfig] = None,
+                 file_index: Optional[FileIndex] = None):
         """
         初始化 Diff 类
         
         Args:
             ai_config: AI 配置
+            config: diff 处理配置
+            file_index: 共享的文件索引，提交修改后使写入的文件失效
         """
         # 保存 AI 配置
         self.ai_config = ai_config
+        self.config = config or DiffConfig()
+        self.hunk_applier = HunkApplier(fuzz=self.config.fuzz)
+        # 修改后文件的语法校验器，可以通过 register 为其他语言注册校验函数
+        self.file_validator = FileValidator()
+        self.last_stats = DiffApplyStats()
+        self.file_index = file_index
+        # 当前一轮修改的文件事务，所有写入先暂存，全部成功后统一提交
+        self._transaction: Optional[FileTransaction] = None
         
         # 保存原始系统提示词
         self.original_sys_prompt = ai_config.sys_prompt
@@ -48,6 +87,11 @@ class Diff:
         
         # 创建 AI 助手
         self.ai_assistant = AIAssistant(config=ai_config, tools=self.tools)
+
+        # 创建只处理文件片段的 AI 助手，直接返回修改后的片段，不使用工具
+        window_ai_config = copy(ai_config)
+        window_ai_config.sys_prompt = self._get_window_system_prompt()
+        self.window_assistant = AIAssistant(config=window_ai_config)
     
     def __del__(self):
         """析构函数，恢复原始系统提示词"""
@@ -69,59 +113,29 @@ class Diff:
         
         logger.info(f"开始解析文本中的 diff 信息，文本长度: {len(text)}")
         
-        # 提取所有 ```diff 代码块
-        diff_blocks = re.findall(r'```diff\s+(.*?)```', text, re.DOTALL)
+        # 单次扫描提取所有代码块
+        blocks = scan_blocks(text)
         
-        for diff_block in diff_blocks:
-            if diff_block is None or diff_block == '':
+        # 提取所有 ```diff 代码块
+        for block in blocks:
+            if block.kind != "diff" or not block.body.strip():
                 continue
-            # 尝试从 diff 块中提取文件路径
-            file_paths = re.findall(r'(?:---|\+\+\+)\s+(?:a/|b/)?([^\n\t]+)', diff_block)
-            
-            if len(file_paths) >= 2:
-                file_path_pre = file_paths[0]
-                file_path_post = file_paths[1]
-                last_file_path = file_path_post  # 更新最后使用的文件路径
-            elif len(file_paths) == 1:
-                file_path_pre = file_paths[0]
-                file_path_post = file_paths[0]
-                last_file_path = file_path_post  # 更新最后使用的文件路径
-            else:
-                # 如果没有找到文件路径，尝试其他格式
-                git_diff_match = re.search(r'diff --git a/(.*?) b/(.*?)[\n\r]', diff_block)
-                if git_diff_match:
-                    file_path_pre = git_diff_match.group(1)
-                    file_path_post = git_diff_match.group(2)
-                    last_file_path = file_path_post  # 更新最后使用的文件路径
-                elif last_file_path:
-                    # 如果没有找到文件路径，但有前一个文件的路径，则使用前一个文件的路径
-                    logger.info(f"未找到文件路径，使用前一个文件的路径: {last_file_path}")
-                    file_path_pre = last_file_path
-                    file_path_post = last_file_path
-                else:
-                    # 如果仍然没有找到，使用默认名称
-                    logger.warning(f"无法从 diff 块中提取文件路径，使用默认名称")
-                    file_path_pre = "unknown_file.txt"
-                    file_path_post = "unknown_file.txt"
-                    last_file_path = file_path_post  # 更新最后使用的文件路径
-            
-            logger.info(f"找到 diff: {file_path_pre} -> {file_path_post}")
-            diffs.append((file_path_pre, file_path_post, f'''diff\n{diff_block}\n'''))
+            diff = Diff._diff_from_block(block.body, last_file_path)
+            last_file_path = diff[1]  # 更新最后使用的文件路径
+            diffs.append(diff)
         
         # 如果没有找到 diff 块，尝试提取文件路径和内容
         if not diffs:
-            # 尝试提取文件路径和内容
-            file_blocks = re.findall(r'```(?:.*?)\n(?:# )?(?:File|文件):\s*([^\n]+)\n(.*?)```', text, re.DOTALL)
-            
-            for file_path, file_content in file_blocks:
-                file_path = file_path.strip()
-                logger.info(f"找到文件内容: {file_path}")
-                last_file_path = file_path  # 更新最后使用的文件路径
-                diffs.append((file_path, file_path, file_content))
+            for block in blocks:
+                if block.kind != "file":
+                    continue
+                logger.info(f"找到文件内容: {block.file_path}")
+                last_file_path = block.file_path  # 更新最后使用的文件路径
+                diffs.append((block.file_path, block.file_path, block.body))
         
         # 如果仍然没有找到，尝试匹配任何代码块
         if not diffs:
-            code_blocks = re.findall(r'```(?:.*?)\n(.*?)```', text, re.DOTALL)
+            code_blocks = [block.body for block in blocks if block.kind == "code"]
             
             for i, content in enumerate(code_blocks):
                 # 尝试从内容中提取文件路径
@@ -150,6 +164,47 @@ class Diff:
         
         return diffs
 
+    @staticmethod
+    def _diff_from_block(diff_block: str, last_file_path: Optional[str]) -> Tuple[str, str, str]:
+        """
+        从单个 diff 代码块中提取文件路径
+
+        Args:
+            diff_block: ```diff 代码块的内容
+            last_file_path: 前一个 diff 块的文件路径，当前块没有路径时使用
+
+        Returns:
+            Tuple[str, str, str]: (原文件路径, 新文件路径, diff内容)
+        """
+        # 尝试从 diff 块中提取文件路径
+        file_paths = re.findall(r'(?:---|\+\+\+)\s+(?:a/|b/)?([^\n\t]+)', diff_block)
+        
+        if len(file_paths) >= 2:
+            file_path_pre = file_paths[0]
+            file_path_post = file_paths[1]
+        elif len(file_paths) == 1:
+            file_path_pre = file_paths[0]
+            file_path_post = file_paths[0]
+        else:
+            # 如果没有找到文件路径，尝试其他格式
+            git_diff_match = re.search(r'diff --git a/(.*?) b/(.*?)[\n\r]', diff_block)
+            if git_diff_match:
+                file_path_pre = git_diff_match.group(1)
+                file_path_post = git_diff_match.group(2)
+            elif last_file_path:
+                # 如果没有找到文件路径，但有前一个文件的路径，则使用前一个文件的路径
+                logger.info(f"未找到文件路径，使用前一个文件的路径: {last_file_path}")
+                file_path_pre = last_file_path
+                file_path_post = last_file_path
+            else:
+                # 如果仍然没有找到，使用默认名称
+                logger.warning(f"无法从 diff 块中提取文件路径，使用默认名称")
+                file_path_pre = "unknown_file.txt"
+                file_path_post = "unknown_file.txt"
+        
+        logger.info(f"找到 diff: {file_path_pre} -> {file_path_post}")
+        return (file_path_pre, file_path_post, f'''diff\n{diff_block}\n''')
+
     @staticmethod
     def extract_raw_diff_blocks(text: str) -> List[str]:
         """
@@ -163,8 +218,7 @@ class Diff:
         """
         
         # 提取所有 ```diff 开头，以 ``` 结尾的代码块（包含标记）
-        pattern = r'(```diff[\s\S]*?```)'  
-        raw_diff_blocks = re.findall(pattern, text)
+        raw_diff_blocks = [text[block.start:block.end] for block in scan_blocks(text) if block.kind == "diff"]
         
         if not raw_diff_blocks:
             logger.warning("未找到任何原始diff代码块")
@@ -173,8 +227,9 @@ class Diff:
 
     def process_diffs(self, diffs: List[Tuple[str, str, str]], project_dir: str) -> tuple[List[str], List[DiffInfo]]:
         """
-        处理 diff 列表，使用 AI 模型生成新文件内容
-        将同一个文件的多个 diff 合并后一起请求模型
+        处理 diff 列表，优先在本地应用 hunk，只有无法定位的 hunk 才请求 AI 模型
+        将同一个文件的多个 diff 合并后一起处理，不同文件按 max_concurrency 并发处理
+        所有写入在同一个文件事务中暂存，全部文件成功后才提交到工作区，任意文件失败时工作区保持不变
 
         Args:
             diffs: 解析后的文件信息列表，每个元素为 (原文件路径, 新文件路径, diff内容)
@@ -183,9 +238,6 @@ class Diff:
         Returns:
             List[str]: 处理失败的文件列表
         """
-        failed_files = []
-        diff_infos = []
-        
         # 按文件路径分组，合并同一文件的多个 diff
         file_diffs = {}
         for file_path_pre, file_path_post, content_or_diff in diffs:
@@ -195,107 +247,487 @@ class Diff:
         
         logger.info(f"将 {len(diffs)} 个 diff 合并为 {len(file_diffs)} 个文件的修改")
 
-        # 处理每个文件的所有 diff
-        for file_path_post, file_changes in file_diffs.items():
-            try:
-                full_path_post = os.path.join(project_dir, file_path_post)
-                
-                # 获取第一个 diff 的原文件路径（通常所有 diff 的原文件路径应该相同）
-                file_path_pre = file_changes[0][0]
-                full_path_pre = os.path.join(project_dir, file_path_pre)
+        transaction = self.begin_transaction(project_dir)
+        # 处理每个文件的所有 diff，结果按文件首次出现的顺序汇总，保证归档日志可复现
+        results = self._map_files(
+            lambda item: self._process_file(item[0], item[1], project_dir),
+            list(file_diffs.items())
+        )
+
+        return self._collect_results([
+            (file_path_post, info, used_model)
+            for file_path_post, (info, used_model) in zip(file_diffs.keys(), results)
+        ], transaction)
+
+    def process_edit_blocks(self, blocks: List[EditBlock], project_dir: str) -> tuple[List[str], List[DiffInfo]]:
+        """
+        处理 SEARCH/REPLACE 编辑块，编辑块完全在本地应用，只有无法定位的编辑块才请求 AI 模型
+        与 process_diffs 一样按文件并发处理，并在同一个文件事务中提交
+
+        Args:
+            blocks: 解析后的编辑块列表
+            project_dir: 项目根目录
+
+        Returns:
+            tuple[List[str], List[DiffInfo]]: 处理失败的文件列表和修改信息列表
+        """
+        file_blocks: Dict[str, List[EditBlock]] = {}
+        for block in blocks:
+            file_blocks.setdefault(block.file_path, []).append(block)
+
+        logger.info(f"将 {len(blocks)} 个编辑块合并为 {len(file_blocks)} 个文件的修改")
+
+        transaction = self.begin_transaction(project_dir)
+        results = self._map_files(
+            lambda item: self._process_edit_file(item[0], item[1], project_dir),
+            list(file_blocks.items())
+        )
+
+        return self._collect_results([
+            (file_path, info, used_model)
+            for file_path, (info, used_model) in zip(file_blocks.keys(), results)
+        ], transaction)
+
+    def _map_files(self, func: Callable, items: List) -> List:
+        """按 max_concurrency 并发处理各文件，结果保持输入顺序"""
+        max_workers = min(max(self.ai_config.max_concurrency, 1), max(len(items), 1))
+        if max_workers <= 1:
+            return [func(item) for item in items]
+        logger.info(f"并发处理文件修改，并发数: {max_workers}")
+        # 各线程共享同一个助手，提交前先创建代理，避免多个线程同时创建
+        self.ai_assistant.ensure_agent()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(func, items))
+
+    def begin_transaction(self, project_dir: str) -> FileTransaction:
+        """
+        开始新一轮修改的文件事务，之后的写入都暂存在事务中
+
+        Args:
+            project_dir: 项目根目录
+
+        Returns:
+            FileTransaction: 文件事务
+        """
+        self._transaction = FileTransaction(project_dir)
+        return self._transaction
+
+    def stream_diffs(self, project_dir: str) -> "DiffStreamSession":
+        """
+        创建边生成边应用 diff 的会话，用法：
+
+            with diff.stream_diffs(project_dir) as session:
+                response = ai_assistant.generate_response(prompt, on_chunk=session.feed)
+                failed_files, diff_infos = session.collect()
+
+        Args:
+            project_dir: 项目根目录
+
+        Returns:
+            DiffStreamSession: 流式处理会话
+        """
+        return DiffStreamSession(self, project_dir)
+
+    def _collect_results(self, results: List[Tuple[str, Optional[DiffInfo], bool]],
+                         transaction: FileTransaction) -> tuple[List[str], List[DiffInfo]]:
+        """
+        汇总各文件的处理结果并更新统计信息，全部成功时提交文件事务，否则回滚
+
+        Args:
+            results: (文件路径, 修改信息, 是否请求了模型) 列表，按文件首次出现的顺序排列
+            transaction: 本轮修改的文件事务
+
+        Returns:
+            tuple[List[str], List[DiffInfo]]: 处理失败的文件列表和修改信息列表，
+            存在失败文件时工作区未被修改，修改信息列表为空
+        """
+        if self.config.validate and all(info is not None for _, info, _ in results):
+            results = self._map_files(lambda item: self._validate_file(item, transaction), results)
+
+        failed_files = []
+        diff_infos = []
+        self.last_stats = DiffApplyStats()
+        for file_path_post, info, used_model in results:
+            if used_model:
+                self.last_stats.model_files += 1
+            elif info is not None:
+                self.last_stats.local_files += 1
+            if info is None:
+                failed_files.append(file_path_post)
+            else:
+                diff_infos.append(info)
+
+        logger.info(f"diff 处理完成: 本地应用 {self.last_stats.local_files} 个文件，"
+                    f"模型处理 {self.last_stats.model_files} 个文件，失败 {len(failed_files)} 个文件")
+
+        if self._transaction is transaction:
+            self._transaction = None
+        if failed_files:
+            transaction.rollback()
+            logger.warning(f"有 {len(failed_files)} 个文件处理失败，本轮修改未写入工作区")
+            return (failed_files, [])
+        written_files = transaction.staged_files
+        try:
+            transaction.commit()
+        except Exception as e:
+            logger.error(f"提交文件修改失败: {str(e)}")
+            return ([file_path_post for file_path_post, _, _ in results], [])
+        finally:
+            if self.file_index:
+                self.file_index.invalidate(written_files)
+        return (failed_files, diff_infos)
+
+    def _validate_file(self, item: Tuple[str, DiffInfo, bool],
+                       transaction: FileTransaction) -> Tuple[str, Optional[DiffInfo], bool]:
+        """
+        校验单个文件修改后的内容，语法损坏时只请求模型重新生成该文件
+
+        原文件本身就无法通过校验时不做处理，避免因为已有的问题反复请求模型。
+
+        Args:
+            item: (文件路径, 修改信息, 是否请求了模型)
+            transaction: 本轮修改的文件事务
+
+        Returns:
+            Tuple[str, Optional[DiffInfo], bool]: 校验后的结果，无法修复时修改信息为 None
+        """
+        file_path, info, used_model = item
+        full_path = os.path.join(transaction.project_dir, file_path)
+        if info.is_delete or not self.file_validator.supports(full_path) or not transaction.exists(full_path):
+            return item
+        content = transaction.read(full_path)
+        error = self.file_validator.validate(full_path, content)
+        if error is None:
+            return item
+        original = transaction.original(full_path)
+        if original is not None and self.file_validator.validate(full_path, original) is not None:
+            logger.info(f"文件 {file_path} 修改前已无法通过校验，跳过: {error}")
+            return item
+
+        for attempt in range(self.config.repair_retries):
+            logger.warning(f"文件 {file_path} 修改后无法通过校验，请求模型修复 (第 {attempt + 1} 次): {error}")
+            used_model = True
+            prompt = f"""
+            我根据以下修改信息修改了文件 {file_path}，但修改后的文件存在语法错误。
+            
+            修改信息：
+            ```
+            {info.content}
+            ```
+            
+            修改后的文件内容：
+            ```
+            {content}
+            ```
+            
+            错误信息：{error}
+            
+            请修复语法错误，保持修改意图不变，生成完整的文件内容，然后使用 replace_file 工具将内容写入文件 {full_path}。
+            """
+            response = self.ai_assistant.generate_response(prompt, use_tools=True)
+            if "文件已更新:" not in response:
+                logger.warning(f"修复文件可能失败: {file_path}, 响应: {response}")
+                break
+            content = transaction.read(full_path)
+            error = self.file_validator.validate(full_path, content)
+            if error is None:
+                logger.info(f"修复文件成功: {file_path}")
+                return file_path, info, used_model
+        logger.error(f"文件 {file_path} 修改后仍无法通过校验: {error}")
+        return file_path, None, used_model
+
+    def _process_file(self, file_path_post: str, file_changes: List[Tuple[str, str]], project_dir: str) -> Tuple[Optional[DiffInfo], bool]:
+        """
+        处理单个文件的所有 diff
+
+        Args:
+            file_path_post: 修改后的文件路径
+            file_changes: 该文件的 (原文件路径, diff内容) 列表
+            project_dir: 项目根目录
+
+        Returns:
+            Tuple[Optional[DiffInfo], bool]: 修改信息（失败时为 None），以及是否请求了模型
+        """
+        try:
+            full_path_post = os.path.join(project_dir, file_path_post)
+            
+            # 获取第一个 diff 的原文件路径（通常所有 diff 的原文件路径应该相同）
+            file_path_pre = file_changes[0][0]
+            full_path_pre = os.path.join(project_dir, file_path_pre)
+            
+            # 检查是否是新文件
+            is_new_file = file_path_pre == "/dev/null" or not self._exists(full_path_pre)
+            
+            # 合并同一文件的所有 diff
+            combined_diff = "\n".join([change[1] for change in file_changes])
+            # File: 代码块和普通代码块是完整的文件内容，不能按 hunk 解析，否则缩进的行会被当作上下文行
+            is_diff = any(is_unified_diff(diff_content) for _, diff_content in file_changes)
+            hunks = [hunk for _, diff_content in file_changes for hunk in parse_hunks(diff_content)] if is_diff else []
+            info = DiffInfo()
+            info.file_name = file_path_post
+            if is_new_file:
+                info.content = combined_diff
+                info.is_create = True
+                if not is_diff:
+                    # 如果已经是完整内容，直接写入
+                    return (info if self._write_locally(full_path_post, file_changes[-1][1]) else None), False
+                # 只包含新增行的 diff 可以直接在本地生成文件内容
+                new_content = HunkApplier.new_file_content(hunks) if hunks and self.config.local_apply else None
+                if new_content is not None:
+                    return (info if self._write_locally(full_path_post, new_content) else None), False
+                # 如果是 diff 格式，需要让模型生成完整内容
+                prompt = f"""
+                我需要根据以下 diff 信息创建一个新文件。
                 
-                # 检查是否是新文件
-                is_new_file = file_path_pre == "/dev/null" or not os.path.exists(full_path_pre)
+                diff 信息：
+                ```
+                {combined_diff}
+                ```
                 
-                # 合并同一文件的所有 diff
-                combined_diff = "\n".join([change[1] for change in file_changes])
-                info = DiffInfo()
-                info.file_name = file_path_post
-                if is_new_file:
-                    # 对于新文件，直接使用内容创建
-                    if combined_diff.startswith("diff ") or combined_diff.startswith("--- ") or combined_diff.startswith("+++ ") or "\n@@" in combined_diff:
-                        # 如果是 diff 格式，需要让模型生成完整内容
-                        prompt = f"""
-                        我需要根据以下 diff 信息创建一个新文件。
-                        
-                        diff 信息：
-                        ```
-                        {combined_diff}
-                        ```
-                        
-                        请生成完整的文件内容，然后使用 replace_file 工具将内容写入文件 {full_path_post}。
-                        """
-                    else:
-                        # 如果已经是完整内容，直接使用
-                        prompt = f"""
-                        请使用 replace_file 工具将以下内容写入文件 {full_path_post}：
-                        
-                        ```
-                        {combined_diff}
-                        ```
-                        """
-                    info.content = combined_diff
-                    info.is_create = True
+                请生成完整的文件内容，然后使用 replace_file 工具将内容写入文件 {full_path_post}。
+                """
+            else:
+                # 对于现有文件，读取原内容（包含本轮已暂存的修改），先在本地应用 hunk
+                try:
+                    original_content = self._read(full_path_pre)
+                except Exception as e:
+                    logger.error(f"读取原文件失败: {str(e)}")
+                    return None, False
+
+                # 如果有多个 diff，清晰地标记每个 diff
+                if len(file_changes) > 1:
+                    diff_sections = []
+                    for i, (_, diff_content) in enumerate(file_changes, 1):
+                        diff_sections.append(f"Diff #{i}:\n{diff_content}")
+                    formatted_diffs = "\n\n".join(diff_sections)
                 else:
-                    # 对于现有文件，读取原内容，让模型生成新内容
-                    try:
-                        with open(full_path_pre, "r", encoding="utf-8") as f:
-                            original_content = f.read()
-                        
-                        # 如果有多个 diff，清晰地标记每个 diff
-                        if len(file_changes) > 1:
-                            diff_sections = []
-                            for i, (_, diff_content) in enumerate(file_changes, 1):
-                                diff_sections.append(f"Diff #{i}:\n{diff_content}")
-                            formatted_diffs = "\n\n".join(diff_sections)
-                        else:
-                            formatted_diffs = combined_diff
-                        
-                        prompt = f"""
-                        我需要根据 diff 信息修改一个文件。原文件内容如下：
-                        ```
-                        {original_content}
-                        ```
-                        
-                        {"以下是多个需要应用的 diff，请按顺序应用所有修改：" if len(file_changes) > 1 else "diff 信息如下："}
-                        ```
-                        {formatted_diffs}
-                        ```
-                        
-                        请根据原文件内容和 diff 信息，生成修改后的完整文件内容，然后使用 replace_file 工具将内容写入文件 {full_path_post}。
-                        {"请确保应用所有的 diff 修改，并解决可能的冲突。" if len(file_changes) > 1 else ""}
-                        """
-                        info.file_content = original_content
-                        info.content = formatted_diffs
-                        info.is_modify = True
-                    except Exception as e:
-                        logger.error(f"读取原文件失败: {str(e)}")
-                        failed_files.append(file_path_post)
-                        continue
-
-                # 调用 AI 模型处理
-                logger.info(f"处理文件: {file_path_post} (包含 {len(file_changes)} 个 diff)")
-                response = self.ai_assistant.generate_response(prompt, use_tools=True)
+                    formatted_diffs = combined_diff
+                # 回滚使用本轮修改之前的内容，由文件事务在首次写入时记录，无需再次读取
+                original = self._transaction.original(full_path_pre) if self._transaction else None
+                info.file_content = original if original is not None else original_content
+                info.content = formatted_diffs
+                info.is_modify = True
+
+                if not is_diff:
+                    # 完整的文件内容直接替换原文件，有多个时以最后一个为准
+                    return (info if self._write_locally(full_path_post, file_changes[-1][1]) else None), False
+
+                base_content = original_content
+                pending_diffs = formatted_diffs
+                multiple = len(file_changes) > 1
+                if hunks and self.config.local_apply:
+                    result = self.hunk_applier.apply(original_content, hunks)
+                    if not result.failed:
+                        return (info if self._write_locally(full_path_post, result.content) else None), False
+                    # 只把无法定位的 hunk 交给模型，已定位的修改保留在内容中
+                    if self.config.fallback_mode == "window":
+                        new_content = self._apply_hunk_windows(file_path_post, result.content, result.failed)
+                        if new_content is not None:
+                            return (info if self._write_locally(full_path_post, new_content) else None), True
+                    base_content = result.content
+                    pending_diffs = "\n".join(hunk.raw for hunk in result.failed)
+                    multiple = len(result.failed) > 1
+                    logger.info(f"文件 {file_path_post} 有 {len(result.failed)} 个 hunk 无法在本地定位，交由模型处理")
+
+                prompt = f"""
+                我需要根据 diff 信息修改一个文件。原文件内容如下：
+                ```
+                {base_content}
+                ```
                 
-                # 检查响应中是否包含成功信息
-                if "文件已更新:" not in response:
-                    logger.warning(f"文件处理可能失败: {file_path_post}, 响应: {response}")
-                    failed_files.append(file_path_post)
-                else:
-                    diff_infos.append(info)
-                    logger.info(f"处理文件成功: {file_path_post}")
-            except Exception as e:
-                logger.error(f"处理文件失败: {file_path_post}, 错误: {str(e)}")
-                failed_files.append(file_path_post)
-        
-        return (failed_files, diff_infos)
+                {"以下是多个需要应用的 diff，请按顺序应用所有修改：" if multiple else "diff 信息如下："}
+                ```
+                {pending_diffs}
+                ```
+                
+                请根据原文件内容和 diff 信息，生成修改后的完整文件内容，然后使用 replace_file 工具将内容写入文件 {full_path_post}。
+                {"请确保应用所有的 diff 修改，并解决可能的冲突。" if multiple else ""}
+                """
+
+            # 调用 AI 模型处理
+            logger.info(f"处理文件: {file_path_post} (包含 {len(file_changes)} 个 diff)")
+            response = self.ai_assistant.generate_response(prompt, use_tools=True)
+            
+            # 检查响应中是否包含成功信息
+            if "文件已更新:" not in response:
+                logger.warning(f"文件处理可能失败: {file_path_post}, 响应: {response}")
+                return None, True
+            logger.info(f"处理文件成功: {file_path_post}")
+            return info, True
+        except Exception as e:
+            logger.error(f"处理文件失败: {file_path_post}, 错误: {str(e)}")
+            return None, False
+
+    def _process_edit_file(self, file_path: str, blocks: List[EditBlock], project_dir: str) -> Tuple[Optional[DiffInfo], bool]:
+        """
+        处理单个文件的所有编辑块
+
+        Args:
+            file_path: 文件路径
+            blocks: 该文件的编辑块，按出现顺序排列
+            project_dir: 项目根目录
+
+        Returns:
+            Tuple[Optional[DiffInfo], bool]: 修改信息（失败时为 None），以及是否请求了模型
+        """
+        try:
+            full_path = os.path.join(project_dir, file_path)
+            info = DiffInfo()
+            info.file_name = file_path
+            info.content = "\n\n".join(block.raw for block in blocks)
+
+            if not self._exists(full_path):
+                # 新文件的编辑块只能包含空的 SEARCH
+                if any(block.search.strip() for block in blocks):
+                    logger.warning(f"编辑块查找的文件不存在: {file_path}")
+                    return None, False
+                info.is_create = True
+                new_content = "".join(block.replace for block in blocks)
+                return (info if self._write_locally(full_path, new_content) else None), False
+
+            original_content = self._read(full_path)
+            original = self._transaction.original(full_path) if self._transaction else None
+            info.file_content = original if original is not None else original_content
+            info.is_modify = True
+
+            result = apply_edit_blocks(original_content, blocks, self.hunk_applier)
+            if not result.failed:
+                return (info if self._write_locally(full_path, result.content) else None), False
+
+            # 只把无法定位的编辑块交给模型，已应用的修改保留在内容中
+            logger.info(f"文件 {file_path} 有 {len(result.failed)} 个编辑块无法在本地定位，交由模型处理")
+            pending_blocks = "\n\n".join(block.raw for block in result.failed)
+            prompt = f"""
+            我需要根据 SEARCH/REPLACE 编辑块修改一个文件。原文件内容如下：
+            ```
+            {result.content}
+            ```
+            
+            以下编辑块的 SEARCH 部分无法在文件中精确找到，请找到对应的代码并替换为 REPLACE 部分：
+            ```
+            {pending_blocks}
+            ```
+            
+            请生成修改后的完整文件内容，然后使用 replace_file 工具将内容写入文件 {full_path}。
+            """
+            response = self.ai_assistant.generate_response(prompt, use_tools=True)
+            if "文件已更新:" not in response:
+                logger.warning(f"文件处理可能失败: {file_path}, 响应: {response}")
+                return None, True
+            logger.info(f"处理文件成功: {file_path}")
+            return info, True
+        except Exception as e:
+            logger.error(f"处理文件失败: {file_path}, 错误: {str(e)}")
+            return None, False
+
+    def _apply_hunk_windows(self, file_path: str, content: str, hunks: List[Hunk]) -> Optional[str]:
+        """
+        只把每个 hunk 附近的片段交给模型修改，再在本地拼接回文件
+        模型输出的 token 数只与修改范围相关，与文件大小无关
+
+        Args:
+            file_path: 文件路径，用于提示词和日志
+            content: 已应用可定位 hunk 后的文件内容
+            hunks: 无法在本地定位的 hunk
+
+        Returns:
+            Optional[str]: 修改后的完整文件内容，无法使用片段方式处理时返回 None
+        """
+        regions = self.hunk_applier.estimate_regions(content, hunks)
+        if any(region is None for region in regions):
+            logger.info(f"文件 {file_path} 有 hunk 无法估计位置，改为发送完整文件")
+            return None
+
+        # 扩展上下文并合并重叠的片段
+        total_lines = content.count("\n") + 1
+        context = self.config.window_context_lines
+        windows: List[List] = []
+        for (start, end), hunk in sorted(zip(regions, hunks), key=lambda item: item[0]):
+            start, end = max(start - context, 0), min(end + context, total_lines)
+            if windows and start <= windows[-1][1]:
+                windows[-1][1] = max(windows[-1][1], end)
+                windows[-1][2].append(hunk)
+            else:
+                windows.append([start, end, [hunk]])
+        if len(windows) == 1 and windows[0][0] == 0 and windows[0][1] >= total_lines:
+            # 片段已经覆盖整个文件
+            return None
+
+        replacements = []
+        for start, end, window_hunks in windows:
+            region = self.hunk_applier.region_text(content, start, end)
+            pending_diffs = "\n".join(hunk.raw for hunk in window_hunks)
+            prompt = f"""
+            我需要根据 diff 信息修改文件 {file_path} 中的一个片段。以下是该文件第 {start + 1} 行到第 {end} 行的内容：
+            ```
+            {region}
+            ```
+            
+            需要应用到这个片段上的 diff：
+            ```
+            {pending_diffs}
+            ```
+            
+            请输出修改后的完整片段，用于替换上面的片段，放在一个代码块中。
+            """
+            logger.info(f"以片段方式处理文件: {file_path} 第 {start + 1}-{end} 行 (包含 {len(window_hunks)} 个 hunk)")
+            response = self.window_assistant.generate_response(prompt)
+            blocks = scan_blocks(response)
+            if not blocks:
+                logger.warning(f"模型没有返回修改后的片段: {file_path}, 改为发送完整文件")
+                return None
+            if not self._window_boundaries_kept(region, blocks[0].body):
+                # 片段位置根据单个锚点估计，模型的回复被截断或偏移时拼接会破坏文件的其他部分
+                logger.warning(f"模型返回的片段与原片段的首尾行不一致: {file_path}, 改为发送完整文件")
+                return None
+            replacements.append((start, end, blocks[0].body))
+        return self.hunk_applier.splice(content, replacements)
+
+    @staticmethod
+    def _window_boundaries_kept(region: str, reply: str) -> bool:
+        """
+        模型返回的片段是否保留了原片段的第一行和最后一行（忽略空行和空白差异）
+
+        片段前后各带有上下文行，正确的回复应当原样保留这些行；首尾行不一致说明回复被截断、
+        偏移，或者修改落在了片段边界之外，此时不能直接拼接。
+        """
+        original = [normalize_line(line) for line in region.split("\n") if line.strip()]
+        replaced = [normalize_line(line) for line in reply.split("\n") if line.strip()]
+        if not original:
+            return True
+        return bool(replaced) and replaced[0] == original[0] and replaced[-1] == original[-1]
+
+    def _exists(self, file_path: str) -> bool:
+        """文件是否存在，存在文件事务时包含本轮暂存的文件"""
+        if self._transaction is not None:
+            return self._transaction.exists(file_path)
+        return os.path.exists(file_path)
+
+    def _read(self, file_path: str) -> str:
+        """读取文件内容，存在文件事务时优先读取本轮暂存的内容"""
+        if self._transaction is not None:
+            return self._transaction.read(file_path)
+        with open(file_path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def _write_locally(self, file_path: str, content: str) -> bool:
+        """在本地直接写入文件，不经过模型"""
+        result = self._replace_file(file_path, content)
+        if "文件已更新:" not in result:
+            logger.warning(f"本地写入文件失败: {file_path}, {result}")
+            return False
+        logger.info(f"本地应用修改成功: {file_path}")
+        return True
 
     def _replace_file(self, file_path: str, content: str) -> str:
         """
         替换或创建UTF-8编码的文本文件
-        支持自动创建不存在的目录结构
+        支持自动创建不存在的目录结构，存在文件事务时只写入暂存区
         """
         try:
+            if self._transaction is not None:
+                self._transaction.write(file_path, content)
+                return f"文件已更新: {file_path}"
             os.makedirs(os.path.dirname(file_path), exist_ok=True)
             with open(file_path, "w", encoding="utf-8") as f:
                 f.write(content)
@@ -362,6 +794,135 @@ class Diff:
     - 如果是新文件，直接生成完整的文件内容
     """
 
+    def _get_window_system_prompt(self) -> str:
+        """
+        获取以片段方式处理 diff 的系统提示词
+
+        Returns:
+            str: 系统提示词
+        """
+        return """你是一个专业的代码工程师助手，擅长根据 diff 信息修改代码片段。
+    
+    你将收到文件中的一个片段和需要应用到该片段的 diff 信息，需要输出修改后的完整片段。
+    
+    注意事项：
+    - 只输出修改后的片段，放在一个 ``` 代码块中，不要输出片段以外的文件内容
+    - 片段中未被 diff 修改的行必须原样保留，包括缩进和空行
+    - 不要添加行号、额外的注释或标记
+    - diff 的上下文或行号可能与片段不完全一致，请根据内容找到正确的位置应用修改
+    """
+
+
+class DiffStreamParser:
+    """
+    增量解析流式响应中的 ```diff 代码块
+
+    每次输入一个片段，返回在该片段中完成（收到结束标记）的 diff，解析结果与
+    Diff.parse_diffs_from_text 对 diff 代码块的解析一致。
+    """
+
+    def __init__(self):
+        self.scanner = BlockScanner()
+        self.last_file_path: Optional[str] = None
+        self.diff_count = 0
+
+    def feed(self, chunk: str) -> List[Tuple[str, str, str]]:
+        """
+        输入一个响应片段
+
+        Args:
+            chunk: 流式响应片段
+
+        Returns:
+            List[Tuple[str, str, str]]: 本次完成的 (原文件路径, 新文件路径, diff内容) 列表
+        """
+        diffs = []
+        for block in self.scanner.feed(chunk):
+            if block.kind != "diff" or not block.body.strip():
+                continue
+            diff = Diff._diff_from_block(block.body, self.last_file_path)
+            self.last_file_path = diff[1]
+            self.diff_count += 1
+            diffs.append(diff)
+        return diffs
+
+
+class DiffStreamSession:
+    """
+    边生成边应用 diff 的会话
+
+    响应中每出现一个完整的 ```diff 代码块就立即提交到线程池处理，使文件修改与模型生成重叠进行；
+    同一文件的多个 diff 按出现顺序依次应用。所有写入暂存在同一个文件事务中，collect 时统一提交。
+    """
+
+    def __init__(self, diff: Diff, project_dir: str):
+        self.diff = diff
+        self.project_dir = project_dir
+        self.transaction = diff.begin_transaction(project_dir)
+        self.parser = DiffStreamParser()
+        if diff.ai_config.max_concurrency > 1:
+            # 各线程共享同一个助手，提交前先创建代理，避免多个线程同时创建
+            diff.ai_assistant.ensure_agent()
+        self.executor = ThreadPoolExecutor(max_workers=max(diff.ai_config.max_concurrency, 1))
+        # 按文件首次出现的顺序记录每个文件的处理任务
+        self.file_futures: Dict[str, List[Future]] = {}
+
+    def __enter__(self) -> "DiffStreamSession":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.executor.shutdown(wait=True)
+        # 没有调用 collect（例如生成过程中出错）时丢弃暂存的修改
+        self.transaction.rollback()
+        if self.diff._transaction is self.transaction:
+            self.diff._transaction = None
+
+    @property
+    def diff_count(self) -> int:
+        """已解析到的 diff 数量"""
+        return self.parser.diff_count
+
+    def feed(self, chunk: str) -> None:
+        """输入一个响应片段，完成的 diff 会立即开始处理"""
+        for file_path_pre, file_path_post, diff_content in self.parser.feed(chunk):
+            self._submit(file_path_pre, file_path_post, diff_content)
+
+    def _submit(self, file_path_pre: str, file_path_post: str, diff_content: str) -> None:
+        """提交单个 diff 的处理任务，同一文件的任务等待前一个任务完成后再执行"""
+        futures = self.file_futures.setdefault(file_path_post, [])
+        previous = futures[-1] if futures else None
+        logger.info(f"开始处理已生成的 diff: {file_path_post}")
+
+        def task() -> Tuple[Optional[DiffInfo], bool]:
+            if previous is not None:
+                previous.result()
+            return self.diff._process_file(file_path_post, [(file_path_pre, diff_content)], self.project_dir)
+
+        futures.append(self.executor.submit(task))
+
+    def collect(self) -> tuple[List[str], List[DiffInfo]]:
+        """
+        等待所有任务完成并汇总结果
+
+        Returns:
+            tuple[List[str], List[DiffInfo]]: 处理失败的文件列表和修改信息列表
+        """
+        results = []
+        for file_path_post, futures in self.file_futures.items():
+            file_results = [future.result() for future in futures]
+            infos = [info for info, _ in file_results]
+            used_model = any(used for _, used in file_results)
+            if any(info is None for info in infos):
+                results.append((file_path_post, None, used_model))
+                continue
+            # 同一文件的多个 diff 合并为一条修改信息，原始内容与操作类型以第一次修改为准
+            info = infos[0].model_copy()
+            if len(infos) > 1:
+                info.content = "\n\n".join(f"Diff #{i}:\n{item.content}" for i, item in enumerate(infos, 1))
+            results.append((file_path_post, info, used_model))
+        return self.diff._collect_results(results, self.transaction)
+
+
 if __name__ == "__main__":
     load_dotenv()
     text = '''
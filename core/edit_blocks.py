@@ -0,0 +1,175 @@
+"""
+SEARCH/REPLACE 编辑块模块
+
+作为 unified diff 之外的另一种修改格式，模型只需给出要查找的原文和替换后的内容：
+
+    path/to/file.py
+    ```python
+    <<<<<<< SEARCH
+    原文件中的连续行
+    =======
+    替换后的行
+    >>>>>>> REPLACE
+    ```
+
+编辑块完全在本地应用：先精确匹配，再忽略空白匹配，再忽略首尾未改动的行，不需要额外请求模型。
+"""
+
+import re
+
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from core.hunk_applier import Hunk, HunkApplier
+from core.log_config import get_logger
+
+logger = get_logger(__name__)
+
+SEARCH_PATTERN = re.compile(r'^\s*<{5,9} ?SEARCH\s*$')
+DIVIDER_PATTERN = re.compile(r'^\s*={5,9}\s*$')
+REPLACE_PATTERN = re.compile(r'^\s*>{5,9} ?REPLACE\s*$')
+PATH_PREFIX_PATTERN = re.compile(r'^(?:#+\s*)?(?:File|文件)\s*[:：]\s*')
+
+
+@dataclass
+class EditBlock:
+    """单个 SEARCH/REPLACE 编辑块"""
+    file_path: str
+    search: str  # 要查找的原文，为空表示创建新文件或追加到文件末尾
+    replace: str  # 替换后的内容
+    raw: str = ""  # 编辑块的原始文本，用于记录日志和回退到模型时构建提示词
+
+
+@dataclass
+class EditResult:
+    """编辑块应用结果"""
+    content: str
+    applied: List[EditBlock] = field(default_factory=list)
+    failed: List[EditBlock] = field(default_factory=list)
+
+
+def _clean_path(line: str) -> Optional[str]:
+    """从编辑块前的一行中提取文件路径，不像路径时返回 None"""
+    line = line.strip()
+    path = PATH_PREFIX_PATTERN.sub("", line).strip("`*:'\" ")
+    if not path or " " in path or path.startswith(("<", "=", ">")):
+        return None
+    # 没有 "File:" 前缀时，要求像文件路径一样包含扩展名或目录，避免把说明文字当作路径
+    if not PATH_PREFIX_PATTERN.match(line) and "." not in path and "/" not in path:
+        return None
+    return path
+
+
+def parse_edit_blocks(text: str) -> List[EditBlock]:
+    """
+    从模型响应中解析所有 SEARCH/REPLACE 编辑块
+
+    文件路径取编辑块之前最近的非代码块标记行；没有路径的编辑块沿用上一个编辑块的文件。
+
+    Args:
+        text: 模型响应
+
+    Returns:
+        List[EditBlock]: 按出现顺序排列的编辑块
+    """
+    blocks: List[EditBlock] = []
+    lines = text.replace("\r\n", "\n").split("\n")
+    candidate: Optional[str] = None
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if not SEARCH_PATTERN.match(line):
+            stripped = line.strip()
+            if stripped and not stripped.startswith("```"):
+                candidate = _clean_path(stripped)
+            i += 1
+            continue
+
+        file_path = candidate or (blocks[-1].file_path if blocks else None)
+        search_lines: List[str] = []
+        replace_lines: List[str] = []
+        target = search_lines
+        start = i
+        i += 1
+        closed = False
+        while i < len(lines):
+            line = lines[i]
+            if target is search_lines and DIVIDER_PATTERN.match(line):
+                target = replace_lines
+            elif target is replace_lines and REPLACE_PATTERN.match(line):
+                closed = True
+                break
+            else:
+                target.append(line)
+            i += 1
+        raw = "\n".join(lines[start:i + 1])
+        i += 1
+        candidate = None
+        if not closed or target is search_lines:
+            logger.warning(f"编辑块不完整，已忽略: {raw[:200]}")
+            continue
+        if file_path is None:
+            logger.warning(f"编辑块缺少文件路径，已忽略: {raw[:200]}")
+            continue
+        blocks.append(EditBlock(
+            file_path=file_path,
+            search="".join(f"{text}\n" for text in search_lines),
+            replace="".join(f"{text}\n" for text in replace_lines),
+            raw=f"{file_path}\n{raw}",
+        ))
+    return blocks
+
+
+def edit_block_to_hunk(block: EditBlock) -> Hunk:
+    """
+    把编辑块转换为没有行号的 hunk
+
+    SEARCH 与 REPLACE 开头和结尾相同的行作为上下文行，定位时可以像 patch --fuzz 一样被忽略。
+    """
+    search = block.search.split("\n")[:-1] if block.search else []
+    replace = block.replace.split("\n")[:-1] if block.replace else []
+    head = 0
+    while head < len(search) and head < len(replace) and search[head] == replace[head]:
+        head += 1
+    tail = 0
+    while (tail < len(search) - head and tail < len(replace) - head
+           and search[-1 - tail] == replace[-1 - tail]):
+        tail += 1
+    lines = [(" ", text) for text in search[:head]]
+    lines += [("-", text) for text in search[head:len(search) - tail]]
+    lines += [("+", text) for text in replace[head:len(replace) - tail]]
+    lines += [(" ", text) for text in search[len(search) - tail:]]
+    return Hunk(lines=lines, raw=block.raw)
+
+
+def apply_edit_blocks(content: str, blocks: List[EditBlock], applier: HunkApplier) -> EditResult:
+    """
+    按顺序把编辑块应用到文件内容上，后面的编辑块可以查找前面编辑块替换后的内容
+
+    Args:
+        content: 文件内容
+        blocks: 同一文件的编辑块
+        applier: 用于定位和替换的 HunkApplier
+
+    Returns:
+        EditResult: 应用后的内容以及成功、失败的编辑块
+    """
+    result = EditResult(content=content)
+    for block in blocks:
+        if not block.search.strip():
+            # 空的 SEARCH 表示把内容追加到文件末尾
+            newline = "\r\n" if "\r\n" in result.content else "\n"
+            if result.content and not result.content.endswith(newline):
+                result.content += newline
+            result.content += block.replace.replace("\n", newline)
+            result.applied.append(block)
+            continue
+        applied = applier.apply(result.content, [edit_block_to_hunk(block)])
+        if applied.failed:
+            result.failed.append(block)
+            continue
+        result.content = applied.content
+        result.applied.append(block)
+    if result.failed:
+        logger.info(f"本地应用编辑块: 成功 {len(result.applied)} 个，无法定位 {len(result.failed)} 个")
+    return result
@@ -0,0 +1,89 @@
+"""
+大文件分块模块
+
+超过单批 token 预算的文件需要分块摘要。分块优先在结构边界处切分：顶层的类、函数等定义，
+以及 Markdown 标题；单个结构单元仍然过大时退而在空行处切分，最后按行切分。
+相邻的结构单元会合并到同一块中，直到达到预算。
+"""
+
+import re
+
+from typing import List
+
+from core.token_counter import TokenCounter
+
+# 顶层定义的起始行：没有缩进的类、函数、装饰器等常见语言的声明，以及 Markdown 标题
+BOUNDARY_PATTERN = re.compile(
+    r"^(?:"
+    r"@\w|"
+    r"(?:async\s+)?def\s|class\s|"
+    r"(?:export\s+)?(?:default\s+)?(?:async\s+)?(?:function|class|interface|enum|type|const|let|var)\s|"
+    r"(?:public|private|protected|internal|static|abstract|final)\s|"
+    r"func\s|fn\s|pub\s|impl\s|struct\s|trait\s|mod\s|"
+    r"#{1,6}\s"
+    r")"
+)
+
+
+def _split_before(lines: List[str], is_boundary) -> List[List[str]]:
+    """在满足 is_boundary 的行之前切分，第一段之前的内容（如文件头的导入）单独成为一段"""
+    segments = [[]]
+    for line in lines:
+        if is_boundary(line) and segments[-1]:
+            segments.append([])
+        segments[-1].append(line)
+    return [segment for segment in segments if segment]
+
+
+def _merge(segments: List[List[str]], counter: TokenCounter, budget: int) -> List[str]:
+    """按顺序合并相邻的段，每块不超过预算"""
+    chunks = []
+    current: List[str] = []
+    current_tokens = 0
+    for segment in segments:
+        text = "".join(segment)
+        tokens = counter.count(text)
+        if current and current_tokens + tokens > budget:
+            chunks.append("".join(current))
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def _split_segment(segment: List[str], counter: TokenCounter, budget: int) -> List[List[str]]:
+    """将超出预算的结构单元在空行处切分，仍然过大的部分按行切分"""
+    pieces = []
+    for paragraph in _split_before(segment, lambda line: not line.strip()):
+        if counter.count("".join(paragraph)) <= budget:
+            pieces.append(paragraph)
+            continue
+        # 没有合适的空行，按行切分
+        pieces.extend([line] for line in paragraph)
+    return pieces
+
+
+def split_into_chunks(content: str, counter: TokenCounter, budget: int) -> List[str]:
+    """
+    将文件内容切分为不超过预算的块
+
+    单独一行超过预算时该行自成一块。
+
+    Args:
+        content: 文件内容
+        counter: token 计数器
+        budget: 每块的 token 预算
+
+    Returns:
+        List[str]: 按原顺序排列的块，连接起来等于原内容
+    """
+    lines = content.splitlines(keepends=True)
+    segments = []
+    for segment in _split_before(lines, lambda line: bool(BOUNDARY_PATTERN.match(line))):
+        if counter.count("".join(segment)) <= budget:
+            segments.append(segment)
+        else:
+            segments.extend(_split_segment(segment, counter, budget))
+    return _merge(segments, counter, budget)
@@ -1,10 +1,12 @@
 import os
-import pathlib
-from typing import Set
+import subprocess
+from typing import Optional, Set
 
 from pathspec import PathSpec
 from pathspec.patterns import GitWildMatchPattern
 
+from core.file_filter import FileFilter
+
 
 class FileFetcher:
     """Manages file operations and selections for the project"""
@@ -32,30 +34,113 @@ class FileFetcher:
                         patterns.append(line)
         return PathSpec.from_lines(GitWildMatchPattern, patterns)
 
+    # 始终跳过的目录
+    ALWAYS_SKIPPED_DIRS = {".git"}
+
     @staticmethod
     def get_all_files(root_dir: str, gitignore_spec: PathSpec) -> Set[str]:
-        """Get all files in directory that aren't ignored by .gitignore"""
+        """
+        Get all files in directory that aren't ignored by .gitignore
+
+        使用 os.scandir 遍历，目录在进入之前先与忽略规则匹配，被忽略的目录（如 node_modules、.venv）
+        整体跳过，不会再对其中的文件逐个 stat。与 git 一样，被忽略的目录中的文件不能通过否定规则重新包含。
+        不会进入指向目录的符号链接，避免循环和重复。
+        """
         all_files = set()
-        root_path = pathlib.Path(root_dir)
+        # (相对路径前缀, 绝对路径)，相对路径使用 / 分隔以便与忽略规则匹配
+        stack = [("", root_dir)]
+
+        while stack:
+            relative_dir, directory = stack.pop()
+            try:
+                entries = os.scandir(directory)
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    relative_path = relative_dir + entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            # 跳过匹配 gitignore 模式的目录，不再进入
+                            if (entry.name not in FileFetcher.ALWAYS_SKIPPED_DIRS
+                                    and not gitignore_spec.match_file(relative_path + "/")):
+                                stack.append((relative_path + "/", entry.path))
+                        elif entry.is_file():
+                            # 跳过匹配 gitignore 模式的文件
+                            if not gitignore_spec.match_file(relative_path):
+                                all_files.add(relative_path if os.sep == "/" else relative_path.replace("/", os.sep))
+                    except OSError:
+                        continue
 
-        for path in root_path.rglob("*"):
-            if path.is_file():
-                # 转换为相对路径
-                relative_path = str(path.relative_to(root_path))
+        return all_files
+
+    # git ls-files 的超时时间（秒）
+    GIT_LS_FILES_TIMEOUT = 30
+
+    @staticmethod
+    def get_git_files(root_dir: str, gitignore_spec: PathSpec) -> Optional[Set[str]]:
+        """
+        使用 git 索引列举文件
 
-                # 跳过匹配 gitignore 模式的文件
-                if not gitignore_spec.match_file(relative_path):
-                    all_files.add(relative_path)
+        git ls-files --cached --others --exclude-standard 直接给出已跟踪和未被忽略的未跟踪文件，
+        不需要遍历文件系统。结果再按 .gitignore 和 .eng/.engignore 过滤，并排除已删除的文件和子模块。
 
+        Returns:
+            Optional[Set[str]]: 文件集合，不是 git 仓库的根目录或 git 不可用时返回 None
+        """
+        # 只在仓库根目录使用，位于其他仓库（可能被其忽略）的子目录中的项目仍然遍历文件系统
+        if not os.path.exists(os.path.join(root_dir, ".git")):
+            return None
+        try:
+            result = subprocess.run(
+                ["git", "-C", root_dir, "ls-files", "--cached", "--others", "--exclude-standard", "-z"],
+                capture_output=True, timeout=FileFetcher.GIT_LS_FILES_TIMEOUT
+            )
+        except (OSError, subprocess.SubprocessError):
+            return None
+        if result.returncode != 0:
+            return None
+
+        all_files = set()
+        for relative_path in result.stdout.decode("utf-8", errors="surrogateescape").split("\0"):
+            if not relative_path or gitignore_spec.match_file(relative_path):
+                continue
+            if os.sep != "/":
+                relative_path = relative_path.replace("/", os.sep)
+            # 已跟踪但在工作区中删除的文件，以及子模块目录
+            if os.path.isfile(os.path.join(root_dir, relative_path)):
+                all_files.add(relative_path)
         return all_files
 
+    @staticmethod
+    def get_all_files_with_spec(root_dir: str, gitignore_spec: PathSpec,
+                                file_filter: Optional[FileFilter] = None) -> Set[str]:
+        """
+        git 仓库中优先使用 git 索引，否则遍历文件系统
+
+        列举出的文件再经过 file_filter 过滤，排除二进制、过大、生成和第三方的文件，
+        这些文件不会被读取，也不会出现在文件选择和文件记忆中。
+
+        Args:
+            root_dir: 项目根目录
+            gitignore_spec: 忽略规则
+            file_filter: 文件过滤器，默认读取 .eng/filters.toml
+        """
+        all_files = FileFetcher.get_git_files(root_dir, gitignore_spec)
+        if all_files is None:
+            # Get all files
+            all_files = FileFetcher.get_all_files(root_dir, gitignore_spec)
+
+        if file_filter is None:
+            file_filter = FileFilter.load(root_dir)
+        return file_filter.filter(root_dir, all_files)
+
     @staticmethod
     def get_all_files_without_ignore(root_dir: str) -> Set[str]:
         # Read gitignore patterns
         gitignore_spec = FileFetcher.read_gitignore(root_dir)
 
-        # Get all files
-        return FileFetcher.get_all_files(root_dir, gitignore_spec)
+        return FileFetcher.get_all_files_with_spec(root_dir, gitignore_spec)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,146 @@
+"""
+项目文件索引
+
+一次需求处理中，FileSelector、FileMemory 等多处都需要项目的文件列表和文件内容哈希。
+FileIndex 只列举一次文件树（同时只读取一次忽略规则），记录每个文件的大小和修改时间，
+内容哈希在第一次使用时计算。
+
+文件的修改时间或大小变化时，缓存的哈希自动失效；Diff 写入文件后显式调用 invalidate，
+新建或删除的文件也会反映到文件列表中。
+"""
+
+import hashlib
+import os
+import threading
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Set
+
+from pathspec import PathSpec
+
+from core.file_fetcher import FileFetcher
+from core.file_filter import FileFilter
+from core.log_config import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class FileEntry:
+    """文件的元数据"""
+    size: int
+    mtime_ns: int
+    # 内容的 SHA-256，第一次使用时计算
+    content_hash: Optional[str] = None
+
+
+class FileIndex:
+    """项目文件列表及文件元数据的共享缓存，线程安全"""
+
+    def __init__(self, project_dir: str):
+        """
+        Args:
+            project_dir: 项目根目录
+        """
+        self.project_dir = project_dir
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, FileEntry]] = None
+        self._spec: Optional[PathSpec] = None
+        self._filter: Optional[FileFilter] = None
+        # 忽略规则和过滤配置文件的修改时间，变化时重新列举
+        self._ignore_stamp: Optional[tuple] = None
+
+    def _ignore_files_stamp(self) -> tuple:
+        stamp = []
+        for path in (".gitignore", os.path.join(".eng", ".engignore"), FileFilter.CONFIG_PATH):
+            try:
+                stat = os.stat(os.path.join(self.project_dir, path))
+                stamp.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def _stat(self, filepath: str) -> Optional[FileEntry]:
+        try:
+            stat = os.stat(os.path.join(self.project_dir, filepath))
+        except OSError:
+            return None
+        return FileEntry(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+    def _ensure_listed(self) -> Dict[str, FileEntry]:
+        """调用方需持有锁"""
+        stamp = self._ignore_files_stamp()
+        if self._entries is None or stamp != self._ignore_stamp:
+            self._spec = FileFetcher.read_gitignore(self.project_dir)
+            self._filter = FileFilter.load(self.project_dir)
+            self._ignore_stamp = stamp
+            entries = {}
+            for filepath in FileFetcher.get_all_files_with_spec(self.project_dir, self._spec, self._filter):
+                entry = self._stat(filepath)
+                if entry is not None:
+                    entries[filepath] = entry
+            self._entries = entries
+            logger.info(f"文件索引已建立，共 {len(entries)} 个文件")
+        return self._entries
+
+    def files(self) -> Set[str]:
+        """项目中所有未被忽略的文件"""
+        with self._lock:
+            return set(self._ensure_listed())
+
+    def entry(self, filepath: str) -> Optional[FileEntry]:
+        """
+        获取文件的元数据，修改时间或大小与缓存不一致时更新并清除缓存的哈希
+
+        Returns:
+            Optional[FileEntry]: 元数据，文件不在索引中或已不存在时返回 None
+        """
+        with self._lock:
+            entries = self._ensure_listed()
+            cached = entries.get(filepath)
+            if cached is None:
+                return None
+            current = self._stat(filepath)
+            if current is None:
+                del entries[filepath]
+                return None
+            if (current.size, current.mtime_ns) != (cached.size, cached.mtime_ns):
+                entries[filepath] = cached = current
+            return cached
+
+    def content_hash(self, filepath: str) -> Optional[str]:
+        """文件内容的 SHA-256，文件没有变化时使用缓存，读取失败时返回 None"""
+        entry = self.entry(filepath)
+        if entry is None:
+            return None
+        if entry.content_hash is None:
+            try:
+                with open(os.path.join(self.project_dir, filepath), "rb") as f:
+                    entry.content_hash = hashlib.sha256(f.read()).hexdigest()
+            except OSError as e:
+                logger.error(f"读取文件 {filepath} 失败: {str(e)}")
+                return None
+        return entry.content_hash
+
+    def invalidate(self, paths: Optional[Iterable[str]] = None) -> None:
+        """
+        使缓存失效
+
+        Args:
+            paths: 被修改、新建或删除的文件，可以是绝对路径或相对于项目根目录的路径；
+                None 表示下次使用时重新列举整个文件树
+        """
+        with self._lock:
+            if paths is None or self._entries is None:
+                self._entries = None
+                return
+            for path in paths:
+                filepath = os.path.relpath(path, self.project_dir) if os.path.isabs(path) else path
+                self._entries.pop(filepath, None)
+                if self._spec.match_file(filepath.replace(os.sep, "/")):
+                    continue
+                if self._filter.excluded_reason(self.project_dir, filepath) is not None:
+                    continue
+                entry = self._stat(filepath)
+                if entry is not None and os.path.isfile(os.path.join(self.project_dir, filepath)):
+                    self._entries[filepath] = entry
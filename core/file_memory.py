@@ -1,18 +1,27 @@
 import json
 import logging
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Set
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 from dotenv import load_dotenv
 from langchain.tools import Tool
 
 from core.ai import AIAssistant, AIConfig
-from core.file_fetcher import FileFetcher
+from core.batch_packer import pack_first_fit_decreasing
+from core.description_cache import DescriptionCache
+from core.file_chunker import split_into_chunks
+from core.description_store import DescriptionStore
+from core.file_index import FileIndex
 from core.git_manager import GitManager, GitConfig
+from core.import_graph import ImportGraph, ModuleInfo, analyze_python, find_stale_dependents
 from core.log_config import get_logger, setup_logging
 from core.log_manager import LogManager
+from core.static_describer import describe_files
+from core.token_counter import TokenCounter, get_token_counter
 
 logger = get_logger(__name__)
 
@@ -24,6 +33,20 @@ class FileMemoryConfig:
     ai_config: AIConfig
     # 可选的LogManager，用于获取上一轮修改信息
     log_manager: Optional[LogManager] = None
+    # 同时生成描述的批次数
+    workers: int = 4
+    # 估算文件 token 数的计数器，None 表示根据 use_tiktoken 选择
+    token_counter: Optional[TokenCounter] = None
+    # 是否使用 tiktoken 精确计数（需要安装 tiktoken 扩展），否则使用离线估算
+    use_tiktoken: bool = False
+    # 为 True 时不使用静态描述，所有文件都由模型描述，并将已有的静态描述替换为模型描述
+    deep: bool = False
+    # 是否使用用户级的描述缓存，在不同克隆和分支之间复用内容相同的文件的描述
+    use_cache: bool = True
+    # 描述缓存目录，None 表示使用默认目录
+    cache_dir: Optional[str] = None
+    # 与其他组件共享的文件索引，None 表示每次更新时重新列举文件
+    file_index: Optional[FileIndex] = None
 
 
 class FileDetail:
@@ -37,17 +60,29 @@ class FileMemory:
     MEMORY_DIR = ".eng/memory"
     FILE_DETAILS_PATH = f"{MEMORY_DIR}/file_details.txt"
     GIT_ID_FILE = f"{MEMORY_DIR}/git_id"
-    MAX_RETRIES = 3    # 最大重试次数
-    RETRY_DELAY = 30    # 重试延迟（秒）
-    # 每批次最大行数和字符数限制
-    MAX_LINES_PER_BATCH = 10000  # 最大行数
-    MAX_CHARS_PER_BATCH = 50000  # 最大字符数，约为 50KB
+    FILE_HASHES_PATH = f"{MEMORY_DIR}/file_hashes.json"
+    # 按路径索引的描述存储，file_details.txt 和 file_hashes.json 是它的导出视图
+    DB_PATH = f"{MEMORY_DIR}/file_details.db"
+    # 记录本次运行的完成进度，中断后再次运行时用于报告恢复情况；
+    # 恢复本身依赖每个批次完成后保存的内容哈希，已完成的文件哈希未变化，不会被重新描述
+    PROGRESS_PATH = f"{MEMORY_DIR}/progress.json"
+    # 描述存储中静态分析生成的描述的来源标记
+    STATIC_SOURCE = "static"
+    # 文件的公开符号被删除或重命名时，最多刷新的引用了这些符号的依赖文件数
+    MAX_DEPENDENTS_PER_FILE = 10
+    # 描述提示词的版本，修改提示词后递增，使描述缓存失效
+    PROMPT_VERSION = "1"
+    MAX_RETRIES = 3    # 最大重试次数，请求错误已由共享的重试策略处理，这里只重试无效的返回结果
+    # 每批次的 token 预算和文件数限制
+    MAX_TOKENS_PER_BATCH = 16000  # 文件内容的 token 预算
     MAX_FILES_PER_BATCH = 20  # 每批次最多处理的文件数
 
     def __init__(self, config: FileMemoryConfig):
         self.config = config
         self.memory_path = os.path.join(config.project_dir, self.FILE_DETAILS_PATH)
         self.git_id_path = os.path.join(config.project_dir, self.GIT_ID_FILE)
+        self.file_hashes_path = os.path.join(config.project_dir, self.FILE_HASHES_PATH)
+        self.progress_path = os.path.join(config.project_dir, self.PROGRESS_PATH)
 
         # 保存LogManager引用
         self.log_manager = config.log_manager
@@ -58,9 +93,22 @@ class FileMemory:
         # 初始化 Git 管理器
         self.git_manager = self.config.git_manager
 
+        # 用于按 token 预算分批
+        self.token_counter = self.config.token_counter or get_token_counter(
+            self.config.ai_config.model_name, self.config.use_tiktoken)
+
+        # 用户级描述缓存
+        self.description_cache = DescriptionCache(self.config.cache_dir) if self.config.use_cache else None
+
+        # 并发处理批次时保护失败文件列表的读写
+        self._failed_files_lock = threading.Lock()
+
         # 确保内存目录存在
         os.makedirs(os.path.dirname(self.memory_path), exist_ok=True)
 
+        # 打开描述存储
+        self.store = self.open_store(config.project_dir)
+
     def _ensure_directories(self):
         """确保必要的目录存在"""
         memory_dir = os.path.join(self.config.project_dir, self.MEMORY_DIR)
@@ -201,12 +249,15 @@ class FileMemory:
                     return descriptions
             
             except Exception as e:
-                logger.error(f"批量生成文件描述失败（第{attempt+1}次尝试）: {str(e)}")
+                # 请求错误已经由共享的重试策略重试过，这里不再叠加重试，直接记录为失败文件
+                logger.error(f"批量生成文件描述失败: {str(e)}")
+                break
             
-            # 如果不是最后一次尝试，则等待后重试
+            # 返回结果为空或无法解析时，如果不是最后一次尝试，则按共享重试策略退避后重试
             if attempt < self.MAX_RETRIES - 1:
-                logger.info(f"等待 {self.RETRY_DELAY} 秒后重试...")
-                time.sleep(self.RETRY_DELAY)
+                delay = self.ai_assistant.rate_limiter.policy.backoff(attempt)
+                logger.info(f"等待 {delay:.1f} 秒后重试...")
+                time.sleep(delay)
         
         # 所有尝试都失败，记录失败的文件
         self._update_failed_files(file_paths)
@@ -219,14 +270,15 @@ class FileMemory:
         if not new_failed_files:
             return
             
-        # 读取现有失败文件列表
-        existing_failed_files = self._read_failed_files()
-        
-        # 合并并去重
-        all_failed_files = list(set(existing_failed_files + new_failed_files))
-        
-        # 写入更新后的列表
-        self._write_failed_files(all_failed_files)
+        with self._failed_files_lock:
+            # 读取现有失败文件列表
+            existing_failed_files = self._read_failed_files()
+            
+            # 合并并去重
+            all_failed_files = list(set(existing_failed_files + new_failed_files))
+            
+            # 写入更新后的列表
+            self._write_failed_files(all_failed_files)
         logger.info(f"更新了失败文件列表，共 {len(all_failed_files)} 个文件")
 
     def process_failed_files(self) -> Dict[str, str]:
@@ -271,52 +323,133 @@ class FileMemory:
             logger.error(f"读取文件 {filepath} 失败: {str(e)}, 如果要忽略该文件，请在项目根目录下配置 .eng/.engignore 配置方式同.gitignore")
             return ""
 
-    def _process_files_in_batches(self, files_with_content: List[Dict[str, str]]) -> Dict[str, str]:
-        """将文件分批处理"""
-        all_descriptions = {}
-        current_batch = []
-        current_lines = 0
-        current_size = 0
+    def _process_files_in_batches(self, files_with_content: List[Dict[str, str]],
+                                  on_batch_complete: Optional[Callable[[Dict[str, str]], None]] = None) -> Dict[str, str]:
+        """
+        将文件分批，并按 workers 配置并发生成各批次的描述
 
-        
+        Args:
+            files_with_content: 包含文件路径和内容的列表
+            on_batch_complete: 每个批次完成时以该批次的描述调用，调用在同一个线程中依次进行
+
+        Returns:
+            Dict[str, str]: 所有批次的文件描述
+        """
+        # 超出单批预算的文件单独分块摘要，其余文件装箱
+        large_files, small_files = [], []
         for file_info in files_with_content:
-            content = file_info["content"]
-            lines = len(content.splitlines())
-            chars = len(content)
-            
-            if lines == 0:
-                continue
-                
-            # 检查是否需要开始新批次
-            # 如果当前批次已满或添加此文件会超出限制，则处理当前批次并开始新批次
-            if (current_batch and (
-                len(current_batch) >= self.MAX_FILES_PER_BATCH or
-                current_lines + lines > self.MAX_LINES_PER_BATCH or
-                current_size + chars > self.MAX_CHARS_PER_BATCH
-            )):
-                # 处理当前批次
-                logger.info(f"处理批次: {len(current_batch)} 个文件，共 {current_lines} 行，{current_size} 字符")
-                batch_descriptions = self._generate_batch_file_descriptions(current_batch)
+            is_large = self._file_tokens(file_info) > self.MAX_TOKENS_PER_BATCH
+            (large_files if is_large else small_files).append(file_info)
+        batches = self._split_batches(small_files)
+        all_descriptions = {}
+        total = len(batches) + len(large_files)
+        if not total:
+            return all_descriptions
+
+        max_workers = min(max(self.config.workers, 1), total)
+        logger.info(f"共 {len(batches)} 个批次和 {len(large_files)} 个需要分块的大文件，并发数: {max_workers}")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self._generate_batch_file_descriptions, batch) for batch in batches]
+            futures += [executor.submit(self._summarize_large_file, file_info) for file_info in large_files]
+            for completed, future in enumerate(as_completed(futures), 1):
+                try:
+                    batch_descriptions = future.result()
+                except Exception as e:
+                    logger.error(f"批次处理失败: {str(e)}")
+                    continue
                 all_descriptions.update(batch_descriptions)
-                
-                # 重置批次
-                current_batch = [file_info]
-                current_lines = lines
-                current_size = chars
-            else:
-                current_batch.append(file_info)
-                current_lines += lines
-                current_size += chars
-        
-        # 处理最后一个批次
-        if current_batch:
-            logger.info(f"处理最后一个批次: {len(current_batch)} 个文件，共 {current_lines} 行，{current_size} 字符")
-            batch_descriptions = self._generate_batch_file_descriptions(current_batch)
-            all_descriptions.update(batch_descriptions)
+                if on_batch_complete:
+                    on_batch_complete(batch_descriptions)
+                logger.info(f"已完成 {completed}/{total} 个批次")
         
         return all_descriptions
 
-    def _process_files_chunk(self, files: List[str]) -> Dict[str, str]:
+    def _split_batches(self, files_with_content: List[Dict[str, str]]) -> List[List[Dict[str, str]]]:
+        """按 token 预算和文件数限制，使用首次适应递减将文件装入尽量少的批次"""
+        result = pack_first_fit_decreasing(
+            [file_info for file_info in files_with_content if file_info["content"].strip()],
+            self._file_tokens, self.MAX_TOKENS_PER_BATCH, self.MAX_FILES_PER_BATCH
+        )
+        if result.batches:
+            logger.info(f"生成 {len(result.batches)} 个批次，共约 {result.total_tokens} tokens，"
+                        f"预算 {self.MAX_TOKENS_PER_BATCH} tokens/批，平均填充率 {result.fill_ratio:.0%}")
+        return [batch.items for batch in result.batches]
+
+    def _file_tokens(self, file_info: Dict[str, str]) -> int:
+        """文件在批量提示词中占用的 token 数，包括文件标题"""
+        return self.token_counter.count(f"\n--- 文件 : {file_info['filepath']} ---\n{file_info['content']}\n")
+
+    def _summarize_large_file(self, file_info: Dict[str, str]) -> Dict[str, str]:
+        """
+        对超出单批预算的文件做分块摘要（map-reduce）
+
+        在结构边界处分块，逐块生成摘要，再合并为文件描述。摘要较多、合并后仍超出预算时，
+        分组逐层合并。任一步骤失败时记录为失败文件。
+
+        本方法已在批次线程池的工作线程中执行，各块摘要依次生成，不再另开线程池，
+        使并发请求数不超过 workers 的限制。
+
+        Args:
+            file_info: 包含文件路径和内容的字典
+
+        Returns:
+            Dict[str, str]: 文件路径到描述的映射，失败时为空
+        """
+        filepath = file_info["filepath"]
+        chunks = split_into_chunks(file_info["content"], self.token_counter, self.MAX_TOKENS_PER_BATCH)
+        logger.info(f"文件 {filepath} 超出单批预算，分为 {len(chunks)} 块生成摘要")
+        try:
+            summaries = [self._summarize_chunk(filepath, index, len(chunks), chunk)
+                         for index, chunk in enumerate(chunks, 1)]
+            # 摘要合并后仍超出预算时，分组合并为更少的摘要
+            while len(summaries) > 1 and self.token_counter.count("\n".join(summaries)) > self.MAX_TOKENS_PER_BATCH:
+                groups = split_into_chunks("".join(f"{summary}\n" for summary in summaries),
+                                           self.token_counter, self.MAX_TOKENS_PER_BATCH)
+                if len(groups) >= len(summaries):
+                    break
+                summaries = [self._reduce_summaries(filepath, group, final=False) for group in groups]
+            description = self._reduce_summaries(filepath, "\n".join(summaries), final=True)
+        except Exception as e:
+            logger.error(f"分块生成文件描述失败: {filepath}, 错误: {str(e)}")
+            description = ""
+
+        if not description:
+            self._update_failed_files([filepath])
+            return {}
+        return {filepath: description}
+
+    def _summarize_chunk(self, filepath: str, index: int, total: int, chunk: str) -> str:
+        """生成单个分块的摘要（map）"""
+        prompt = f"""
+以下是文件 {filepath} 的第 {index}/{total} 部分。
+请用中文简要总结这一部分的内容（不超过200字），包括定义的类、函数及其作用。只输出摘要本身。
+
+{chunk}
+"""
+        return " ".join(self.ai_assistant.generate_response(prompt).split())
+
+    def _reduce_summaries(self, filepath: str, summaries: str, final: bool) -> str:
+        """合并分块摘要（reduce），final 为 True 时生成最终的文件描述"""
+        if final:
+            requirement = """请根据这些摘要为整个文件生成一个简短的中文描述（不超过100字）。
+描述应该包含：
+1. 文件的主要功能
+2. 包含的关键类或函数
+3. 与其他文件的主要交互（如果明显的话）
+只输出描述本身，不要换行。"""
+        else:
+            requirement = "请将这些摘要合并为一段更简短的中文摘要（不超过300字），只输出摘要本身。"
+        prompt = f"""
+以下是文件 {filepath} 按顺序各部分的摘要：
+
+{summaries}
+
+{requirement}
+"""
+        return " ".join(self.ai_assistant.generate_response(prompt).split())
+
+    def _process_files_chunk(self, files: List[str],
+                             on_batch_complete: Optional[Callable[[Dict[str, str]], None]] = None) -> Dict[str, str]:
         """处理一组文件，生成描述"""
         # 准备文件内容
         files_with_content = []
@@ -326,7 +459,7 @@ class FileMemory:
                 files_with_content.append({"filepath": filepath, "content": content})
         
         # 按批次处理文件
-        return self._process_files_in_batches(files_with_content)
+        return self._process_files_in_batches(files_with_content, on_batch_complete)
 
     def _read_git_id(self) -> str:
         """读取保存的 Git ID"""
@@ -340,66 +473,260 @@ class FileMemory:
         with open(self.git_id_path, "w") as f:
             f.write(git_id)
 
+    def _read_file_hashes(self) -> Dict[str, str]:
+        """读取生成描述时各文件内容的哈希"""
+        return self.store.hashes()
+
     def _read_file_details(self) -> Dict[str, str]:
         """读取文件描述信息"""
-        if not os.path.exists(self.memory_path):
-            return {}
+        return self.store.get_all()
 
-        details = {}
-        with open(self.memory_path, "r", encoding="utf-8") as f:
-            for line in f:
-                if ":" in line:
-                    filename, description = line.strip().split(":", 1)
-                    details[filename] = description
-        return details
+    def _save_batch_descriptions(self, descriptions: Dict[str, str], hashes: Dict[str, str],
+                                 source: Optional[str] = None) -> None:
+        """
+        批次完成后立即写入描述存储，只更新该批次的文件
 
-    def _write_file_details(self, details: Dict[str, str]) -> None:
-        """写入文件描述信息"""
-        with open(self.memory_path, "w", encoding="utf-8") as f:
-            for filename, description in sorted(details.items()):
-                f.write(f"{filename}:{description}\n")
+        同时记录这些文件的内容哈希，运行中断后再次运行时，已经完成的文件不会被重新描述。
+        """
+        self.store.upsert_descriptions(descriptions, source=source)
+        self.store.set_hashes({filepath: hashes[filepath] for filepath in descriptions if filepath in hashes})
+
+    def _read_progress(self) -> Optional[Dict]:
+        """
+        读取上次运行的进度记录，上次运行正常结束时没有记录
+
+        记录只用于日志报告，剩余文件由内容哈希的比较得出。
+        """
+        if not os.path.exists(self.progress_path):
+            return None
+        try:
+            with open(self.progress_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"读取进度记录失败: {str(e)}")
+            return None
+
+    def _write_progress(self, total: int, completed: int) -> None:
+        """记录需要模型描述的文件总数和已完成的文件数"""
+        progress = {"total": total, "completed": completed}
+        temp_path = f"{self.progress_path}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(progress, f, ensure_ascii=False, indent=0)
+            os.replace(temp_path, self.progress_path)
+        except Exception as e:
+            logger.error(f"写入进度记录失败: {str(e)}")
+
+    def _clear_progress(self) -> None:
+        """运行结束后删除进度记录"""
+        if os.path.exists(self.progress_path):
+            os.remove(self.progress_path)
 
     def update_file_details(self) -> None:
-        """更新文件描述信息"""
-        # 获取所有文件
-        all_files = set(FileFetcher.get_all_files_without_ignore(self.config.project_dir))
+        """
+        更新文件描述信息
+
+        每个文件的描述旁记录生成描述时的内容哈希，只重新描述哈希发生变化或还没有描述的文件，
+        client 模式、bot 模式和记忆初始化的行为一致，不依赖 Git ID 或上一轮的修改日志。
+        """
+        # 获取所有文件，共享的文件索引中未变化的文件不会重新计算哈希
+        file_index = self.config.file_index or FileIndex(self.config.project_dir)
+        all_files = file_index.files()
         
-        # 读取现有描述
+        # 读取现有描述和哈希，删除不存在的文件
+        self.store.sync_from_views(self.memory_path, self.file_hashes_path)
+        self.store.delete(self.store.paths() - all_files)
         existing_details = self._read_file_details()
+        saved_hashes = self._read_file_hashes()
+        current_hashes = {}
+        for filepath in all_files:
+            file_hash = file_index.content_hash(filepath)
+            if file_hash is not None:
+                current_hashes[filepath] = file_hash
+
+        if saved_hashes or not existing_details:
+            files_to_process = [
+                filepath for filepath, file_hash in current_hashes.items()
+                if saved_hashes.get(filepath) != file_hash or filepath not in existing_details
+            ]
+            logger.info(f"根据内容哈希更新文件描述，处理{len(files_to_process)}个文件")
+        else:
+            # 旧版本的记忆没有哈希，最后一次按原来的方式判断需要更新的文件
+            files_to_process = self._get_files_to_process_legacy(all_files, existing_details)
+
+        # 公开符号被删除或重命名时，描述中引用了这些符号的依赖文件同样需要刷新
+        stale_dependents, module_updates = self._find_stale_dependents(current_hashes, existing_details)
+        queued = set(files_to_process)
+        stale_dependents = [filepath for filepath in stale_dependents if filepath not in queued]
+        if stale_dependents:
+            logger.info(f"{len(stale_dependents)} 个依赖文件的描述引用了变化的公开符号，将重新描述")
+            files_to_process = list(files_to_process) + stale_dependents
+
+        if self.config.deep:
+            # 用模型描述替换静态描述
+            static_files = self.store.paths_with_source(self.STATIC_SOURCE) & current_hashes.keys()
+            files_to_process = list(set(files_to_process) | static_files)
+            logger.info(f"深度模式：{len(static_files)} 个静态描述的文件将由模型重新描述")
 
-        
+        try:
+            self._describe_files(files_to_process, current_hashes, existing_details, refresh=set(stale_dependents))
+            self.store.set_modules(module_updates)
+
+            # 本次描述成功的文件已在各批次中记录哈希；本次需要处理但描述失败的文件保留原来的哈希，
+            # 下次会被重新处理。不需要处理的已有描述（兼容没有哈希的旧版本记忆）和空文件在这里记录哈希
+            processed = set(files_to_process)
+            hashes = {
+                filepath: file_hash for filepath, file_hash in current_hashes.items()
+                if (filepath not in processed and filepath in existing_details)
+                or (filepath in processed and self._is_blank_file(filepath))
+            }
+            self.store.set_hashes({
+                filepath: file_hash for filepath, file_hash in hashes.items() if saved_hashes.get(filepath) != file_hash
+            })
+        finally:
+            # 导出便于在 git diff 中查看的视图，运行中断时同样导出，已完成的描述可以被提交
+            self.store.export_views(self.memory_path, self.file_hashes_path)
+        self._clear_progress()
+        if not self.log_manager:
+            # Git ID 仅用于兼容旧版本的记忆
+            self._write_git_id(self.git_manager.get_current_commit_id())
+
+    def _describe_files(self, files: List[str], current_hashes: Dict[str, str],
+                        existing_details: Dict[str, str], refresh: Optional[Set[str]] = None) -> None:
+        """
+        依次使用静态描述、描述缓存和模型描述文件
+
+        每一层和每个模型批次的结果都立即写入描述存储并记录哈希，中断后再次运行时据此跳过已完成的文件；
+        进度记录只保存完成数量，用于日志报告。
+
+        Args:
+            files: 需要描述的文件
+            current_hashes: 文件当前的内容哈希
+            existing_details: 现有描述，会被更新
+            refresh: 内容没有变化但描述需要刷新的文件，不使用描述缓存
+        """
+        # 先使用静态描述，只有静态分析无法描述的文件请求模型
+        model_files = files
+        if files and not self.config.deep:
+            static_descriptions = self._describe_statically(files)
+            existing_details.update(static_descriptions)
+            self._save_batch_descriptions(static_descriptions, current_hashes, source=self.STATIC_SOURCE)
+            model_files = [filepath for filepath in files if filepath not in static_descriptions]
+            logger.info(f"静态描述了 {len(static_descriptions)} 个文件，{len(model_files)} 个文件需要模型描述")
+
+        # 其他克隆或分支已经描述过相同内容的文件直接使用缓存
+        cache_keys = {}
+        if model_files and self.description_cache:
+            cache_keys = {
+                filepath: self._cache_key(current_hashes[filepath])
+                for filepath in model_files if filepath in current_hashes
+            }
+            cached_descriptions = self.description_cache.get_many({
+                filepath: key for filepath, key in cache_keys.items() if filepath not in (refresh or set())
+            })
+            existing_details.update(cached_descriptions)
+            self._save_batch_descriptions(cached_descriptions, current_hashes)
+            model_files = [filepath for filepath in model_files if filepath not in cached_descriptions]
+            logger.info(f"描述缓存命中 {len(cached_descriptions)} 个文件，{len(model_files)} 个文件需要请求模型")
+
+        if not model_files:
+            return
+
+        previous = self._read_progress()
+        if previous:
+            logger.info(f"上次运行未完成（已完成 {previous.get('completed', 0)}/{previous.get('total', 0)} 个文件），"
+                        f"继续处理剩余的 {len(model_files)} 个文件")
+        completed: Set[str] = set()
+        self._write_progress(len(model_files), 0)
+
+        # 每个批次完成后立即合并到现有描述中，写入描述存储、描述缓存和进度记录
+        def on_batch_complete(descriptions: Dict[str, str]) -> None:
+            existing_details.update(descriptions)
+            self._save_batch_descriptions(descriptions, current_hashes)
+            if self.description_cache:
+                for filepath, description in descriptions.items():
+                    if filepath in cache_keys:
+                        self.description_cache.put(cache_keys[filepath], description)
+            completed.update(descriptions)
+            self._write_progress(len(model_files), len(completed))
+
+        self._process_files_chunk(model_files, on_batch_complete=on_batch_complete)
+        if self.description_cache:
+            self.description_cache.evict()
+
+    def _find_stale_dependents(self, current_hashes: Dict[str, str], existing_details: Dict[str, str]
+                               ) -> Tuple[List[str], Dict[str, Tuple[str, Set[str], Set[str]]]]:
+        """
+        根据 Python 导入图找出需要刷新描述的依赖文件
+
+        只重新分析内容发生变化的文件，与上次分析相比删除或重命名了公开符号时，
+        直接导入该文件且描述中提到了这些符号的文件需要刷新。公开符号没有变化时不会产生额外的请求。
+
+        Returns:
+            Tuple[List[str], Dict]: 需要刷新的文件，以及需要保存的新分析结果
+        """
+        stored = self.store.get_modules()
+        modules: Dict[str, ModuleInfo] = {}
+        removed_symbols: Dict[str, Set[str]] = {}
+        updates = {}
+        for filepath, file_hash in current_hashes.items():
+            if not filepath.endswith(".py"):
+                continue
+            previous = stored.get(filepath)
+            if previous and previous[0] == file_hash:
+                modules[filepath] = ModuleInfo(public_symbols=previous[1], imports=previous[2])
+                continue
+            info = analyze_python(filepath, self._get_file_content(filepath))
+            if info is None:
+                continue
+            modules[filepath] = info
+            updates[filepath] = (file_hash, info.public_symbols, info.imports)
+            if previous:
+                removed_symbols[filepath] = previous[1] - info.public_symbols
+
+        if not any(removed_symbols.values()):
+            return [], updates
+        graph = ImportGraph(modules)
+        return find_stale_dependents(graph, removed_symbols, existing_details, self.MAX_DEPENDENTS_PER_FILE), updates
+
+    def _cache_key(self, file_hash: str) -> str:
+        """文件描述在用户级缓存中的键"""
+        return DescriptionCache.make_key(file_hash, self.config.ai_config.model_name, self.PROMPT_VERSION)
+
+    def _describe_statically(self, files: List[str]) -> Dict[str, str]:
+        """在进程池中为文件生成静态描述，返回能够静态描述的文件"""
+        files_with_content = []
+        for filepath in files:
+            content = self._get_file_content(filepath)
+            if content.strip():
+                files_with_content.append({"filepath": filepath, "content": content})
+        try:
+            return describe_files(files_with_content)
+        except Exception as e:
+            logger.error(f"静态描述文件失败: {str(e)}")
+            return {}
+
+    def _is_blank_file(self, filepath: str) -> bool:
+        """文件是否为空或只包含空白，这类文件不会生成描述"""
+        return not self._get_file_content(filepath).strip()
+
+    def _get_files_to_process_legacy(self, all_files: Set[str], existing_details: Dict[str, str]) -> List[str]:
+        """按旧版本的方式（上一轮修改日志或 Git ID）获取需要处理的文件，用于迁移没有哈希的记忆"""
         # 如果有LogManager，使用它获取上一轮修改的文件
         if self.log_manager:
             # 获取上一轮修改的文件
             log_modified_files = self._get_last_round_modified_files()
             
-            # 只处理LogManager中标记为修改的文件
-            files_to_process = list(log_modified_files & all_files)
-            
-            # 删除不存在的文件的描述
-            existing_details = {
-                k: v for k, v in existing_details.items() if k in all_files
-            }
-            
-            logger.info(f"使用LogManager方式更新文件描述，处理{len(files_to_process)}个修改的文件")
+            # 只处理LogManager中标记为修改的文件，以及还没有描述的文件
+            files_to_process = list((log_modified_files & all_files) | (all_files - set(existing_details.keys())))
+            logger.info(f"迁移旧版本记忆：使用LogManager方式更新文件描述，处理{len(files_to_process)}个文件")
         else:
             # 如果没有LogManager，回退到Git方式
             current_git_id = self.git_manager.get_current_commit_id()
             saved_git_id = self._read_git_id()
             files_to_process = self._get_changed_files_git(all_files, existing_details, current_git_id, saved_git_id)
-            logger.info(f"使用Git方式更新文件描述，处理{len(files_to_process)}个文件")
-
-        # 处理需要更新的文件
-        if files_to_process:
-            new_descriptions = self._process_files_chunk(files_to_process)
-            existing_details.update(new_descriptions)
-
-        # 保存结果
-        self._write_file_details(existing_details)
-        if not self.log_manager:
-            # 只有使用Git方式时才更新Git ID
-            current_git_id = self.git_manager.get_current_commit_id()
-            self._write_git_id(current_git_id)
+            logger.info(f"迁移旧版本记忆：使用Git方式更新文件描述，处理{len(files_to_process)}个文件")
+        return files_to_process
 
     def _get_last_round_modified_files(self) -> set:
         """
@@ -454,22 +781,41 @@ class FileMemory:
             # 首次运行，处理所有文件
             return list(all_files)
 
+    _stores: Dict[str, DescriptionStore] = {}
+    _stores_lock = threading.Lock()
+
+    @classmethod
+    def open_store(cls, project_dir: str) -> DescriptionStore:
+        """
+        打开项目的描述存储，同一进程内共享连接
+
+        数据库不存在或导出视图被外部修改（例如 git pull）时，从视图重新导入。
+        """
+        db_path = os.path.abspath(os.path.join(project_dir, cls.DB_PATH))
+        with cls._stores_lock:
+            store = cls._stores.get(db_path)
+            if store is None:
+                store = cls._stores[db_path] = DescriptionStore(db_path)
+        store.sync_from_views(
+            os.path.join(project_dir, cls.FILE_DETAILS_PATH),
+            os.path.join(project_dir, cls.FILE_HASHES_PATH)
+        )
+        return store
+
+    @classmethod
+    def _has_memory(cls, project_dir: str) -> bool:
+        """项目是否已经有文件记忆，没有时不创建数据库"""
+        return (os.path.exists(os.path.join(project_dir, cls.DB_PATH))
+                or os.path.exists(os.path.join(project_dir, cls.FILE_DETAILS_PATH)))
+
     @classmethod
     def get_file_descriptions(cls, project_dir: str) -> Dict[str, str]:
         """获取文件描述的静态方法"""
-        memory_path = os.path.join(project_dir, cls.FILE_DETAILS_PATH)
-
-        if not os.path.exists(memory_path):
+        if not cls._has_memory(project_dir):
             return {}
 
         try:
-            descriptions = {}
-            with open(memory_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    if ":" in line:
-                        filename, description = line.strip().split(":", 1)
-                        descriptions[filename] = description
-            return descriptions
+            return cls.open_store(project_dir).get_all()
         except Exception as e:
             logger.error(f"读取文件描述失败: {str(e)}")
             return {}
@@ -477,23 +823,26 @@ class FileMemory:
     @classmethod
     def get_selected_file_descriptions(cls, project_dir: str, files: List[str]) -> Dict[str, str]:
         """获取文件描述的静态方法"""
-        memory_path = os.path.join(project_dir, cls.FILE_DETAILS_PATH)
-
-        if not os.path.exists(memory_path):
+        if not cls._has_memory(project_dir):
             return {}
         try:
-            descriptions = {}
-            with open(memory_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    if ":" in line:
-                        filename, description = line.strip().split(":", 1)
-                        if filename in files:
-                            descriptions[filename] = description
-            return descriptions
+            return cls.open_store(project_dir).get_many(files)
         except Exception as e:
             logger.error(f"读取文件描述失败: {str(e)}")
             return {}
 
+    @classmethod
+    def search_files(cls, project_dir: str, query: str, limit: int,
+                     files: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """按 BM25 得分检索与查询相关的已描述文件，没有文件记忆时返回空列表"""
+        if not cls._has_memory(project_dir):
+            return []
+        try:
+            return cls.open_store(project_dir).search(query, limit, files)
+        except Exception as e:
+            logger.error(f"检索文件描述失败: {str(e)}")
+            return []
+
 if __name__ == "__main__":
     setup_logging(log_level=logging.DEBUG)
     load_dotenv()
@@ -6,7 +6,9 @@ from langchain.tools import Tool
 from pydantic import Field, BaseModel
 
 from core.ai import AIAssistant, AIConfig
+from core.bm25 import tokenize
 from core.file_fetcher import FileFetcher
+from core.file_index import FileIndex
 from core.file_memory import FileMemory
 from core.log_config import get_logger
 from langchain_core.tools import StructuredTool
@@ -18,15 +20,23 @@ class FileSelector:
     使用 AI 辅助选择实现特定功能所需的文件
     """
 
-    def __init__(self, project_dir: str, issues_id: int, ai_config: Optional[AIConfig] = None):
+    # 默认交给模型的候选文件数
+    DEFAULT_TOP_K = 150
+
+    def __init__(self, project_dir: str, issues_id: int, ai_config: Optional[AIConfig] = None,
+                 file_index: Optional[FileIndex] = None, top_k: int = DEFAULT_TOP_K):
         """
         初始化 FileSelector
         
         Args:
             project_dir: 项目根目录
             ai_config: AI 配置，如果为 None 则使用默认配置
+            file_index: 共享的文件索引，为 None 时每次重新列举文件
+            top_k: 按 BM25 预先筛选后交给模型的候选文件数，0 表示不筛选，提交所有文件
         """
         self.project_dir = project_dir
+        self.file_index = file_index
+        self.top_k = top_k
         self.issues_id = issues_id
         self.ai_config = ai_config or AIConfig()
         
@@ -62,7 +72,10 @@ class FileSelector:
         """
         try:
             # 获取项目中的所有文件
-            all_files = FileFetcher.get_all_files_without_ignore(self.project_dir)
+            if self.file_index:
+                all_files = self.file_index.files()
+            else:
+                all_files = FileFetcher.get_all_files_without_ignore(self.project_dir)
             logger.info(f"获取到项目中的文件数量: {len(all_files)}")
             
             # 构建提示词
@@ -77,6 +90,31 @@ class FileSelector:
             logger.error(f"select_files_for_requirement 工具执行异常: {str(e)}")
             return []
     
+    def _rank_files(self, requirement: str, all_files: Set[str]) -> List[str]:
+        """
+        在本地预先筛选与需求最相关的 top_k 个文件
+
+        已描述的文件按路径和描述的 BM25 得分排序；不足 top_k 个时，用路径中包含需求关键词的文件补足，
+        再按目录层级由浅到深补足，项目根目录下的配置文件和文档优先。
+
+        Args:
+            requirement: 功能需求
+            all_files: 所有可用文件
+
+        Returns:
+            List[str]: 候选文件，按相关性从高到低排列
+        """
+        ranked = [path for path, _ in FileMemory.search_files(self.project_dir, requirement, self.top_k, all_files)]
+        if len(ranked) < self.top_k:
+            query_terms = set(tokenize(requirement))
+            chosen = set(ranked)
+            rest = sorted(
+                (path for path in all_files if path not in chosen),
+                key=lambda path: (-len(query_terms.intersection(tokenize(path))), path.count(os.sep), path)
+            )
+            ranked.extend(rest[:self.top_k - len(ranked)])
+        return ranked
+
     def _build_prompt(self, requirement: str, all_files: Set[str]) -> str:
         """
         构建提示词
@@ -88,16 +126,25 @@ class FileSelector:
         Returns:
             构建的提示词
         """
-        file_str = "\n".join(all_files)
+        total = len(all_files)
+        # 预先筛选时按相关性从高到低列出候选文件，否则按路径排序
+        candidates = sorted(all_files)
+        if self.top_k and total > self.top_k:
+            candidates = self._rank_files(requirement, all_files)
+            logger.info(f"按 BM25 预先筛选出 {len(candidates)}/{total} 个候选文件")
+        file_list_title = "以下是项目中的所有文件" if len(candidates) == total else \
+            f"以下是项目中与需求最相关的 {len(candidates)} 个文件（项目共 {total} 个文件）"
+
+        file_str = "\n".join(candidates)
         files_memory = f"""
 ##角色：
 你是一名资深的程序员，现在用户提出了一个需求，首先你要阅读项目代码和文档来了解项目名，你需要根据需求，决定阅读哪些文件。请你根据以下信息做出判断。
-##以下是项目中的所有文件:
+##{file_list_title}:
 {file_str}
 """
         # 获取文件描述
         try:
-            file_descriptions = FileMemory.get_file_descriptions(self.project_dir)
+            file_descriptions = FileMemory.get_selected_file_descriptions(self.project_dir, candidates)
         except Exception as e:
             logger.warning("file memory is not exists")
             file_descriptions = None
@@ -106,10 +153,10 @@ class FileSelector:
             # 构建文件描述字符串
             file_str = "\n".join([
                 f"- {file}：{file_descriptions.get(file, '无描述')}"
-                for file in sorted(all_files)
+                for file in candidates
             ])
             files_memory = f"""
-##以下是项目中的所有文件及其功能描述：
+##{file_list_title}及其功能描述：
 
 {file_str}
 """
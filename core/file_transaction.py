@@ -0,0 +1,210 @@
+"""
+文件事务模块
+
+一轮修改中的所有写入先保存到暂存目录的临时文件中，全部文件处理成功后逐个刷盘，
+再通过原子重命名替换工作区中的文件；任意文件失败时丢弃暂存内容，工作区保持不变。
+替换过程中出错时，已替换的文件恢复为原来的内容。
+"""
+
+import os
+import shutil
+import threading
+import uuid
+
+from typing import Dict, List, Optional
+
+from core.log_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class FileTransaction:
+    """一轮文件修改的事务"""
+
+    STAGING_DIR = ".eng/staging"
+
+    def __init__(self, project_dir: str):
+        """
+        初始化文件事务
+
+        Args:
+            project_dir: 项目根目录，暂存目录位于其中，保证与工作区在同一文件系统以支持原子重命名
+        """
+        self.project_dir = project_dir
+        self.staging_dir = os.path.join(project_dir, self.STAGING_DIR, uuid.uuid4().hex[:12])
+        # 目标文件绝对路径 -> 暂存的临时文件路径
+        self._staged: Dict[str, str] = {}
+        # 目标文件绝对路径 -> 暂存的内容
+        self._contents: Dict[str, str] = {}
+        # 目标文件绝对路径 -> 事务开始前的内容，文件原本不存在时为 None
+        self._originals: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+        self.closed = False
+
+    @staticmethod
+    def _key(file_path: str) -> str:
+        return os.path.abspath(file_path)
+
+    def exists(self, file_path: str) -> bool:
+        """文件在事务中是否存在（已暂存或工作区中存在）"""
+        key = self._key(file_path)
+        with self._lock:
+            if key in self._contents:
+                return True
+        return os.path.exists(key)
+
+    def read(self, file_path: str) -> str:
+        """读取文件内容，优先返回本事务中暂存的内容"""
+        key = self._key(file_path)
+        with self._lock:
+            if key in self._contents:
+                return self._contents[key]
+        with open(key, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def original(self, file_path: str) -> Optional[str]:
+        """获取文件在事务开始前的内容，文件原本不存在时返回 None"""
+        key = self._key(file_path)
+        with self._lock:
+            if key in self._originals:
+                return self._originals[key]
+        if not os.path.exists(key):
+            return None
+        with open(key, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def write(self, file_path: str, content: str) -> None:
+        """
+        暂存文件内容，工作区中的文件在 commit 之前不会改变
+
+        Args:
+            file_path: 目标文件路径
+            content: 文件内容
+        """
+        key = self._key(file_path)
+        original = None
+        capture_original = False
+        with self._lock:
+            if self.closed:
+                raise RuntimeError("文件事务已结束，不能继续写入")
+            if key not in self._originals:
+                capture_original = True
+            temp_path = self._staged.get(key) or os.path.join(self.staging_dir, f"{len(self._staged)}.tmp")
+            self._staged[key] = temp_path
+        if capture_original and os.path.exists(key):
+            with open(key, "r", encoding="utf-8") as f:
+                original = f.read()
+
+        os.makedirs(self.staging_dir, exist_ok=True)
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        with self._lock:
+            if capture_original:
+                self._originals.setdefault(key, original)
+            self._contents[key] = content
+
+    @property
+    def staged_files(self) -> List[str]:
+        """已暂存的目标文件路径"""
+        with self._lock:
+            return list(self._staged.keys())
+
+    def commit(self) -> None:
+        """
+        提交事务：把暂存文件刷盘，再逐个原子重命名到目标位置，最后刷新目标目录
+
+        重命名中途失败时，已替换的文件恢复为原来的内容，新建的文件被删除，然后抛出异常，
+        工作区与提交前一致。
+        """
+        with self._lock:
+            self.closed = True
+            staged = dict(self._staged)
+        try:
+            if not staged:
+                return
+            for temp_path in staged.values():
+                self._fsync_file(temp_path)
+            # 已替换的目标文件 -> 原文件的备份路径，文件原本不存在时为 None
+            replaced: Dict[str, Optional[str]] = {}
+            try:
+                for target, temp_path in staged.items():
+                    backup_path = self._backup(target, temp_path)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    os.replace(temp_path, target)
+                    replaced[target] = backup_path
+            except Exception:
+                self._restore(replaced)
+                raise
+            for directory in {os.path.dirname(target) for target in staged}:
+                self._fsync_dir(directory)
+            logger.info(f"文件事务已提交，共写入 {len(staged)} 个文件")
+        finally:
+            self._cleanup()
+
+    def rollback(self) -> None:
+        """回滚事务：丢弃所有暂存内容，工作区保持不变"""
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            count = len(self._staged)
+        self._cleanup()
+        if count:
+            logger.info(f"文件事务已回滚，丢弃了 {count} 个暂存文件")
+
+    @staticmethod
+    def _backup(target: str, temp_path: str) -> Optional[str]:
+        """在暂存目录中保留目标文件的原内容，用于替换失败时恢复，目标文件不存在时返回 None"""
+        if not os.path.exists(target):
+            return None
+        backup_path = f"{temp_path}.bak"
+        try:
+            # 硬链接不复制内容，替换目标文件后仍指向原来的内容
+            os.link(target, backup_path)
+        except OSError:
+            shutil.copy2(target, backup_path)
+        return backup_path
+
+    @staticmethod
+    def _restore(replaced: Dict[str, Optional[str]]) -> None:
+        """把已替换的文件恢复为原来的内容，删除新建的文件"""
+        for target, backup_path in replaced.items():
+            try:
+                if backup_path is None:
+                    os.remove(target)
+                else:
+                    os.replace(backup_path, target)
+            except OSError as e:
+                logger.error(f"恢复文件失败: {target}, 错误: {str(e)}")
+        if replaced:
+            logger.warning(f"文件事务提交失败，已恢复 {len(replaced)} 个已替换的文件")
+
+    @staticmethod
+    def _fsync_file(path: str) -> None:
+        """把单个文件的内容刷到磁盘"""
+        with open(path, "rb+") as f:
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _fsync_dir(directory: str) -> None:
+        """刷新目录项，使重命名持久化；不支持打开目录的平台（Windows）上跳过"""
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+    def _cleanup(self) -> None:
+        """删除本事务的暂存目录"""
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+        staging_root = os.path.dirname(self.staging_dir)
+        try:
+            os.rmdir(staging_root)
+        except OSError:
+            # 其他事务仍在使用或目录不存在
+            pass
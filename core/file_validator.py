@@ -0,0 +1,112 @@
+"""
+文件语法校验模块
+
+在修改写入工作区之前，对修改后的文件做快速的本地语法检查，发现损坏的文件时只需
+让模型重新生成该文件，而不是重新执行整轮代码生成。
+
+内置 Python、JSON、YAML、TOML 的校验，其他语言可以通过 register 注册校验函数。
+"""
+
+import ast
+import json
+import os
+
+from typing import Callable, Dict, Iterable, Optional
+
+from core.log_config import get_logger
+
+logger = get_logger(__name__)
+
+# 校验函数：接收文件内容，内容有效时返回 None，否则返回错误描述
+Validator = Callable[[str], Optional[str]]
+
+
+def validate_python(content: str) -> Optional[str]:
+    """使用 ast.parse 检查 Python 语法"""
+    try:
+        ast.parse(content)
+    except SyntaxError as e:
+        return f"Python 语法错误: 第 {e.lineno} 行: {e.msg}"
+    except ValueError as e:
+        return f"Python 语法错误: {str(e)}"
+    return None
+
+
+def validate_json(content: str) -> Optional[str]:
+    """检查 JSON 格式"""
+    try:
+        json.loads(content)
+    except json.JSONDecodeError as e:
+        return f"JSON 格式错误: 第 {e.lineno} 行: {e.msg}"
+    return None
+
+
+def validate_yaml(content: str) -> Optional[str]:
+    """检查 YAML 格式，支持多文档"""
+    import yaml
+
+    try:
+        for _ in yaml.safe_load_all(content):
+            pass
+    except yaml.YAMLError as e:
+        return f"YAML 格式错误: {str(e)}"
+    return None
+
+
+def validate_toml(content: str) -> Optional[str]:
+    """检查 TOML 格式"""
+    import toml
+
+    try:
+        toml.loads(content)
+    except toml.TomlDecodeError as e:
+        return f"TOML 格式错误: {str(e)}"
+    return None
+
+
+class FileValidator:
+    """按文件扩展名选择校验函数的文件校验器"""
+
+    def __init__(self):
+        # 扩展名（小写，包含点） -> 校验函数
+        self.validators: Dict[str, Validator] = {}
+        self.register([".py"], validate_python)
+        self.register([".json"], validate_json)
+        self.register([".yaml", ".yml"], validate_yaml)
+        self.register([".toml"], validate_toml)
+
+    def register(self, extensions: Iterable[str], validator: Validator) -> None:
+        """
+        注册校验函数，已注册的扩展名会被覆盖
+
+        Args:
+            extensions: 文件扩展名列表，例如 [".yaml", ".yml"]
+            validator: 校验函数
+        """
+        for extension in extensions:
+            self.validators[extension.lower()] = validator
+
+    def supports(self, file_path: str) -> bool:
+        """是否有适用于该文件的校验函数"""
+        return os.path.splitext(file_path)[1].lower() in self.validators
+
+    def validate(self, file_path: str, content: str) -> Optional[str]:
+        """
+        校验文件内容
+
+        Args:
+            file_path: 文件路径，用于选择校验函数
+            content: 文件内容
+
+        Returns:
+            Optional[str]: 错误描述，内容有效或没有适用的校验函数时返回 None
+        """
+        validator = self.validators.get(os.path.splitext(file_path)[1].lower())
+        if validator is None:
+            return None
+        try:
+            return validator(content)
+        except Exception as e:
+            # 校验函数本身出错时不阻止写入
+            logger.warning(f"校验文件失败: {file_path}, 错误: {str(e)}")
+            return None
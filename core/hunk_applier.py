@@ -0,0 +1,443 @@
+"""
+本地 unified diff 应用模块
+
+解析 diff 中的 @@ hunk，并直接应用到文件内容上，避免为每个文件额外请求一次模型。
+无法定位的 hunk 会原样返回，由调用方回退到模型处理。
+"""
+
+import re
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from core.log_config import get_logger
+
+logger = get_logger(__name__)
+
+HUNK_HEADER_PATTERN = re.compile(r'^@@\s*-(\d+)(?:,(\d+))?\s+\+(\d+)(?:,(\d+))?\s*@@')
+
+
+@dataclass
+class Hunk:
+    """单个 @@ hunk"""
+    old_start: int = 0  # 原文件起始行号（从1开始），0 表示未知
+    old_count: int = 0
+    new_start: int = 0
+    new_count: int = 0
+    lines: List[Tuple[str, str]] = field(default_factory=list)  # (标记, 行内容)，标记为 ' '、'-' 或 '+'
+    raw: str = ""  # hunk 的原始文本，用于回退到模型时构建提示词
+
+    @property
+    def old_lines(self) -> List[str]:
+        """应用前的行（上下文行与删除行）"""
+        return [text for tag, text in self.lines if tag != "+"]
+
+    @property
+    def new_lines(self) -> List[str]:
+        """应用后的行（上下文行与新增行）"""
+        return [text for tag, text in self.lines if tag != "-"]
+
+    @property
+    def is_pure_addition(self) -> bool:
+        """是否只包含新增行"""
+        return all(tag == "+" for tag, _ in self.lines)
+
+
+@dataclass
+class ApplyResult:
+    """hunk 应用结果"""
+    content: str
+    applied: List[Hunk] = field(default_factory=list)
+    failed: List[Hunk] = field(default_factory=list)
+
+
+def is_unified_diff(text: str) -> bool:
+    """
+    内容是否是 unified diff
+
+    来自 ```diff 代码块的内容（以 "diff" 行开头），或包含 @@ hunk 头、---/+++ 文件头的内容视为 diff；
+    File: 代码块和普通代码块是完整的文件内容。
+    """
+    lines = text.replace("\r\n", "\n").split("\n")
+    if lines[0] == "diff":
+        return True
+    for i, line in enumerate(lines):
+        if HUNK_HEADER_PATTERN.match(line):
+            return True
+        if line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            return True
+    return False
+
+
+def parse_hunks(diff_text: str) -> List[Hunk]:
+    """
+    从 diff 文本中解析所有 hunk
+
+    模型生成的 diff 行号经常不准确，因此这里只把 @@ 中的行号作为定位提示，
+    hunk 的范围以内容为准，不依赖行数统计。
+
+    只解析 @@ 头之后的行，不在任何 hunk 中的内容被忽略，没有 @@ 头的文本不会得到 hunk，
+    由调用方交给模型处理。
+
+    Args:
+        diff_text: diff 内容，可以包含 ---/+++ 文件头
+
+    Returns:
+        List[Hunk]: 解析得到的 hunk 列表
+    """
+    hunks: List[Hunk] = []
+    current: Optional[Hunk] = None
+    raw_lines: List[str] = []
+    lines = diff_text.replace("\r\n", "\n").split("\n")
+
+    def finish():
+        if current is None:
+            return
+        # 去掉末尾的空上下文行，它们通常是代码块结尾的空白
+        while current.lines and current.lines[-1] == (" ", ""):
+            current.lines.pop()
+        if current.lines:
+            current.raw = "\n".join(raw_lines).rstrip("\n")
+            hunks.append(current)
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        header = HUNK_HEADER_PATTERN.match(line)
+        if header:
+            finish()
+            current = Hunk(
+                old_start=int(header.group(1)),
+                old_count=int(header.group(2)) if header.group(2) is not None else 1,
+                new_start=int(header.group(3)),
+                new_count=int(header.group(4)) if header.group(4) is not None else 1,
+            )
+            raw_lines = [line]
+        elif line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            # 新的文件头，结束当前 hunk
+            finish()
+            current = None
+            i += 1
+        elif current is None and (line == "diff" or line.startswith(("diff --git", "index ", "--- ", "+++ ", "new file mode", "deleted file mode"))):
+            pass
+        elif line.startswith("\\"):
+            # "\ No newline at end of file"
+            pass
+        elif current is not None and (line[:1] in ("+", "-", " ") or line == ""):
+            tag = line[:1] or " "
+            current.lines.append((tag, line[1:]))
+            raw_lines.append(line)
+        i += 1
+    finish()
+    return hunks
+
+
+def _split_lines(content: str) -> Tuple[List[str], str, bool]:
+    """拆分文件内容，返回 (行列表, 换行符, 是否以换行结尾)"""
+    newline = "\r\n" if "\r\n" in content else "\n"
+    if content == "":
+        return [], newline, False
+    trailing_newline = content.endswith(newline)
+    if trailing_newline:
+        content = content[:-len(newline)]
+    return content.split(newline), newline, trailing_newline
+
+
+def _join_lines(lines: List[str], newline: str, trailing_newline: bool) -> str:
+    """拼接行列表"""
+    if not lines:
+        return ""
+    return newline.join(lines) + (newline if trailing_newline else "")
+
+
+def normalize_line(line: str) -> str:
+    """规范化行内容：去掉首尾空白并合并连续空白"""
+    return " ".join(line.split())
+
+
+class LineIndex:
+    """
+    文件行的哈希索引
+
+    以规范化后的行内容为键记录所有出现位置，查找 hunk 时从出现次数最少的行出发生成候选位置，
+    只需校验少量候选，避免在大文件上逐行滑动比较。
+    """
+
+    def __init__(self, lines: List[str]):
+        self.lines = lines
+        self.normalized = [normalize_line(line) for line in lines]
+        self.positions: Dict[str, List[int]] = {}
+        for i, key in enumerate(self.normalized):
+            self.positions.setdefault(key, []).append(i)
+
+    def find(self, block: List[str], exact: bool = True) -> List[int]:
+        """
+        查找 block 在文件中的所有起始位置
+
+        Args:
+            block: 要查找的连续行
+            exact: True 时要求逐字符相同，False 时忽略空白差异
+
+        Returns:
+            List[int]: 所有匹配的起始位置（从0开始）
+        """
+        size = len(block)
+        if size == 0 or size > len(self.lines):
+            return []
+        keys = [normalize_line(line) for line in block]
+
+        # 选择出现次数最少的行作为锚点
+        anchor, anchor_positions = 0, None
+        for offset, key in enumerate(keys):
+            positions = self.positions.get(key)
+            if not positions:
+                return []
+            if anchor_positions is None or len(positions) < len(anchor_positions):
+                anchor, anchor_positions = offset, positions
+                if len(positions) == 1:
+                    break
+
+        matches = []
+        for position in anchor_positions:
+            start = position - anchor
+            if start < 0 or start + size > len(self.lines):
+                continue
+            if exact:
+                if self.lines[start:start + size] == block:
+                    matches.append(start)
+            elif self.normalized[start:start + size] == keys:
+                matches.append(start)
+        return matches
+
+
+class HunkApplier:
+    """在本地将 hunk 应用到文件内容上"""
+
+    def __init__(self, fuzz: int = 2):
+        """
+        Args:
+            fuzz: 与 patch --fuzz 含义相同，定位时最多忽略 hunk 首尾各多少行上下文
+        """
+        self.fuzz = max(fuzz, 0)
+
+    def apply(self, original: str, hunks: List[Hunk]) -> ApplyResult:
+        """
+        应用 hunk，无法定位的 hunk 会被跳过并记录到结果中
+
+        所有 hunk 先在原文件上定位后统一应用；与其他 hunk 位置冲突的 hunk
+        （通常依赖前一个 hunk 的修改结果）会在修改后的内容上再定位一次。
+
+        Args:
+            original: 原文件内容
+            hunks: 要应用的 hunk 列表
+
+        Returns:
+            ApplyResult: 应用后的内容以及成功、失败的 hunk
+        """
+        lines, newline, trailing_newline = _split_lines(original)
+        if not lines:
+            trailing_newline = True
+        result = ApplyResult(content=original)
+
+        lines, deferred = self._apply_pass(lines, hunks, result)
+        if deferred:
+            lines, conflicted = self._apply_pass(lines, deferred, result)
+            result.failed.extend(conflicted)
+        # 保持 hunk 的原始顺序
+        order = {id(hunk): i for i, hunk in enumerate(hunks)}
+        result.applied.sort(key=lambda hunk: order[id(hunk)])
+        result.failed.sort(key=lambda hunk: order[id(hunk)])
+
+        result.content = _join_lines(lines, newline, trailing_newline)
+        if result.failed:
+            logger.info(f"本地应用 hunk: 成功 {len(result.applied)} 个，无法定位 {len(result.failed)} 个")
+        return result
+
+    def _apply_pass(self, lines: List[str], hunks: List[Hunk], result: ApplyResult) -> Tuple[List[str], List[Hunk]]:
+        """
+        在同一份内容上定位并应用一组 hunk
+
+        Returns:
+            Tuple[List[str], List[Hunk]]: 应用后的行列表，以及因位置冲突而推迟的 hunk
+        """
+        index = LineIndex(lines)
+        placements: List[Tuple[int, int, List[str], Hunk]] = []
+        deferred: List[Hunk] = []
+
+        for hunk in hunks:
+            placement = self._place(index, hunk)
+            if placement is None:
+                result.failed.append(hunk)
+                continue
+            start, end, replacement = placement
+            if any(start < other_end and other_start < end or
+                   start == end == other_start or other_start == other_end == start
+                   for other_start, other_end, _, _ in placements):
+                deferred.append(hunk)
+                continue
+            placements.append((start, end, replacement, hunk))
+
+        # 从后往前替换，避免行号偏移
+        lines = list(lines)
+        for start, end, replacement, hunk in sorted(placements, key=lambda p: (p[0], p[1]), reverse=True):
+            lines[start:end] = replacement
+        result.applied.extend(hunk for _, _, _, hunk in placements)
+        return lines, deferred
+
+    def _place(self, index: LineIndex, hunk: Hunk) -> Optional[Tuple[int, int, List[str]]]:
+        """
+        定位单个 hunk
+
+        依次尝试 fuzz 0..N：每一级先精确匹配，再忽略空白匹配。
+
+        Returns:
+            Optional[Tuple[int, int, List[str]]]: (起始行, 结束行, 替换内容)，无法定位时返回 None
+        """
+        lines = index.lines
+        hint = self._hint(hunk)
+        if not hunk.old_lines:
+            # 没有上下文的纯新增 hunk 只能依靠行号定位，而模型给出的行号经常不准确，
+            # 只在文件为空，或 @@ 明确表示插入位置（-N,0 表示插入到第 N 行之后）时接受，否则交给模型处理
+            if not lines:
+                return 0, 0, hunk.new_lines
+            if hunk.old_count == 0 and 0 <= hunk.old_start <= len(lines):
+                return hunk.old_start, hunk.old_start, hunk.new_lines
+            return None
+
+        for fuzz in range(self.fuzz + 1):
+            trimmed = self._trim_context(hunk.lines, fuzz)
+            if trimmed is None:
+                break
+            block = [text for tag, text in trimmed if tag != "+"]
+            if not block:
+                break
+            for exact in (True, False):
+                start = self._choose(index.find(block, exact=exact), hint)
+                if start is not None:
+                    if fuzz or not exact:
+                        logger.debug(f"hunk 以 fuzz={fuzz}、{'精确' if exact else '忽略空白'}匹配定位到第 {start + 1} 行")
+                    return start, start + len(block), self._replacement(lines[start:start + len(block)], trimmed)
+        return None
+
+    @staticmethod
+    def _trim_context(hunk_lines: List[Tuple[str, str]], fuzz: int) -> Optional[List[Tuple[str, str]]]:
+        """去掉 hunk 首尾各最多 fuzz 行上下文，没有可去掉的上下文时返回 None"""
+        if fuzz == 0:
+            return hunk_lines
+        head = 0
+        while head < fuzz and head < len(hunk_lines) and hunk_lines[head][0] == " ":
+            head += 1
+        tail = 0
+        while tail < fuzz and tail < len(hunk_lines) - head and hunk_lines[-1 - tail][0] == " ":
+            tail += 1
+        if head < fuzz and tail < fuzz:
+            # 与上一级相比没有新的上下文被去掉
+            return None
+        return hunk_lines[head:len(hunk_lines) - tail]
+
+    @staticmethod
+    def _replacement(matched: List[str], hunk_lines: List[Tuple[str, str]]) -> List[str]:
+        """生成替换内容，上下文行保留文件中的原始内容（包括原有的空白）"""
+        replacement = []
+        position = 0
+        for tag, text in hunk_lines:
+            if tag == "+":
+                replacement.append(text)
+                continue
+            if tag == " ":
+                replacement.append(matched[position])
+            position += 1
+        return replacement
+
+    @staticmethod
+    def _choose(matches: List[int], hint: Optional[int]) -> Optional[int]:
+        """从多个匹配中选择离行号提示最近的一个；没有行号提示且存在多处匹配时视为无法定位"""
+        if not matches:
+            return None
+        if hint is None:
+            return matches[0] if len(matches) == 1 else None
+        return min(matches, key=lambda start: abs(start - hint))
+
+    @staticmethod
+    def new_file_content(hunks: List[Hunk]) -> Optional[str]:
+        """
+        根据只包含新增行的 hunk 生成新文件内容
+
+        Returns:
+            Optional[str]: 新文件内容，如果 hunk 中包含上下文或删除行则返回 None
+        """
+        if not hunks or not all(hunk.is_pure_addition for hunk in hunks):
+            return None
+        lines = [text for hunk in hunks for text in hunk.new_lines]
+        return _join_lines(lines, "\n", True)
+
+    @staticmethod
+    def _hint(hunk: Hunk) -> Optional[int]:
+        """根据 @@ 行号计算原文件中期望的起始位置（从0开始）"""
+        if hunk.old_start <= 0:
+            return None
+        return hunk.old_start - 1
+
+    def estimate_regions(self, content: str, hunks: List[Hunk]) -> List[Optional[Tuple[int, int]]]:
+        """
+        估计无法精确定位的 hunk 在文件中的大致范围，用于只把相关片段交给模型处理
+
+        以 hunk 中在文件里出现次数最少的行作为锚点，多处出现时选择离 @@ 行号最近的位置；
+        没有任何行能在文件中找到时退回到 @@ 行号。
+
+        Args:
+            content: 文件内容
+            hunks: 需要估计范围的 hunk 列表
+
+        Returns:
+            List[Optional[Tuple[int, int]]]: 每个 hunk 的 (起始行, 结束行)，无法估计时为 None
+        """
+        lines, _, _ = _split_lines(content)
+        index = LineIndex(lines)
+        regions: List[Optional[Tuple[int, int]]] = []
+        for hunk in hunks:
+            old_lines = hunk.old_lines
+            hint = self._hint(hunk)
+            anchor, anchor_positions = 0, None
+            for offset, line in enumerate(old_lines):
+                key = normalize_line(line)
+                positions = index.positions.get(key)
+                if not key or not positions:
+                    continue
+                if anchor_positions is None or len(positions) < len(anchor_positions):
+                    anchor, anchor_positions = offset, positions
+            if anchor_positions is not None:
+                starts = [position - anchor for position in anchor_positions]
+                start = self._choose(starts, hint)
+            else:
+                start = hint if hint is not None and hint < len(lines) else None
+            if start is None:
+                regions.append(None)
+                continue
+            start = min(max(start, 0), len(lines))
+            regions.append((start, min(start + len(old_lines), len(lines))))
+        return regions
+
+    @staticmethod
+    def region_text(content: str, start: int, end: int) -> str:
+        """获取文件内容中 [start, end) 行的文本"""
+        lines, _, _ = _split_lines(content)
+        return "\n".join(lines[start:end])
+
+    @staticmethod
+    def splice(content: str, replacements: List[Tuple[int, int, str]]) -> str:
+        """
+        将多个行范围替换为新的文本
+
+        Args:
+            content: 文件内容
+            replacements: (起始行, 结束行, 新文本) 列表，范围之间不能重叠
+
+        Returns:
+            str: 替换后的文件内容
+        """
+        lines, newline, trailing_newline = _split_lines(content)
+        for start, end, text in sorted(replacements, key=lambda item: item[0], reverse=True):
+            new_lines, _, _ = _split_lines(text.replace("\r\n", "\n"))
+            lines[start:end] = new_lines
+        return _join_lines(lines, newline, trailing_newline)
@@ -0,0 +1,147 @@
+"""
+Python 导入图模块
+
+在本地分析 Python 文件的公开符号（顶层类、函数和变量）以及导入的项目内模块，
+用于在文件的公开符号发生变化时，找出引用了这些符号的依赖文件，刷新它们的描述。
+"""
+
+import ast
+import os
+import re
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+
+from core.log_config import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class ModuleInfo:
+    """单个 Python 文件的分析结果"""
+    public_symbols: Set[str] = field(default_factory=set)
+    # 导入的模块名，相对导入已经解析为绝对模块名
+    imports: Set[str] = field(default_factory=set)
+
+
+def module_name(filepath: str) -> Optional[str]:
+    """项目内 Python 文件对应的模块名，例如 core/ai.py -> core.ai，core/__init__.py -> core"""
+    if not filepath.endswith(".py"):
+        return None
+    parts = filepath[:-3].replace(os.sep, "/").split("/")
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts) if parts else None
+
+
+def _resolve_relative(filepath: str, level: int, module: Optional[str]) -> Optional[str]:
+    """将相对导入解析为绝对模块名"""
+    package = filepath.replace(os.sep, "/").split("/")[:-1]
+    if level > 1:
+        if level - 1 > len(package):
+            return None
+        package = package[:len(package) - (level - 1)]
+    parts = package + (module.split(".") if module else [])
+    return ".".join(parts) if parts else None
+
+
+def analyze_python(filepath: str, content: str) -> Optional[ModuleInfo]:
+    """
+    分析 Python 文件的公开符号和导入
+
+    Args:
+        filepath: 相对于项目根目录的文件路径，用于解析相对导入
+        content: 文件内容
+
+    Returns:
+        Optional[ModuleInfo]: 分析结果，无法解析时返回 None
+    """
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return None
+
+    info = ModuleInfo()
+    for node in tree.body:
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            info.public_symbols.add(node.name)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            info.public_symbols.update(target.id for target in targets if isinstance(target, ast.Name))
+    info.public_symbols = {name for name in info.public_symbols if not name.startswith("_")}
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            info.imports.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = _resolve_relative(filepath, node.level, node.module) if node.level else node.module
+            if not base:
+                continue
+            info.imports.add(base)
+            # from package import submodule
+            info.imports.update(f"{base}.{alias.name}" for alias in node.names if alias.name != "*")
+    return info
+
+
+class ImportGraph:
+    """项目内 Python 文件之间的导入关系"""
+
+    def __init__(self, modules: Dict[str, ModuleInfo]):
+        """
+        Args:
+            modules: 文件路径到分析结果的映射
+        """
+        # 模块名 -> 文件路径，同时支持 src 布局中去掉 src. 前缀的模块名
+        self.module_paths: Dict[str, str] = {}
+        for filepath in modules:
+            name = module_name(filepath)
+            if name:
+                self.module_paths[name] = filepath
+                if name.startswith("src."):
+                    self.module_paths.setdefault(name[len("src."):], filepath)
+
+        # 文件路径 -> 导入它的文件路径
+        self.dependents: Dict[str, Set[str]] = {}
+        for filepath, info in modules.items():
+            for imported in info.imports:
+                target = self.module_paths.get(imported)
+                if target and target != filepath:
+                    self.dependents.setdefault(target, set()).add(filepath)
+
+    def get_dependents(self, filepath: str) -> Set[str]:
+        """直接导入该文件的文件"""
+        return self.dependents.get(filepath, set())
+
+
+def mentions_any(text: str, symbols: Iterable[str]) -> bool:
+    """文本中是否以完整标识符的形式出现任一符号；中文与英文标识符相邻时同样能够识别"""
+    return any(re.search(rf"(?<![A-Za-z0-9_]){re.escape(symbol)}(?![A-Za-z0-9_])", text) for symbol in symbols)
+
+
+def find_stale_dependents(graph: ImportGraph, removed_symbols: Dict[str, Set[str]],
+                          descriptions: Dict[str, str], max_per_file: int) -> List[str]:
+    """
+    找出描述中引用了已删除或重命名的公开符号的直接依赖文件
+
+    Args:
+        graph: 导入图
+        removed_symbols: 文件路径到其不再存在的公开符号的映射
+        descriptions: 现有的文件描述
+        max_per_file: 每个变化的文件最多刷新的依赖文件数
+
+    Returns:
+        List[str]: 需要刷新描述的文件
+    """
+    stale = []
+    for filepath, symbols in sorted(removed_symbols.items()):
+        if not symbols:
+            continue
+        matched = [
+            dependent for dependent in sorted(graph.get_dependents(filepath))
+            if dependent in descriptions and mentions_any(descriptions[dependent], symbols)
+        ]
+        if len(matched) > max_per_file:
+            logger.info(f"{filepath} 有 {len(matched)} 个依赖文件引用了变化的符号，只刷新前 {max_per_file} 个")
+        stale.extend(matched[:max_per_file])
+    return list(dict.fromkeys(stale))
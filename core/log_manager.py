@@ -6,6 +6,7 @@ from dataclasses import dataclass, field
 from typing import List, Optional
 from pydantic import BaseModel
 
+from core.blob_store import BlobStore
 from core.diff import DiffInfo
 from core.log_config import get_logger
 
@@ -69,6 +70,9 @@ class LogManager:
             self.logs_path, "#" + str(self.issue_id), self.rollback_dir
         )
 
+        # 文件原始内容按内容哈希保存，修改日志中只记录引用
+        self.blob_store = BlobStore(self.config.project_dir)
+
         # 初始化当前轮次
         self.current_round = self._get_next_round()
 
@@ -125,8 +129,14 @@ class LogManager:
 
         # 保存修改的文件列表
         if diff_infos:
-            # 使用 Pydantic 的 dict 方法进行序列化
-            diff_dicts = [diff.dict() for diff in diff_infos]
+            # 使用 Pydantic 的 dict 方法进行序列化，文件原始内容存入 BlobStore，只保留引用
+            diff_dicts = []
+            for diff in diff_infos:
+                diff_dict = diff.dict()
+                if diff_dict["file_content"]:
+                    diff_dict["file_content_ref"] = self.blob_store.put(diff_dict["file_content"])
+                    diff_dict["file_content"] = ""
+                diff_dicts.append(diff_dict)
                 
             # 序列化为 JSON 并保存
             with open(os.path.join(round_dir, self.MODIFIED_FILES_FILE), "w", encoding="utf-8") as f:
@@ -139,6 +149,22 @@ class LogManager:
         # 返回存档目录的路径
         return round_dir
 
+    def resolve_file_content(self, diff_info: DiffInfo) -> Optional[str]:
+        """
+        获取修改信息中文件的原始内容，按需从 BlobStore 读取
+
+        旧版本的日志直接保存了 file_content，这种情况下原样返回。
+
+        Args:
+            diff_info: 文件的修改信息
+
+        Returns:
+            Optional[str]: 文件的原始内容，引用的内容不存在时返回 None
+        """
+        if diff_info.file_content_ref:
+            return self.blob_store.get(diff_info.file_content_ref)
+        return diff_info.file_content
+
     def _get_next_round(self) -> int:
         """
         获取下一个轮次号
@@ -0,0 +1,246 @@
+"""
+进程级请求限流与重试模块
+
+同一个模型服务的所有 AIAssistant 共享一个令牌桶和重试策略：
+- 令牌桶限制每分钟请求数，也作为 ChatOpenAI 的 rate_limiter，agent 内部的每次模型调用同样受限
+- 可重试的错误按指数退避加随机抖动重试，服务端返回 Retry-After 时以其为准
+- 收到 429 时暂停整个令牌桶，并发的请求一起放慢，而不是各自继续请求
+"""
+
+import asyncio
+import email.utils
+import random
+import threading
+import time
+
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+import openai
+
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from core.log_config import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# 可以重试的 HTTP 状态码
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+class TokenBucket(BaseRateLimiter):
+    """线程安全的令牌桶，速率为 0 时不限制请求数，只在暂停期间阻塞"""
+
+    def __init__(self, requests_per_second: float = 0, capacity: Optional[float] = None):
+        """
+        Args:
+            requests_per_second: 每秒补充的令牌数，0 表示不限制
+            capacity: 桶容量，即允许的突发请求数，默认为一秒的令牌数
+        """
+        self._lock = threading.Lock()
+        self.requests_per_second = 0.0
+        self.capacity = 1.0
+        self._tokens = 0.0
+        self._last = time.monotonic()
+        # 收到 429 后暂停到这个时间点（time.monotonic）
+        self._paused_until = 0.0
+        self.set_rate(requests_per_second, capacity)
+        # 新建的桶是满的
+        self._tokens = self.capacity
+
+    def set_rate(self, requests_per_second: float, capacity: Optional[float] = None) -> None:
+        """修改令牌补充速率"""
+        with self._lock:
+            # 先按原速率结算已经补充的令牌，再修改速率
+            now = time.monotonic()
+            if self.requests_per_second > 0:
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.requests_per_second)
+            self._last = now
+            self.requests_per_second = max(requests_per_second, 0.0)
+            self.capacity = capacity if capacity is not None else max(self.requests_per_second, 1.0)
+            # 只按新容量截断，已耗尽的桶不会因为修改速率而获得额外的突发请求
+            self._tokens = min(self._tokens, self.capacity)
+
+    def pause(self, seconds: float) -> None:
+        """在 seconds 秒内阻塞所有请求"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def wait_until_resumed(self) -> None:
+        """阻塞到暂停结束，不消耗令牌"""
+        while True:
+            with self._lock:
+                wait = self._paused_until - time.monotonic()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def _try_acquire(self) -> float:
+        """尝试获取一个令牌，成功时返回 0，否则返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self.requests_per_second <= 0:
+                return 0.0
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.requests_per_second)
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.requests_per_second
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        while True:
+            wait = self._try_acquire()
+            if wait <= 0:
+                return True
+            if not blocking:
+                return False
+            time.sleep(wait)
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        while True:
+            wait = self._try_acquire()
+            if wait <= 0:
+                return True
+            if not blocking:
+                return False
+            await asyncio.sleep(wait)
+
+
+class RetryPolicy:
+    """指数退避加随机抖动的重试策略"""
+
+    def __init__(self, base_delay: float = 1.0, max_delay: float = 60.0):
+        """
+        Args:
+            base_delay: 第一次重试的最大等待秒数
+            max_delay: 单次等待的上限
+        """
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        """是否是限流、超时、连接错误或服务端错误等可以重试的错误"""
+        if isinstance(error, openai.APIConnectionError):
+            return True
+        if isinstance(error, openai.APIStatusError):
+            return error.status_code in RETRYABLE_STATUS_CODES or error.status_code >= 500
+        return False
+
+    @staticmethod
+    def is_rate_limited(error: Exception) -> bool:
+        """是否是 429 限流错误"""
+        return isinstance(error, openai.APIStatusError) and error.status_code == 429
+
+    @staticmethod
+    def retry_after(error: Exception) -> Optional[float]:
+        """读取错误响应中的 Retry-After（秒或 HTTP 日期），没有时返回 None"""
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        if not headers:
+            return None
+        retry_after_ms = headers.get("retry-after-ms")
+        if retry_after_ms:
+            try:
+                return max(float(retry_after_ms) / 1000, 0.0)
+            except ValueError:
+                pass
+        retry_after = headers.get("retry-after")
+        if not retry_after:
+            return None
+        try:
+            return max(float(retry_after), 0.0)
+        except ValueError:
+            pass
+        try:
+            retry_time = email.utils.parsedate_to_datetime(retry_after)
+        except (TypeError, ValueError):
+            return None
+        return max(retry_time.timestamp() - time.time(), 0.0)
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次重试（从0开始）的等待秒数，在 [0, base * 2^attempt] 中随机选择"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def delay(self, attempt: int, error: Exception) -> float:
+        """重试前的等待秒数，优先使用服务端返回的 Retry-After"""
+        retry_after = self.retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return self.backoff(attempt)
+
+
+class RateLimiter:
+    """令牌桶与重试策略的组合，同一个模型服务的所有请求共享"""
+
+    def __init__(self, bucket: Optional[TokenBucket] = None, policy: Optional[RetryPolicy] = None):
+        self.bucket = bucket or TokenBucket()
+        self.policy = policy or RetryPolicy()
+
+    def call(self, func: Callable[[], T], max_retries: int = 3,
+             retry_if: Optional[Callable[[Exception], bool]] = None) -> T:
+        """
+        执行请求，失败时按重试策略重试
+
+        请求本身的令牌由 ChatOpenAI 通过 rate_limiter 获取，这里只负责重试和 429 时的全局暂停。
+
+        Args:
+            func: 发出请求的函数
+            max_retries: 最大重试次数
+            retry_if: 额外的重试条件，例如流式输出已经产生内容时不再重试
+
+        Returns:
+            func 的返回值
+        """
+        attempt = 0
+        while True:
+            try:
+                return func()
+            except Exception as e:
+                if (attempt >= max_retries or not self.policy.is_retryable(e)
+                        or (retry_if is not None and not retry_if(e))):
+                    raise
+                delay = self.policy.delay(attempt, e)
+                attempt += 1
+                logger.warning(f"请求失败，{delay:.1f} 秒后进行第 {attempt} 次重试: {str(e)}")
+                if self.policy.is_rate_limited(e):
+                    # 暂停共享的令牌桶，所有并发请求一起等待；重试的令牌由 ChatOpenAI 获取，这里不消耗令牌
+                    self.bucket.pause(delay)
+                    self.bucket.wait_until_resumed()
+                else:
+                    time.sleep(delay)
+
+
+_limiters: Dict[Tuple[Optional[str], Optional[str]], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(base_url: Optional[str] = None, api_key: Optional[str] = None,
+                     requests_per_minute: float = 0) -> RateLimiter:
+    """
+    获取模型服务对应的进程级共享限流器
+
+    同一个服务配置了不同的每分钟请求数时，使用其中最小的非零值。
+
+    Args:
+        base_url: 模型服务地址，None 表示默认服务
+        api_key: API 密钥，不同密钥的配额相互独立
+        requests_per_minute: 每分钟请求数上限，0 表示不限制
+
+    Returns:
+        RateLimiter: 共享的限流器
+    """
+    key = (base_url, api_key)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = RateLimiter()
+        requests_per_second = requests_per_minute / 60
+        current = limiter.bucket.requests_per_second
+        if requests_per_second > 0 and (current <= 0 or requests_per_second < current):
+            limiter.bucket.set_rate(requests_per_second)
+        return limiter
@@ -0,0 +1,183 @@
+"""
+静态文件描述模块
+
+不调用模型，直接从源码结构生成文件描述：模块文档字符串、顶层的类和函数以及导入的模块。
+作为 FileMemory 的第一层，只有静态分析无法给出足够描述的文件才需要请求模型，
+冷启动时大部分文件可以在几秒内完成描述。
+
+内置 Python 的描述函数，其他语言可以通过 register 注册。
+"""
+
+import ast
+import os
+import pickle
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+from core.log_config import get_logger
+
+logger = get_logger(__name__)
+
+# 描述函数：接收文件内容，能够给出足够的描述时返回描述，否则返回 None
+Describer = Callable[[str], Optional[str]]
+
+# 描述中的摘要和名称列表长度限制
+MAX_SUMMARY_CHARS = 80
+MAX_NAMES = 8
+# 文件数少于该值时直接在当前进程中处理，避免启动进程池的开销
+MIN_FILES_FOR_PROCESS_POOL = 32
+
+
+def _summary(docstring: Optional[str]) -> str:
+    """取文档字符串的第一段作为摘要"""
+    if not docstring:
+        return ""
+    paragraph = docstring.strip().split("\n\n", 1)[0]
+    summary = " ".join(paragraph.split())
+    if len(summary) > MAX_SUMMARY_CHARS:
+        summary = summary[:MAX_SUMMARY_CHARS] + "..."
+    return summary
+
+
+def _names(names: List[str]) -> str:
+    text = "、".join(names[:MAX_NAMES])
+    return text + " 等" if len(names) > MAX_NAMES else text
+
+
+def describe_python(content: str) -> Optional[str]:
+    """
+    根据模块文档字符串、顶层定义和导入生成 Python 文件的描述
+
+    没有模块文档字符串时使用第一个带文档字符串的顶层类或函数作为摘要；
+    两者都没有或文件无法解析时返回 None，交给模型描述。
+    """
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return None
+
+    classes, functions, imports = [], [], []
+    summary = _summary(ast.get_docstring(tree))
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            classes.append(node.name)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            functions.append(node.name)
+        elif isinstance(node, ast.Import):
+            imports.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            imports.append(node.module)
+        else:
+            continue
+        if not summary and isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            docstring = _summary(ast.get_docstring(node))
+            if docstring:
+                summary = f"{node.name}: {docstring}"
+
+    if not summary:
+        return None
+
+    parts = [summary]
+    public_classes = [name for name in classes if not name.startswith("_")]
+    public_functions = [name for name in functions if not name.startswith("_")]
+    if public_classes:
+        parts.append(f"定义类 {_names(public_classes)}")
+    if public_functions:
+        parts.append(f"定义函数 {_names(public_functions)}")
+    if imports:
+        parts.append(f"依赖 {_names(list(dict.fromkeys(imports)))}")
+    return "；".join(parts)
+
+
+class StaticDescriber:
+    """按文件扩展名选择描述函数的静态描述器"""
+
+    def __init__(self):
+        # 扩展名（小写，包含点） -> 描述函数
+        self.describers: Dict[str, Describer] = {}
+        self.register([".py", ".pyi"], describe_python)
+
+    def register(self, extensions: Iterable[str], describer: Describer) -> None:
+        """
+        注册描述函数，已注册的扩展名会被覆盖
+
+        Args:
+            extensions: 文件扩展名列表，例如 [".js", ".mjs"]
+            describer: 描述函数
+        """
+        for extension in extensions:
+            self.describers[extension.lower()] = describer
+
+    def supports(self, file_path: str) -> bool:
+        """是否有适用于该文件的描述函数"""
+        return os.path.splitext(file_path)[1].lower() in self.describers
+
+    def describe(self, file_path: str, content: str) -> Optional[str]:
+        """
+        生成文件描述
+
+        Args:
+            file_path: 文件路径，用于选择描述函数
+            content: 文件内容
+
+        Returns:
+            Optional[str]: 描述，没有适用的描述函数或无法给出足够的描述时返回 None
+        """
+        describer = self.describers.get(os.path.splitext(file_path)[1].lower())
+        if describer is None:
+            return None
+        try:
+            return describer(content)
+        except Exception as e:
+            logger.warning(f"静态描述文件失败: {file_path}, 错误: {str(e)}")
+            return None
+
+
+default_describer = StaticDescriber()
+
+
+def _init_worker(describers: Dict[str, Describer]) -> None:
+    """进程池工作进程的初始化函数，使用父进程中注册的描述函数"""
+    default_describer.describers = describers
+
+
+def _describe(file_info: Dict[str, str]) -> Optional[str]:
+    return default_describer.describe(file_info["filepath"], file_info["content"])
+
+
+def describe_files(files_with_content: List[Dict[str, str]], max_workers: Optional[int] = None,
+                   mp_context=None) -> Dict[str, str]:
+    """
+    在进程池中为多个文件生成静态描述
+
+    运行时通过 default_describer.register 注册的描述函数会传给工作进程，spawn 方式启动的进程
+    （macOS、Windows 的默认方式）也能使用；描述函数无法序列化（例如 lambda）时在当前进程中处理。
+
+    Args:
+        files_with_content: 包含文件路径和内容的列表
+        max_workers: 最大进程数，默认为 CPU 数
+        mp_context: 进程池使用的 multiprocessing 上下文，默认为平台的默认方式
+
+    Returns:
+        Dict[str, str]: 能够静态描述的文件路径到描述的映射
+    """
+    files = [file_info for file_info in files_with_content if default_describer.supports(file_info["filepath"])]
+    describers = dict(default_describer.describers)
+    use_pool = len(files) >= MIN_FILES_FOR_PROCESS_POOL
+    if use_pool:
+        try:
+            pickle.dumps(describers)
+        except Exception as e:
+            logger.warning(f"描述函数无法传给进程池，在当前进程中处理: {str(e)}")
+            use_pool = False
+    if not use_pool:
+        results = [_describe(file_info) for file_info in files]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context,
+                                 initializer=_init_worker, initargs=(describers,)) as executor:
+            results = list(executor.map(_describe, files, chunksize=16))
+    return {
+        file_info["filepath"]: description
+        for file_info, description in zip(files, results) if description
+    }
@@ -0,0 +1,89 @@
+"""
+Token 计数模块
+
+用于估算文本发送给模型时占用的 token 数，以便按 token 预算而不是字符数组织请求。
+
+- HeuristicTokenCounter: 默认的离线估算，不依赖分词器文件，对中日韩等非 ASCII 字符按每字符一个 token 计算
+- TiktokenCounter: 使用 tiktoken 精确计数，需要安装 tiktoken 且能加载对应的编码
+"""
+
+import math
+
+from typing import Optional, Protocol
+
+from core.log_config import get_logger
+
+logger = get_logger(__name__)
+
+
+class TokenCounter(Protocol):
+    """token 计数接口"""
+
+    def count(self, text: str) -> int:
+        """返回文本的 token 数"""
+        ...
+
+
+class HeuristicTokenCounter:
+    """
+    基于字符类别的 token 估算
+
+    ASCII 文本（英文和代码）平均约 3.5 个字符一个 token；中日韩字符在常见的 BPE 分词器中
+    通常一个字符对应一到两个 token，按字符数估算可以避免中文较多的文件超出上下文。
+    """
+
+    def __init__(self, ascii_chars_per_token: float = 3.5, non_ascii_tokens_per_char: float = 1.0):
+        """
+        Args:
+            ascii_chars_per_token: 每个 token 对应的 ASCII 字符数
+            non_ascii_tokens_per_char: 每个非 ASCII 字符对应的 token 数
+        """
+        self.ascii_chars_per_token = ascii_chars_per_token
+        self.non_ascii_tokens_per_char = non_ascii_tokens_per_char
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        ascii_chars = len(text.encode("ascii", "ignore"))
+        non_ascii_chars = len(text) - ascii_chars
+        return math.ceil(ascii_chars / self.ascii_chars_per_token
+                         + non_ascii_chars * self.non_ascii_tokens_per_char)
+
+
+class TiktokenCounter:
+    """使用 tiktoken 的精确计数"""
+
+    def __init__(self, model: Optional[str] = None, encoding_name: str = "cl100k_base"):
+        """
+        Args:
+            model: 模型名称，tiktoken 能识别时使用该模型的编码
+            encoding_name: 无法识别模型时使用的编码
+        """
+        import tiktoken
+
+        try:
+            self.encoding = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding(encoding_name)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding(encoding_name)
+
+    def count(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+
+def get_token_counter(model: Optional[str] = None, use_tiktoken: bool = False) -> TokenCounter:
+    """
+    获取 token 计数器
+
+    Args:
+        model: 模型名称
+        use_tiktoken: 是否尝试使用 tiktoken，未安装或无法加载编码（例如离线环境）时退回估算
+
+    Returns:
+        TokenCounter: token 计数器
+    """
+    if use_tiktoken:
+        try:
+            return TiktokenCounter(model)
+        except Exception as e:
+            logger.warning(f"无法使用 tiktoken 计数，改为估算: {str(e)}")
+    return HeuristicTokenCounter()
@@ -38,7 +38,8 @@ class VersionInfo:
 class VersionManager:
     """管理代码生成的版本信息，支持版本回退和需求整合"""
 
-    def __init__(self, issue_id: int, ai_config: AIConfig, log_manager: LogManager, git_manager: GitManager, file_memory=None):
+    def __init__(self, issue_id: int, ai_config: AIConfig, log_manager: LogManager, git_manager: GitManager, file_memory=None,
+                 file_index=None):
         """
         初始化版本管理器
         
@@ -48,9 +49,11 @@ class VersionManager:
             log_manager: 日志管理器实例 
             git_manager: Git管理器实例
             file_memory: 文件内存管理器实例(可选)
+            file_index: 共享的文件索引(可选)，回退版本后失效
         """
         self.ai_assistant = AIAssistant(config=ai_config, tools=[self._create_version_manager_tool()])
         self.file_memory = file_memory
+        self.file_index = file_index
         self.log_manager = log_manager
         self.git_manager = git_manager
         self.current_issue_id = issue_id
@@ -276,20 +279,22 @@ class VersionManager:
                     
                     elif diff_info.is_modify:
                         # 如果是修改操作，则恢复到修改前的内容
-                        if diff_info.file_content is not None:
+                        file_content = self.log_manager.resolve_file_content(diff_info)
+                        if file_content is not None:
                             os.makedirs(os.path.dirname(file_path), exist_ok=True)
                             with open(file_path, "w", encoding="utf-8") as f:
-                                f.write(diff_info.file_content)
+                                f.write(file_content)
                             logger.info(f"恢复文件 {diff_info.file_name} 到轮次 {entry.round_num} 修改前的状态")
                         else:
                             logger.warning(f"文件 {diff_info.file_name} 没有保存修改前的内容，无法回滚")
                     
                     elif diff_info.is_delete:
                         # 如果是删除操作，则恢复文件
-                        if diff_info.file_content is not None:
+                        file_content = self.log_manager.resolve_file_content(diff_info)
+                        if file_content is not None:
                             os.makedirs(os.path.dirname(file_path), exist_ok=True)
                             with open(file_path, "w", encoding="utf-8") as f:
-                                f.write(diff_info.file_content)
+                                f.write(file_content)
                             logger.info(f"恢复文件 {diff_info.file_name}，回滚轮次 {entry.round_num} 的删除操作")
                         else:
                             logger.warning(f"文件 {diff_info.file_name} 没有保存删除前的内容，无法回滚")
@@ -357,6 +362,9 @@ class VersionManager:
             
             if need_rollback and target_round is not None:
                 success = self._rollback_to_version(target_round)
+                if self.file_index:
+                    # 回退会恢复、删除文件
+                    self.file_index.invalidate()
                 if success:
                     # 如果是全量回滚且没有整合需求，需要添加背景信息
                     final_integrated_requirement = integrated_requirement
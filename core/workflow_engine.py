@@ -11,6 +11,7 @@ from core.code_engineer import CodeEngineer, CodeEngineerConfig
 from core.comment_formatter import CommentFormatter
 from core.decision import DecisionProcess
 from core.diff import Diff
+from core.file_index import FileIndex
 from core.file_memory import FileMemory, FileMemoryConfig
 from core.file_selector import FileSelector
 from core.git_manager import GitManager, GitConfig
@@ -36,6 +37,10 @@ class WorkflowEngineConfig:
     api_key: Optional[str] = None
     github_remote_url: Optional[str] =None
     github_token: Optional[str] = None
+    max_concurrency: int = 4 # 同时处理的文件修改数
+    edit_format: str = "diff" # ["diff", "search_replace"] 模型输出代码修改的格式
+    requests_per_minute: float = 0 # 每分钟最多发出的模型请求数，0 表示不限制
+    file_select_top_k: int = 150 # 选择文件时按 BM25 预先筛选后交给模型的候选文件数，0 表示不筛选
 
 
 class WorkflowEngine:
@@ -82,14 +87,17 @@ class WorkflowEngine:
             model_name=config.core_model,
             temperature=config.core_template,
             base_url=config.base_url,
-            api_key=config.api_key
+            api_key=config.api_key,
+            requests_per_minute=config.requests_per_minute
         )
         
         self.data_ai_config = AIConfig(
             model_name=config.data_model,
             temperature=config.data_template,
             base_url=config.base_url,
-            api_key=config.api_key
+            api_key=config.api_key,
+            max_concurrency=config.max_concurrency,
+            requests_per_minute=config.requests_per_minute
         )
         
         # 创建Git配置
@@ -122,6 +130,9 @@ class WorkflowEngine:
                 raise
 
         self.log_manager = LogManager(config=self.log_config)
+
+        # 所有组件共享的文件索引，一次需求处理中只列举一次文件树
+        self.file_index = FileIndex(self.project_dir)
         
         # 初始化文件记忆管理，传入log_manager
         self.file_memory = FileMemory(
@@ -129,7 +140,8 @@ class WorkflowEngine:
                 git_manager=self.git_manager,
                 ai_config=self.data_ai_config,
                 project_dir=self.project_dir,
-                log_manager=self.log_manager
+                log_manager=self.log_manager,
+                file_index=self.file_index
             )
         )
         self.version_manager = VersionManager(
@@ -137,23 +149,27 @@ class WorkflowEngine:
             ai_config=self.core_ai_config,
             log_manager=self.log_manager,
             git_manager=self.git_manager,
-            file_memory=self.file_memory
+            file_memory=self.file_memory,
+            file_index=self.file_index
         )
         self.file_selector = FileSelector(
             self.project_dir,
             self.config.issue_id,
-            ai_config=self.core_ai_config
+            ai_config=self.core_ai_config,
+            file_index=self.file_index,
+            top_k=self.config.file_select_top_k
         )
 
         # 初始化代码工程师
         self.code_engineer_config = CodeEngineerConfig(
             project_dir=self.project_dir,
-            ai_config=self.core_ai_config
+            ai_config=self.core_ai_config,
+            edit_format=self.config.edit_format
         )
         self.engineer = CodeEngineer(
             self.code_engineer_config,
             self.log_manager,
-            Diff(self.data_ai_config)
+            Diff(self.data_ai_config, file_index=self.file_index)
         )
         
         # 初始化聊天处理器
@@ -0,0 +1,96 @@
+"""
+FileFetcher 文件列举基准测试
+
+比较 os.scandir 剪枝遍历与原来的 pathlib.Path.rglob 全量遍历后再过滤的实现，
+项目是 git 仓库时同时测量 git ls-files 后端。
+
+用法:
+    python scripts/benchmark_file_fetcher.py [项目目录] [--repeat N]
+    python scripts/benchmark_file_fetcher.py --synthetic    # 生成带有大量被忽略目录的临时项目
+"""
+
+import argparse
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.file_fetcher import FileFetcher  # noqa: E402
+
+
+def get_all_files_rglob(root_dir, gitignore_spec):
+    """原来的实现：rglob 遍历全部文件后再匹配忽略规则"""
+    all_files = set()
+    root_path = pathlib.Path(root_dir)
+    for path in root_path.rglob("*"):
+        if path.is_file():
+            relative_path = str(path.relative_to(root_path))
+            if not gitignore_spec.match_file(relative_path):
+                all_files.add(relative_path)
+    return all_files
+
+
+def create_synthetic_project(root_dir, ignored_files=20000, source_files=500):
+    """生成一个源码较少、被忽略的依赖目录很大的项目"""
+    with open(os.path.join(root_dir, ".gitignore"), "w", encoding="utf-8") as f:
+        f.write("node_modules/\n.venv/\n")
+    for i in range(source_files):
+        directory = os.path.join(root_dir, "src", f"pkg{i % 20}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"mod{i}.py"), "w", encoding="utf-8") as f:
+            f.write("x = 1\n")
+    for i in range(ignored_files):
+        directory = os.path.join(root_dir, "node_modules", f"dep{i % 500}", "lib")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"f{i}.js"), "w", encoding="utf-8") as f:
+            f.write("")
+
+
+def measure(func, root_dir, spec, repeat):
+    best = float("inf")
+    result = set()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(root_dir, spec)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(root_dir, repeat):
+    spec = FileFetcher.read_gitignore(root_dir)
+    rglob_time, rglob_files = measure(get_all_files_rglob, root_dir, spec, repeat)
+    scandir_time, scandir_files = measure(FileFetcher.get_all_files, root_dir, spec, repeat)
+
+    # 新的实现始终跳过 .git
+    rglob_files = {path for path in rglob_files if not path.split(os.sep)[0] == ".git"}
+    print(f"项目目录: {root_dir}")
+    print(f"rglob:   {rglob_time * 1000:8.1f} ms, {len(rglob_files)} 个文件")
+    print(f"scandir: {scandir_time * 1000:8.1f} ms, {len(scandir_files)} 个文件")
+    print(f"加速: {rglob_time / scandir_time:.1f}x")
+    if rglob_files != scandir_files:
+        print(f"结果不一致: 仅 rglob {len(rglob_files - scandir_files)} 个，仅 scandir {len(scandir_files - rglob_files)} 个")
+    if FileFetcher.get_git_files(root_dir, spec) is not None:
+        git_time, git_files = measure(FileFetcher.get_git_files, root_dir, spec, repeat)
+        print(f"git:     {git_time * 1000:8.1f} ms, {len(git_files)} 个文件")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FileFetcher 文件列举基准测试")
+    parser.add_argument("directory", nargs="?", default=".", help="项目目录（默认：当前目录）")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数，取最快的一次（默认：3）")
+    parser.add_argument("--synthetic", action="store_true", help="使用生成的临时项目")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        with tempfile.TemporaryDirectory() as root_dir:
+            create_synthetic_project(root_dir)
+            run(root_dir, args.repeat)
+    else:
+        run(os.path.abspath(args.directory), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
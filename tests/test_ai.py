@@ -0,0 +1,28 @@
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from core.ai import AIAssistant, AIConfig
+
+
+def test_agent_is_created_once_when_shared_by_threads():
+    assistant = AIAssistant.__new__(AIAssistant)
+    assistant.tools = [object()]
+    assistant.agent = None
+    assistant._agent_lock = threading.Lock()
+    created = []
+
+    def init_agent():
+        time.sleep(0.02)
+        created.append(1)
+        return object()
+
+    assistant._init_agent = init_agent
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        agents = list(executor.map(lambda _: assistant.ensure_agent(), range(8)))
+
+    assert len(created) == 1
+    assert all(agent is agents[0] for agent in agents)
+    # 默认逐个处理，调用方需要显式开启并发
+    assert AIConfig().max_concurrency == 1
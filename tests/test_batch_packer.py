@@ -0,0 +1,39 @@
+from core.batch_packer import pack_first_fit_decreasing
+from core.token_counter import HeuristicTokenCounter
+
+
+def test_first_fit_decreasing_fills_gaps_with_small_items():
+    sizes = [2, 6, 3, 7, 2]
+    result = pack_first_fit_decreasing(sizes, lambda size: size, budget=10)
+
+    # 按到达顺序贪心切分需要 3 个批次：[2, 6] [3, 7] [2]
+    assert [batch.items for batch in result.batches] == [[7, 3], [6, 2, 2]]
+    assert result.fill_ratio == 1.0
+
+
+def test_oversized_item_and_max_items():
+    result = pack_first_fit_decreasing([15, 1, 1, 1], lambda size: size, budget=10, max_items=2)
+
+    assert [batch.items for batch in result.batches] == [[15], [1, 1], [1]]
+    assert result.batches[0].tokens == 15
+    assert result.fill_ratio == (10 + 2 + 1) / 30
+
+
+def test_heuristic_counts_cjk_per_character():
+    counter = HeuristicTokenCounter()
+
+    assert counter.count("") == 0
+    assert counter.count("x" * 35) == 10
+    # 同样字符数的中文占用更多 token
+    assert counter.count("中" * 35) == 35
+
+
+def test_tiktoken_falls_back_to_heuristic_when_missing(monkeypatch):
+    import sys
+
+    from core.token_counter import get_token_counter
+
+    monkeypatch.setitem(sys.modules, "tiktoken", None)
+
+    assert isinstance(get_token_counter("gpt-4o", use_tiktoken=True), HeuristicTokenCounter)
+    assert isinstance(get_token_counter("gpt-4o"), HeuristicTokenCounter)
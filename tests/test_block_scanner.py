@@ -0,0 +1,62 @@
+from core.block_scanner import BlockScanner, scan_blocks
+from core.comment_formatter import CommentFormatter
+
+TEXT = """说明文字
+
+```diff
+--- README.md
++++ README.md
+@@ -1,3 +1,6 @@
+ # 标题
++```bash
++make test
++```
+```
+
+```python
+# File: app/main.py
+print("hello")
+```
+
+```
+plain code
+```
+"""
+
+
+def test_scan_blocks_types_and_offsets():
+    blocks = scan_blocks(TEXT)
+
+    assert [block.kind for block in blocks] == ["diff", "file", "code"]
+    diff, file_block, code = blocks
+    # diff 中以 + 开头的 ``` 不是结束标记
+    assert diff.body.endswith("+```\n")
+    assert TEXT[diff.start:diff.end].startswith("```diff\n--- README.md")
+    assert TEXT[diff.start:diff.end].endswith("+```\n```")
+    assert file_block.file_path == "app/main.py"
+    assert file_block.body == 'print("hello")\n'
+    assert TEXT[file_block.body_start:].startswith('print("hello")')
+    assert code.body == "plain code\n"
+
+
+def test_incremental_scan_matches_full_scan():
+    expected = scan_blocks(TEXT)
+
+    for size in (1, 2, 5, 17):
+        scanner = BlockScanner()
+        blocks = []
+        for i in range(0, len(TEXT), size):
+            blocks.extend(scanner.feed(TEXT[i:i + size]))
+        assert blocks == expected
+
+
+def test_unclosed_block_is_ignored():
+    assert scan_blocks("```diff\n--- a.py\n+++ a.py\n") == []
+
+
+def test_format_diff_blocks_keeps_paths_and_other_text():
+    formatted = CommentFormatter.format_diff_blocks(TEXT, "bella-bot-1")
+
+    assert formatted.startswith("说明文字\n\n```diff\n--- README.md\n+++ README.md\n在bella-bot-1分支可查看详细代码\n```\n")
+    assert "make test" not in formatted
+    assert formatted.endswith("```python\n# File: app/main.py\nprint(\"hello\")\n```\n\n```\nplain code\n```\n")
@@ -0,0 +1,68 @@
+import os
+
+from core.bm25 import tokenize
+from core.description_store import DescriptionStore
+from core.file_memory import FileMemory
+from core.file_selector import FileSelector
+
+
+def test_tokenize_identifiers_and_chinese():
+    assert tokenize("core/file_selector.py FileSelector") == [
+        "core", "file", "selector", "py", "fileselector", "file", "selector"
+    ]
+    assert tokenize("选择文件") == ["选择", "择文", "文件"]
+
+
+def test_search_index_follows_description_changes(tmp_path):
+    store = DescriptionStore(str(tmp_path / "memory" / "file_details.db"))
+    store.upsert_descriptions({
+        "core/file_selector.py": "根据需求选择相关文件",
+        "core/git_manager.py": "管理 git 分支和提交",
+        "README.md": "项目说明",
+    })
+
+    assert [path for path, _ in store.search("改进文件选择", 5)] == ["core/file_selector.py"]
+    assert [path for path, _ in store.search("git 提交", 5, {"README.md"})] == []
+
+    store.upsert_descriptions({"core/git_manager.py": "管理 git 分支，并选择要提交的文件"})
+    store.delete(["core/file_selector.py"])
+    assert [path for path, _ in store.search("改进文件选择", 5)] == ["core/git_manager.py"]
+
+    # 重新打开时使用持久化的索引
+    store.close()
+    reopened = DescriptionStore(str(tmp_path / "memory" / "file_details.db"))
+    assert [path for path, _ in reopened.search("分支", 5)] == ["core/git_manager.py"]
+
+
+def test_selector_prompt_contains_only_top_k(tmp_path):
+    FileMemory.open_store(str(tmp_path)).upsert_descriptions({
+        os.path.join("core", "payment.py"): "处理订单支付和退款",
+        os.path.join("core", "user.py"): "用户注册和登录",
+    })
+    all_files = {os.path.join("core", "payment.py"), os.path.join("core", "user.py"), "setup.py"}
+    all_files |= {os.path.join("pkg", "deep", f"module_{i}.py") for i in range(20)}
+    selector = FileSelector.__new__(FileSelector)
+    selector.project_dir = str(tmp_path)
+    selector.top_k = 2
+
+    prompt = selector._build_prompt("修复退款金额错误", all_files)
+
+    assert "处理订单支付和退款" in prompt
+    assert "setup.py" in prompt
+    assert "user.py" not in prompt and "module_" not in prompt
+    assert "项目共 23 个文件" in prompt
+    # 有描述时也按相关性顺序列出
+    assert prompt.index("payment.py") < prompt.index("setup.py")
+
+
+def test_selector_prompt_keeps_rank_order_without_descriptions(tmp_path):
+    all_files = {"setup.py", os.path.join("core", "refund.py"), os.path.join("core", "user.py"), "README.md"}
+    selector = FileSelector.__new__(FileSelector)
+    selector.project_dir = str(tmp_path)
+    selector.top_k = 3
+
+    prompt = selector._build_prompt("修复 refund 金额错误", all_files)
+
+    ranked = selector._rank_files("修复 refund 金额错误", all_files)
+    assert ranked[0] == os.path.join("core", "refund.py")
+    assert "\n".join(ranked) in prompt
@@ -0,0 +1,26 @@
+from core.ai import AIConfig
+from core.code_engineer import (
+    DEFAULT_PROMPT,
+    SEARCH_REPLACE_FORMAT_PROMPT,
+    SEARCH_REPLACE_PROMPT,
+    CodeEngineer,
+    CodeEngineerConfig,
+)
+
+
+def _engineer(tmp_path, edit_format):
+    engineer = CodeEngineer.__new__(CodeEngineer)
+    engineer.config = CodeEngineerConfig(project_dir=str(tmp_path), ai_config=AIConfig(), edit_format=edit_format)
+    return engineer
+
+
+def test_custom_system_prompt_gets_edit_format_instructions(tmp_path):
+    (tmp_path / ".eng").mkdir()
+    (tmp_path / ".eng" / "system.txt").write_text(DEFAULT_PROMPT, encoding="utf-8")
+
+    assert _engineer(tmp_path, "diff")._read_system_prompt() == DEFAULT_PROMPT
+    prompt = _engineer(tmp_path, "search_replace")._read_system_prompt()
+    assert prompt.startswith(DEFAULT_PROMPT) and prompt.endswith(SEARCH_REPLACE_FORMAT_PROMPT)
+
+    (tmp_path / ".eng" / "system.txt").unlink()
+    assert _engineer(tmp_path, "search_replace")._read_system_prompt() == SEARCH_REPLACE_PROMPT
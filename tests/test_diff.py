@@ -0,0 +1,202 @@
+import os
+
+from types import SimpleNamespace
+
+from core.ai import AIConfig
+from core.diff import Diff, DiffApplyStats, DiffConfig, DiffStreamParser
+from core.edit_blocks import parse_edit_blocks
+from core.file_index import FileIndex
+from core.file_validator import FileValidator
+from core.hunk_applier import HunkApplier, parse_hunks
+
+RESPONSE = """先修改配置：
+
+```diff
+--- config.py
++++ config.py
+@@ -1,2 +1,2 @@
+-DEBUG = True
++DEBUG = False
+```
+
+然后新增文件：
+
+```diff
+--- /dev/null
++++ docs/usage.md
+@@ -0,0 +1,1 @@
++# 使用说明
+```
+
+```diff
+@@ -10,1 +10,1 @@
+-old
++new
+```
+
+this concludes a fully working implementation
+"""
+
+
+def test_stream_parser_matches_batch_parser():
+    """任意切分响应后增量解析，结果与整体解析一致"""
+    expected = Diff.parse_diffs_from_text(RESPONSE)
+
+    for size in (1, 3, 7, 64, len(RESPONSE)):
+        parser = DiffStreamParser()
+        diffs = []
+        for i in range(0, len(RESPONSE), size):
+            diffs.extend(parser.feed(RESPONSE[i:i + size]))
+        assert diffs == expected
+
+
+def test_stream_parser_emits_block_when_fence_closes():
+    parser = DiffStreamParser()
+
+    assert parser.feed("```diff\n--- a.py\n+++ a.py\n-x\n+y\n") == []
+    diffs = parser.feed("```\n后续说明")
+
+    assert [(pre, post) for pre, post, _ in diffs] == [("a.py", "a.py")]
+
+
+def _local_diff(response="", generate=None):
+    """创建不连接模型的 Diff，模型调用固定返回 response，或交给 generate 处理"""
+    diff = Diff.__new__(Diff)
+    diff.config = DiffConfig(fallback_mode="file")
+    diff.hunk_applier = HunkApplier()
+    diff.file_validator = FileValidator()
+    diff.ai_config = AIConfig(max_concurrency=1)
+    diff.original_sys_prompt = diff.ai_config.sys_prompt
+    diff._transaction = None
+    diff.file_index = None
+    diff.last_stats = DiffApplyStats()
+    diff.ai_assistant = SimpleNamespace(generate_response=generate or (lambda *args, **kwargs: response))
+    return diff
+
+
+def test_failed_file_leaves_working_tree_untouched(tmp_path):
+    """同一轮中任意文件失败时，已成功的文件也不会写入工作区"""
+    (tmp_path / "ok.py").write_text("a = 1\n", encoding="utf-8")
+    (tmp_path / "bad.py").write_text("b = 1\n", encoding="utf-8")
+    diff = _local_diff(response="无法处理")
+    diffs = [
+        ("ok.py", "ok.py", "diff\n@@ -1,1 +1,1 @@\n-a = 1\n+a = 2\n"),
+        ("bad.py", "bad.py", "diff\n@@ -1,1 +1,1 @@\n-c = 1\n+c = 2\n"),
+    ]
+
+    failed_files, diff_infos = diff.process_diffs(diffs, str(tmp_path))
+
+    assert failed_files == ["bad.py"]
+    assert diff_infos == []
+    assert (tmp_path / "ok.py").read_text(encoding="utf-8") == "a = 1\n"
+
+    diff.ai_assistant = SimpleNamespace(generate_response=lambda *args, **kwargs: "")
+    failed_files, diff_infos = diff.process_diffs(diffs[:1], str(tmp_path))
+
+    assert failed_files == []
+    assert diff_infos[0].file_content == "a = 1\n"
+    assert (tmp_path / "ok.py").read_text(encoding="utf-8") == "a = 2\n"
+
+
+def test_edit_blocks_are_applied_without_model(tmp_path):
+    (tmp_path / "calc.py").write_text("def add(a, b):\n    return a + b\n", encoding="utf-8")
+    blocks = parse_edit_blocks("""calc.py
+<<<<<<< SEARCH
+    return a + b
+=======
+    return b + a
+>>>>>>> REPLACE
+
+docs/usage.md
+<<<<<<< SEARCH
+=======
+# 使用说明
+>>>>>>> REPLACE
+""")
+    diff = _local_diff(response="")
+    diff.file_index = FileIndex(str(tmp_path))
+    old_hash = diff.file_index.content_hash("calc.py")
+
+    failed_files, diff_infos = diff.process_edit_blocks(blocks, str(tmp_path))
+
+    # 提交后共享的文件索引包含新建的文件，修改的文件重新计算哈希
+    assert diff.file_index.files() == {"calc.py", os.path.join("docs", "usage.md")}
+    assert diff.file_index.content_hash("calc.py") != old_hash
+
+    assert failed_files == []
+    assert diff.last_stats.model_files == 0
+    assert [(info.file_name, info.is_modify, info.is_create) for info in diff_infos] == [
+        ("calc.py", True, False), ("docs/usage.md", False, True)]
+    assert diff_infos[0].file_content == "def add(a, b):\n    return a + b\n"
+    assert (tmp_path / "calc.py").read_text(encoding="utf-8") == "def add(a, b):\n    return b + a\n"
+    assert (tmp_path / "docs" / "usage.md").read_text(encoding="utf-8") == "# 使用说明\n"
+
+
+def test_broken_file_is_repaired_alone(tmp_path):
+    """修改后语法损坏的文件只请求模型重新生成该文件"""
+    (tmp_path / "calc.py").write_text("def add(a, b):\n    return a + b\n", encoding="utf-8")
+    (tmp_path / "config.json").write_text('{"debug": true}\n', encoding="utf-8")
+    prompts = []
+
+    def generate(prompt, **kwargs):
+        prompts.append(prompt)
+        return diff._replace_file(str(tmp_path / "calc.py"), "def add(a, b):\n    return b + a\n")
+
+    diff = _local_diff(generate=generate)
+    diffs = [
+        ("calc.py", "calc.py", "diff\n@@ -1,2 +1,2 @@\n def add(a, b):\n-    return a + b\n+    return b + a)\n"),
+        ("config.json", "config.json", 'diff\n@@ -1,1 +1,1 @@\n-{"debug": true}\n+{"debug": false}\n'),
+    ]
+
+    failed_files, diff_infos = diff.process_diffs(diffs, str(tmp_path))
+
+    assert failed_files == []
+    assert len(prompts) == 1 and "calc.py" in prompts[0] and "config.json" not in prompts[0]
+    assert (tmp_path / "calc.py").read_text(encoding="utf-8") == "def add(a, b):\n    return b + a\n"
+    assert (tmp_path / "config.json").read_text(encoding="utf-8") == '{"debug": false}\n'
+
+
+def test_unrepairable_file_rolls_back_round(tmp_path):
+    (tmp_path / "config.json").write_text('{"debug": true}\n', encoding="utf-8")
+    diff = _local_diff(response="无法处理")
+    diffs = [("config.json", "config.json", 'diff\n@@ -1,1 +1,1 @@\n-{"debug": true}\n+{"debug": false\n')]
+
+    failed_files, diff_infos = diff.process_diffs(diffs, str(tmp_path))
+
+    assert failed_files == ["config.json"]
+    assert (tmp_path / "config.json").read_text(encoding="utf-8") == '{"debug": true}\n'
+
+
+def test_file_block_replaces_existing_file(tmp_path):
+    """File: 代码块是完整的文件内容，缩进的行不会被当作 hunk 的上下文行"""
+    (tmp_path / "mod.py").write_text("def main():\n    return 1\n", encoding="utf-8")
+    diffs = Diff.parse_diffs_from_text(
+        "```python\nFile: mod.py\nimport sys\n\n\ndef main():\n    return 1\n```\n\n"
+        "```python\nFile: pkg/new.py\ndef run():\n    pass\n```\n"
+    )
+    diff = _local_diff(response="")
+
+    failed_files, diff_infos = diff.process_diffs(diffs, str(tmp_path))
+
+    assert failed_files == []
+    assert diff.last_stats.model_files == 0
+    assert (tmp_path / "mod.py").read_text(encoding="utf-8") == "import sys\n\n\ndef main():\n    return 1\n"
+    assert (tmp_path / "pkg" / "new.py").read_text(encoding="utf-8") == "def run():\n    pass\n"
+    assert diff_infos[0].file_content == "def main():\n    return 1\n"
+
+
+def test_window_reply_must_keep_boundary_lines():
+    content = "\n".join(f"line {i}" for i in range(40)) + "\n"
+    hunks = parse_hunks("@@ -20,3 +20,3 @@\n line 19\n-line 20 typo\n+line 20 fixed\n line 21\n")
+    diff = _local_diff()
+    diff.config = DiffConfig(fallback_mode="window", window_context_lines=3)
+
+    # 片段为第 17-24 行，正确的回复保留首尾的上下文行
+    diff.window_assistant = SimpleNamespace(generate_response=lambda prompt: (
+        "```\n" + "\n".join(f"line {i}" if i != 20 else "line 20 fixed" for i in range(16, 25)) + "\n```"))
+    new_content = diff._apply_hunk_windows("a.txt", content, hunks)
+    assert new_content == content.replace("line 20\n", "line 20 fixed\n")
+
+    # 回复被截断时不拼接，改为发送完整文件
+    diff.window_assistant = SimpleNamespace(generate_response=lambda prompt: "```\nline 16\nline 20 fixed\n```")
+    assert diff._apply_hunk_windows("a.txt", content, hunks) is None
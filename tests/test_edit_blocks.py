@@ -0,0 +1,99 @@
+from core.edit_blocks import apply_edit_blocks, parse_edit_blocks
+from core.hunk_applier import HunkApplier
+
+ORIGINAL = """def add(a, b):
+    return a + b
+
+
+def sub(a, b):
+    return a - b
+"""
+
+RESPONSE = """先修改计算函数：
+
+calc.py
+```python
+<<<<<<< SEARCH
+def sub(a, b):
+    return a - b
+=======
+def sub(a, b):
+    # 减法
+    return a - b
+>>>>>>> REPLACE
+```
+
+```python
+<<<<<<< SEARCH
+    # 减法
+=======
+    # 减法运算
+>>>>>>> REPLACE
+```
+
+File: docs/usage.md
+```
+<<<<<<< SEARCH
+=======
+# 使用说明
+>>>>>>> REPLACE
+```
+
+this concludes a fully working implementation
+"""
+
+
+def test_parse_edit_blocks():
+    blocks = parse_edit_blocks(RESPONSE)
+
+    assert [block.file_path for block in blocks] == ["calc.py", "calc.py", "docs/usage.md"]
+    assert blocks[0].search == "def sub(a, b):\n    return a - b\n"
+    assert blocks[0].replace == "def sub(a, b):\n    # 减法\n    return a - b\n"
+    assert blocks[2].search == ""
+    assert blocks[2].replace == "# 使用说明\n"
+
+
+def test_apply_edit_blocks_in_order():
+    """后面的编辑块可以查找前面编辑块替换后的内容"""
+    blocks = parse_edit_blocks(RESPONSE)[:2]
+
+    result = apply_edit_blocks(ORIGINAL, blocks, HunkApplier())
+
+    assert not result.failed
+    assert result.content.endswith("def sub(a, b):\n    # 减法运算\n    return a - b\n")
+
+
+def test_fuzzy_match_ignores_whitespace_and_drifted_context():
+    """SEARCH 的空白与文件不一致、或首尾未改动的行已经不存在时，仍然可以定位"""
+    response = """calc.py
+<<<<<<< SEARCH
+def add(a,  b):
+  return a + b
+# 已经不存在的注释
+=======
+def add(a,  b):
+  return b + a
+# 已经不存在的注释
+>>>>>>> REPLACE
+"""
+    result = apply_edit_blocks(ORIGINAL, parse_edit_blocks(response), HunkApplier())
+
+    assert not result.failed
+    assert result.content.startswith("def add(a, b):\n  return b + a\n\n")
+
+
+def test_unmatched_block_is_reported():
+    response = """calc.py
+<<<<<<< SEARCH
+def mul(a, b):
+    return a * b
+=======
+def mul(a, b):
+    return b * a
+>>>>>>> REPLACE
+"""
+    blocks = parse_edit_blocks(response)
+    result = apply_edit_blocks(ORIGINAL, blocks, HunkApplier())
+
+    assert result.failed == blocks
+    assert result.content == ORIGINAL
@@ -0,0 +1,39 @@
+from core.file_chunker import split_into_chunks
+from core.token_counter import HeuristicTokenCounter
+
+
+class LineCounter:
+    """每行计为一个 token，便于构造用例"""
+
+    def count(self, text):
+        return len(text.splitlines())
+
+
+def test_splits_at_top_level_definitions():
+    content = (
+        "import os\n\n"
+        "def a():\n    return 1\n\n"
+        "class B:\n    def c(self):\n        pass\n\n"
+        "def d():\n    return 2\n"
+    )
+
+    chunks = split_into_chunks(content, LineCounter(), budget=5)
+
+    assert "".join(chunks) == content
+    assert chunks == [
+        "import os\n\ndef a():\n    return 1\n\n",
+        "class B:\n    def c(self):\n        pass\n\n",
+        "def d():\n    return 2\n",
+    ]
+
+
+def test_oversized_unit_falls_back_to_blank_lines_and_lines():
+    body = "".join(f"    x{i} = {i}\n" for i in range(6))
+    content = f"# 标题\n\ndef big():\n{body}\n{body}"
+    counter = HeuristicTokenCounter()
+
+    chunks = split_into_chunks(content, counter, budget=30)
+
+    assert "".join(chunks) == content
+    assert len(chunks) > 1
+    assert all(counter.count(chunk) <= 30 for chunk in chunks)
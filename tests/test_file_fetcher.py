@@ -0,0 +1,64 @@
+import os
+import subprocess
+
+from core.file_fetcher import FileFetcher
+
+
+def _write(path, content=""):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+
+
+def test_ignored_directories_are_pruned(tmp_path, monkeypatch):
+    _write(tmp_path / ".gitignore", "node_modules/\n*.log\n")
+    _write(tmp_path / "src" / "a.py")
+    _write(tmp_path / "src" / "debug.log")
+    _write(tmp_path / "node_modules" / "dep" / "index.js")
+    _write(tmp_path / ".git" / "HEAD")
+
+    scanned = []
+    scandir = os.scandir
+
+    def recording_scandir(path):
+        scanned.append(os.path.relpath(path, tmp_path))
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", recording_scandir)
+    files = FileFetcher.get_all_files_without_ignore(str(tmp_path))
+
+    assert files == {".gitignore", os.path.join("src", "a.py")}
+    # 被忽略的目录和 .git 不会被进入
+    assert sorted(scanned) == [".", "src"]
+
+
+def test_symlinked_directories_are_not_followed(tmp_path):
+    _write(tmp_path / "real" / "a.py")
+    os.symlink(tmp_path / "real", tmp_path / "link")
+    os.symlink(tmp_path, tmp_path / "real" / "loop")
+
+    assert FileFetcher.get_all_files_without_ignore(str(tmp_path)) == {os.path.join("real", "a.py")}
+
+
+def test_git_index_backend(tmp_path):
+    def git(*args):
+        subprocess.run(["git", "-C", str(tmp_path), *args], check=True, capture_output=True)
+
+    git("init", "-q")
+    _write(tmp_path / ".gitignore", "build/\n")
+    _write(tmp_path / ".eng" / ".engignore", ".eng/\n*.md\n")
+    _write(tmp_path / "tracked.py")
+    _write(tmp_path / "deleted.py")
+    _write(tmp_path / "README.md")
+    git("add", ".")
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "init")
+    os.remove(tmp_path / "deleted.py")
+    _write(tmp_path / "untracked.py")
+    _write(tmp_path / "build" / "out.py")
+
+    spec = FileFetcher.read_gitignore(str(tmp_path))
+    files = FileFetcher.get_git_files(str(tmp_path), spec)
+
+    assert files == {".gitignore", "tracked.py", "untracked.py"}
+    assert files == FileFetcher.get_all_files(str(tmp_path), spec)
+    # 不是 git 仓库时回退到遍历文件系统
+    assert FileFetcher.get_git_files(str(tmp_path / "build"), spec) is None
@@ -0,0 +1,61 @@
+import os
+
+from core.file_fetcher import FileFetcher
+from core.file_filter import FileFilter, FileFilterConfig
+
+
+def _write(path, content=b""):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+
+
+def test_excluded_reasons(tmp_path):
+    _write(tmp_path / "a.py", b"x = 1\n")
+    _write(tmp_path / "logo.png", b"\x89PNG\r\n\x1a\n\0\0\0")
+    _write(tmp_path / "poetry.lock", b"[[package]]\n")
+    _write(tmp_path / "vendor" / "lib.py", b"x = 1\n")
+    _write(tmp_path / "app.js", b"var a=1;" * 2000)
+    _write(tmp_path / "api_pb2.py", b"x = 1\n")
+    _write(tmp_path / "gen.go", b"// Code generated by protoc. DO NOT EDIT.\npackage api\n")
+    _write(tmp_path / "big.py", b"x = 1\n" * 5000)
+    file_filter = FileFilter(FileFilterConfig(max_file_size=20000))
+
+    reasons = {path: file_filter.excluded_reason(str(tmp_path), path)
+               for path in ["a.py", "logo.png", "poetry.lock", os.path.join("vendor", "lib.py"),
+                            "app.js", "api_pb2.py", "gen.go", "big.py"]}
+
+    assert reasons == {
+        "a.py": None, "logo.png": "binary", "poetry.lock": "generated", os.path.join("vendor", "lib.py"): "generated",
+        "app.js": "generated", "api_pb2.py": "generated", "gen.go": "generated", "big.py": "too_large",
+    }
+
+
+def test_config_from_eng_dir(tmp_path):
+    _write(tmp_path / ".eng" / "filters.toml",
+           b'max_file_size = 0\nexclude_patterns = ["fixtures/"]\ninclude_patterns = ["vendor/ours/**"]\n')
+    _write(tmp_path / "a.py", b"x = 1\n" * 200000)
+    _write(tmp_path / "fixtures" / "data.json", b"{}")
+    _write(tmp_path / "vendor" / "ours" / "lib.py", b"x = 1\n")
+    _write(tmp_path / "vendor" / "theirs" / "lib.py", b"x = 1\n")
+
+    files = FileFetcher.get_all_files_without_ignore(str(tmp_path))
+
+    assert files == {"a.py", os.path.join(".eng", "filters.toml"), os.path.join("vendor", "ours", "lib.py")}
+
+
+def test_files_that_only_mention_generated_markers_are_kept(tmp_path):
+    _write(tmp_path / "notes.py", b'"""Files with a DO NOT EDIT or @generated header are skipped."""\nMARKER = "auto-generated"\n')
+    _write(tmp_path / "late.go", b"package api\n\n// Code generated by protoc. DO NOT EDIT.\n")
+    _write(tmp_path / "schema.ts", b"/**\n * @generated\n */\nexport type A = 1;\n")
+    _write(tmp_path / "api_pb.py", b"# -*- coding: utf-8 -*-\n# Generated by the protocol buffer compiler.  DO NOT EDIT!\n")
+    file_filter = FileFilter()
+
+    assert file_filter.excluded_reason(str(tmp_path), "notes.py") is None
+    assert file_filter.excluded_reason(str(tmp_path), "late.go") is None
+    assert file_filter.excluded_reason(str(tmp_path), "schema.ts") == "generated"
+    assert file_filter.excluded_reason(str(tmp_path), "api_pb.py") == "generated"
+
+    # 过滤模块本身和它的测试不会被排除
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert file_filter.excluded_reason(root, os.path.join("core", "file_filter.py")) is None
+    assert file_filter.excluded_reason(root, os.path.join("tests", "test_file_filter.py")) is None
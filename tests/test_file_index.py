@@ -0,0 +1,47 @@
+import os
+
+from core.file_fetcher import FileFetcher
+from core.file_index import FileIndex
+
+
+def test_tree_is_listed_once_and_hashes_follow_mtime(tmp_path, monkeypatch):
+    (tmp_path / "a.py").write_text("a = 1\n", encoding="utf-8")
+    listings = []
+    get_all_files_with_spec = FileFetcher.get_all_files_with_spec
+
+    def counting(root_dir, spec, file_filter=None):
+        listings.append(root_dir)
+        return get_all_files_with_spec(root_dir, spec, file_filter)
+
+    monkeypatch.setattr(FileFetcher, "get_all_files_with_spec", staticmethod(counting))
+    index = FileIndex(str(tmp_path))
+
+    assert index.files() == {"a.py"}
+    first_hash = index.content_hash("a.py")
+    assert index.files() == {"a.py"}
+    assert len(listings) == 1
+
+    # 修改时间变化后重新计算哈希
+    (tmp_path / "a.py").write_text("a = 2\n", encoding="utf-8")
+    os.utime(tmp_path / "a.py", ns=(1, 1))
+    assert index.content_hash("a.py") != first_hash
+
+    # 忽略规则变化后重新列举
+    (tmp_path / ".gitignore").write_text("*.log\n", encoding="utf-8")
+    assert index.files() == {"a.py", ".gitignore"}
+    assert len(listings) == 2
+
+
+def test_invalidate_written_and_deleted_files(tmp_path):
+    (tmp_path / ".gitignore").write_text("*.log\n", encoding="utf-8")
+    (tmp_path / "a.py").write_text("a = 1\n", encoding="utf-8")
+    index = FileIndex(str(tmp_path))
+    index.files()
+
+    (tmp_path / "b.py").write_text("b = 1\n", encoding="utf-8")
+    (tmp_path / "debug.log").write_text("", encoding="utf-8")
+    os.remove(tmp_path / "a.py")
+    index.invalidate([str(tmp_path / "b.py"), "debug.log", "a.py"])
+
+    assert index.files() == {".gitignore", "b.py"}
+    assert index.content_hash("a.py") is None
@@ -0,0 +1,302 @@
+import os
+import threading
+import time
+
+from types import SimpleNamespace
+
+import pytest
+
+from core.description_cache import DescriptionCache
+from core.file_memory import FileMemory
+from core.token_counter import HeuristicTokenCounter
+
+
+def _memory(workers):
+    memory = FileMemory.__new__(FileMemory)
+    memory.config = SimpleNamespace(workers=workers)
+    memory._failed_files_lock = threading.Lock()
+    memory.token_counter = HeuristicTokenCounter()
+    return memory
+
+
+def test_batches_run_concurrently_and_merge_as_completed():
+    memory = _memory(workers=4)
+    memory.MAX_FILES_PER_BATCH = 1
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def generate(batch):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return {file_info["filepath"]: "描述" for file_info in batch}
+
+    memory._generate_batch_file_descriptions = generate
+    files = [{"filepath": f"f{i}.py", "content": "x = 1\n"} for i in range(8)]
+    merged = {}
+    calls = []
+
+    def on_batch_complete(descriptions):
+        calls.append(descriptions)
+        merged.update(descriptions)
+
+    descriptions = memory._process_files_in_batches(files, on_batch_complete)
+
+    assert peak[0] == 4
+    assert len(calls) == 8
+    assert merged == descriptions == {f"f{i}.py": "描述" for i in range(8)}
+
+
+def test_request_errors_are_not_retried_again():
+    memory = _memory(workers=1)
+    failed = []
+    calls = []
+    memory._update_failed_files = failed.extend
+
+    def generate_response(prompt, use_tools=False):
+        calls.append(prompt)
+        raise RuntimeError("service unavailable")
+
+    memory.ai_assistant = SimpleNamespace(generate_response=generate_response)
+
+    # 共享的重试策略已经重试过请求错误，批次只请求一次
+    assert memory._generate_batch_file_descriptions([{"filepath": "a.py", "content": "a = 1\n"}]) == {}
+    assert len(calls) == 1
+    assert failed == ["a.py"]
+
+
+def _project_memory(tmp_path, described):
+    """创建使用临时项目目录的 FileMemory，生成描述时记录被处理的文件"""
+    memory = FileMemory.__new__(FileMemory)
+    memory.config = SimpleNamespace(project_dir=str(tmp_path), workers=1, deep=False, file_index=None)
+    memory.memory_path = str(tmp_path / FileMemory.FILE_DETAILS_PATH)
+    memory.git_id_path = str(tmp_path / FileMemory.GIT_ID_FILE)
+    memory.file_hashes_path = str(tmp_path / FileMemory.FILE_HASHES_PATH)
+    memory.progress_path = str(tmp_path / FileMemory.PROGRESS_PATH)
+    memory.log_manager = SimpleNamespace()
+    memory._failed_files_lock = threading.Lock()
+    memory.token_counter = HeuristicTokenCounter()
+    os.makedirs(tmp_path / FileMemory.MEMORY_DIR, exist_ok=True)
+    (tmp_path / ".eng" / ".engignore").write_text(".eng/\n", encoding="utf-8")
+    memory.store = FileMemory.open_store(str(tmp_path))
+    memory.description_cache = None
+
+    def generate(batch):
+        described.extend(file_info["filepath"] for file_info in batch)
+        return {file_info["filepath"]: f"描述 {file_info['filepath']}" for file_info in batch}
+
+    memory._generate_batch_file_descriptions = generate
+    return memory
+
+
+def test_only_files_with_changed_hash_are_described(tmp_path):
+    (tmp_path / "a.py").write_text("a = 1\n", encoding="utf-8")
+    (tmp_path / "b.py").write_text("b = 1\n", encoding="utf-8")
+    (tmp_path / "empty.py").write_text("", encoding="utf-8")
+    described = []
+    memory = _project_memory(tmp_path, described)
+
+    memory.update_file_details()
+    assert sorted(described) == ["a.py", "b.py"]
+
+    described.clear()
+    memory.update_file_details()
+    assert described == []
+
+    # 修改的文件和新增的文件都会重新描述，删除的文件会移除描述
+    (tmp_path / "a.py").write_text("a = 2\n", encoding="utf-8")
+    (tmp_path / "c.py").write_text("c = 1\n", encoding="utf-8")
+    os.remove(tmp_path / "b.py")
+    memory.update_file_details()
+
+    assert sorted(described) == ["a.py", "c.py"]
+    assert sorted(memory._read_file_details()) == ["a.py", "c.py"]
+    assert sorted(memory._read_file_hashes()) == ["a.py", "c.py", "empty.py"]
+
+
+def test_failed_redescription_is_retried_next_run(tmp_path):
+    (tmp_path / "a.py").write_text("a = 1\n", encoding="utf-8")
+    described = []
+    memory = _project_memory(tmp_path, described)
+    memory.update_file_details()
+    generate = memory._generate_batch_file_descriptions
+
+    # 修改后的文件描述失败时不记录新的哈希，下次运行会重新描述
+    (tmp_path / "a.py").write_text("a = 2\n", encoding="utf-8")
+    memory._generate_batch_file_descriptions = lambda batch: {}
+    memory.update_file_details()
+
+    described.clear()
+    memory._generate_batch_file_descriptions = generate
+    memory.update_file_details()
+    assert described == ["a.py"]
+
+
+def test_descriptions_are_exported_and_reimported(tmp_path):
+    (tmp_path / "a.py").write_text("a = 1\n", encoding="utf-8")
+    (tmp_path / "b.py").write_text("b = 1\n", encoding="utf-8")
+    described = []
+    memory = _project_memory(tmp_path, described)
+    memory.update_file_details()
+
+    # 导出的文本视图保持 路径:描述 格式
+    text = (tmp_path / FileMemory.FILE_DETAILS_PATH).read_text(encoding="utf-8")
+    assert text == "a.py:描述 a.py\nb.py:描述 b.py\n"
+    assert FileMemory.get_selected_file_descriptions(str(tmp_path), ["b.py", "missing.py"]) == {"b.py": "描述 b.py"}
+
+    # 数据库是本地缓存，不会被提交
+    assert (tmp_path / FileMemory.MEMORY_DIR / ".gitignore").read_text(encoding="utf-8") == "file_details.db*\n"
+
+    # 视图被外部更新（例如 git pull）后，读取时重新导入
+    (tmp_path / FileMemory.FILE_DETAILS_PATH).write_text("a.py:新的描述\n", encoding="utf-8")
+    assert FileMemory.get_file_descriptions(str(tmp_path)) == {"a.py": "新的描述"}
+
+
+def test_large_file_is_summarized_in_chunks():
+    memory = _memory(workers=2)
+    memory.MAX_TOKENS_PER_BATCH = 40
+    prompts, threads = [], set()
+
+    def generate_response(prompt, use_tools=False):
+        prompts.append(prompt)
+        threads.add(threading.get_ident())
+        return "合并后的描述" if "为整个文件生成" in prompt else f"摘要{len(prompts)}\n"
+
+    memory.ai_assistant = SimpleNamespace(generate_response=generate_response)
+    memory._generate_batch_file_descriptions = lambda batch: {f["filepath"]: "批量描述" for f in batch}
+    large = "".join(f"def f{i}():\n    return {i}\n\n" for i in range(20))
+    files = [{"filepath": "big.py", "content": large}, {"filepath": "small.py", "content": "x = 1\n"}]
+
+    descriptions = memory._process_files_in_batches(files)
+
+    assert descriptions == {"big.py": "合并后的描述", "small.py": "批量描述"}
+    # 多个分块摘要之后是一次最终合并
+    assert sum("的第 " in prompt for prompt in prompts) == len(prompts) - 1 > 1
+    assert "为整个文件生成" in prompts[-1]
+    # 分块摘要在处理该文件的工作线程中依次生成，不会另开线程池
+    assert len(threads) == 1
+    assert [prompt.split("的第 ")[1].split("/")[0] for prompt in prompts[:-1]] == [str(i) for i in range(1, len(prompts))]
+
+
+def test_static_tier_describes_documented_files_and_deep_replaces_them(tmp_path):
+    (tmp_path / "doc.py").write_text('"""工具函数"""\n\nimport os\n\n\ndef run():\n    pass\n', encoding="utf-8")
+    (tmp_path / "plain.py").write_text("x = 1\n", encoding="utf-8")
+    described = []
+    memory = _project_memory(tmp_path, described)
+
+    memory.update_file_details()
+
+    # 有文档字符串的文件不需要请求模型
+    assert described == ["plain.py"]
+    assert memory._read_file_details()["doc.py"] == "工具函数；定义函数 run；依赖 os"
+
+    # 深度模式下，内容没有变化的静态描述也会由模型重新描述
+    described.clear()
+    memory.config.deep = True
+    memory.update_file_details()
+
+    assert described == ["doc.py"]
+    assert memory.store.paths_with_source(FileMemory.STATIC_SOURCE) == set()
+
+
+def test_descriptions_are_reused_across_clones_through_cache(tmp_path):
+    cache = DescriptionCache(str(tmp_path / "cache"))
+    described = []
+    memories = []
+    for clone in ("clone1", "clone2"):
+        (tmp_path / clone).mkdir()
+        (tmp_path / clone / "a.py").write_text("a = 1\n", encoding="utf-8")
+        memory = _project_memory(tmp_path / clone, described)
+        memory.config.ai_config = SimpleNamespace(model_name="model")
+        memory.description_cache = cache
+        memories.append(memory)
+
+    memories[0].update_file_details()
+    memories[1].update_file_details()
+
+    # 第二个克隆中内容相同的文件直接使用缓存
+    assert described == ["a.py"]
+    assert memories[1]._read_file_details() == {"a.py": "描述 a.py"}
+
+    # 使用其他模型的克隆不会命中缓存
+    (tmp_path / "clone3").mkdir()
+    (tmp_path / "clone3" / "a.py").write_text("a = 1\n", encoding="utf-8")
+    memory = _project_memory(tmp_path / "clone3", described)
+    memory.config.ai_config = SimpleNamespace(model_name="other-model")
+    memory.description_cache = cache
+    memory.update_file_details()
+    assert described == ["a.py", "a.py"]
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = DescriptionCache(str(tmp_path), max_bytes=20)
+    for i, key in enumerate(["aa1", "bb2", "cc3"]):
+        cache.put(key, "0123456789")
+        os.utime(cache._path(key), (i, i))
+    # 读取会更新最近使用时间
+    assert cache.get("aa1") == "0123456789"
+
+    assert cache.evict() == 2
+    assert cache.get("aa1") == "0123456789"
+    assert cache.get("bb2") is None and cache.get("cc3") is None
+
+
+def test_interrupted_run_resumes_from_remaining_files(tmp_path):
+    for name in ("a", "b", "c"):
+        (tmp_path / f"{name}.py").write_text(f"{name} = 1\n", encoding="utf-8")
+    described = []
+    memory = _project_memory(tmp_path, described)
+    memory.MAX_FILES_PER_BATCH = 1
+    generate = memory._generate_batch_file_descriptions
+
+    def interrupted(batch):
+        if described:
+            raise KeyboardInterrupt()
+        return generate(batch)
+
+    memory._generate_batch_file_descriptions = interrupted
+    with pytest.raises(KeyboardInterrupt):
+        memory.update_file_details()
+
+    # 已完成批次的描述和进度都已保存
+    first = described[0]
+    assert FileMemory.get_file_descriptions(str(tmp_path)) == {first: f"描述 {first}"}
+    progress = memory._read_progress()
+    assert progress == {"total": 3, "completed": 1}
+
+    described.clear()
+    memory._generate_batch_file_descriptions = generate
+    memory.update_file_details()
+
+    assert sorted(described) == sorted({"a.py", "b.py", "c.py"} - {first})
+    assert memory._read_progress() is None
+
+
+def test_dependents_referencing_renamed_symbols_are_refreshed(tmp_path):
+    (tmp_path / "a.py").write_text("class Foo:\n    pass\n", encoding="utf-8")
+    (tmp_path / "b.py").write_text("from a import Foo\n", encoding="utf-8")
+    described = []
+    memory = _project_memory(tmp_path, described)
+
+    def generate(batch):
+        described.extend(file_info["filepath"] for file_info in batch)
+        return {file_info["filepath"]: f"使用 {file_info['content'].split()[-1]}" for file_info in batch}
+
+    memory._generate_batch_file_descriptions = generate
+    memory.update_file_details()
+    assert memory._read_file_details()["b.py"] == "使用 Foo"
+
+    # 公开符号没有变化时只描述修改的文件
+    described.clear()
+    (tmp_path / "a.py").write_text("class Foo:\n    x = 1\n", encoding="utf-8")
+    memory.update_file_details()
+    assert described == ["a.py"]
+
+    # 重命名后，描述中引用旧名称的依赖文件同样刷新
+    described.clear()
+    (tmp_path / "a.py").write_text("class Bar:\n    x = 1\n", encoding="utf-8")
+    memory.update_file_details()
+    assert sorted(described) == ["a.py", "b.py"]
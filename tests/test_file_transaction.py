@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from core.file_transaction import FileTransaction
+
+
+def _read(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def test_commit_replaces_files_together(tmp_path):
+    target = tmp_path / "a.py"
+    target.write_text("old\n", encoding="utf-8")
+    transaction = FileTransaction(str(tmp_path))
+
+    transaction.write(str(target), "new\n")
+    transaction.write(str(tmp_path / "pkg" / "b.py"), "created\n")
+
+    # 提交前工作区不变，事务内读取到暂存的内容
+    assert _read(target) == "old\n"
+    assert not (tmp_path / "pkg" / "b.py").exists()
+    assert transaction.read(str(target)) == "new\n"
+    assert transaction.exists(str(tmp_path / "pkg" / "b.py"))
+    assert transaction.original(str(target)) == "old\n"
+    assert transaction.original(str(tmp_path / "pkg" / "b.py")) is None
+
+    transaction.commit()
+
+    assert _read(target) == "new\n"
+    assert _read(tmp_path / "pkg" / "b.py") == "created\n"
+    assert not os.path.exists(tmp_path / FileTransaction.STAGING_DIR)
+
+
+def test_rollback_leaves_tree_untouched(tmp_path):
+    target = tmp_path / "a.py"
+    target.write_text("old\n", encoding="utf-8")
+    transaction = FileTransaction(str(tmp_path))
+
+    transaction.write(str(target), "first\n")
+    transaction.write(str(target), "second\n")
+    # 多次写入同一文件时保留事务开始前的内容
+    assert transaction.original(str(target)) == "old\n"
+
+    transaction.rollback()
+
+    assert _read(target) == "old\n"
+    assert not os.path.exists(tmp_path / FileTransaction.STAGING_DIR)
+
+
+def test_failed_commit_restores_replaced_files(tmp_path, monkeypatch):
+    (tmp_path / "a.py").write_text("old a\n", encoding="utf-8")
+    (tmp_path / "c.py").write_text("old c\n", encoding="utf-8")
+    transaction = FileTransaction(str(tmp_path))
+    transaction.write(str(tmp_path / "a.py"), "new a\n")
+    transaction.write(str(tmp_path / "b.py"), "new b\n")
+    transaction.write(str(tmp_path / "c.py"), "new c\n")
+
+    replace = os.replace
+
+    def failing_replace(src, dst):
+        if str(dst).endswith("c.py") and str(src).endswith(".tmp"):
+            raise OSError("disk full")
+        return replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        transaction.commit()
+
+    # 已替换的文件恢复原内容，新建的文件被删除
+    assert _read(tmp_path / "a.py") == "old a\n"
+    assert not (tmp_path / "b.py").exists()
+    assert _read(tmp_path / "c.py") == "old c\n"
+    assert not os.path.exists(tmp_path / FileTransaction.STAGING_DIR)
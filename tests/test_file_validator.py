@@ -0,0 +1,25 @@
+from core.file_validator import FileValidator
+
+
+def test_builtin_validators():
+    validator = FileValidator()
+
+    assert validator.validate("a.py", "def f():\n    return 1\n") is None
+    assert "第 1 行" in validator.validate("a.py", "def f(:\n")
+    assert validator.validate("a.json", '{"a": 1}') is None
+    assert validator.validate("a.json", '{"a": 1') is not None
+    assert validator.validate("a.yml", "a: 1\n---\nb: 2\n") is None
+    assert validator.validate("a.yaml", "a: [1\n") is not None
+    assert validator.validate("a.toml", "[tool]\na = 1\n") is None
+    assert validator.validate("a.toml", "[tool\n") is not None
+    # 没有适用校验函数的文件视为有效
+    assert validator.validate("a.txt", "{") is None
+
+
+def test_register_custom_validator():
+    validator = FileValidator()
+    validator.register([".SQL"], lambda content: None if content.rstrip().endswith(";") else "缺少分号")
+
+    assert validator.supports("query.sql")
+    assert validator.validate("query.sql", "select 1") == "缺少分号"
+    assert validator.validate("query.sql", "select 1;") is None
@@ -0,0 +1,179 @@
+from core.hunk_applier import HunkApplier, parse_hunks
+
+ORIGINAL = """def add(a, b):
+    return a + b
+
+
+def sub(a, b):
+    return a - b
+"""
+
+
+def test_apply_hunk_at_header_position():
+    diff = """diff
+--- calc.py
++++ calc.py
+@@ -4,3 +4,4 @@
+
+ def sub(a, b):
+-    return a - b
++    # 减法
++    return a - b
+"""
+    result = HunkApplier().apply(ORIGINAL, parse_hunks(diff))
+
+    assert not result.failed
+    assert result.content == """def add(a, b):
+    return a + b
+
+
+def sub(a, b):
+    # 减法
+    return a - b
+"""
+
+
+def test_apply_hunk_with_wrong_line_numbers():
+    """@@ 行号错误时，按内容在全文中定位"""
+    diff = """@@ -40,2 +40,2 @@
+ def add(a, b):
+-    return a + b
++    return b + a
+"""
+    result = HunkApplier().apply(ORIGINAL, parse_hunks(diff))
+
+    assert not result.failed
+    assert "return b + a" in result.content
+    assert "return a - b" in result.content
+
+
+def test_unplaceable_hunk_is_reported():
+    diff = """@@ -1,2 +1,2 @@
+ def mul(a, b):
+-    return a * b
++    return b * a
+"""
+    hunks = parse_hunks(diff)
+    result = HunkApplier().apply(ORIGINAL, hunks)
+
+    assert result.failed == hunks
+    assert result.content == ORIGINAL
+
+
+def test_new_file_content_from_pure_additions():
+    diff = """--- /dev/null
++++ new_file.txt
+@@ -0,0 +1,3 @@
++First example line
++
++Last example line
+"""
+    content = HunkApplier.new_file_content(parse_hunks(diff))
+
+    assert content == "First example line\n\nLast example line\n"
+
+
+def test_whitespace_drift_keeps_original_context():
+    """上下文的空白与文件不一致时，忽略空白定位，并保留文件中的原始上下文行"""
+    diff = """@@ -1,2 +1,2 @@
+ def add(a,   b):
+-  return a + b
++    return b + a
+"""
+    result = HunkApplier().apply(ORIGINAL, parse_hunks(diff))
+
+    assert not result.failed
+    assert result.content.startswith("def add(a, b):\n    return b + a\n")
+
+
+def test_fuzz_ignores_drifted_context():
+    """首尾上下文与文件不一致时，在 fuzz 范围内忽略这些上下文"""
+    diff = """@@ -4,4 +4,4 @@
+ # 已经不存在的注释
+ def sub(a, b):
+-    return a - b
++    return -(b - a)
+ # 另一行不存在的上下文
+"""
+    hunks = parse_hunks(diff)
+
+    assert HunkApplier(fuzz=0).apply(ORIGINAL, hunks).failed == hunks
+
+    result = HunkApplier(fuzz=1).apply(ORIGINAL, hunks)
+    assert not result.failed
+    assert "    return -(b - a)\n" in result.content
+
+
+def test_ambiguous_hunk_uses_nearest_to_header():
+    original = "x = 1\ny = 2\n" * 3
+    diff = """@@ -5,2 +5,2 @@
+ x = 1
+-y = 2
++y = 3
+"""
+    result = HunkApplier().apply(original, parse_hunks(diff))
+
+    assert result.content == "x = 1\ny = 2\n" + "x = 1\ny = 2\n" + "x = 1\ny = 3\n"
+
+
+def test_multiple_hunks_on_large_file():
+    original = "".join(f"line {i}\n" for i in range(20000))
+    diff = """@@ -100,3 +100,3 @@
+ line 99
+-line 100
++line one hundred
+ line 101
+@@ -15000,2 +15000,3 @@
+ line 14999
++inserted
+ line 15000
+"""
+    result = HunkApplier().apply(original, parse_hunks(diff))
+
+    assert not result.failed
+    lines = result.content.splitlines()
+    assert lines[100] == "line one hundred"
+    assert lines[15000] == "inserted"
+    assert len(lines) == 20001
+
+
+def test_estimate_region_and_splice():
+    """无法精确定位的 hunk 通过锚点行估计范围，模型返回的片段拼接回原文件"""
+    original = "".join(f"value_{i} = {i}\n" for i in range(3000))
+    diff = """@@ -1500,3 +1500,3 @@
+ value_1499 = 1499
+-value_1500 = 999
++value_1500 = 0
+ value_1501 = 1501
+"""
+    hunks = parse_hunks(diff)
+    applier = HunkApplier()
+
+    assert applier.apply(original, hunks).failed == hunks
+    assert applier.estimate_regions(original, hunks) == [(1499, 1502)]
+
+    region = HunkApplier.region_text(original, 1499, 1502)
+    assert region == "value_1499 = 1499\nvalue_1500 = 1500\nvalue_1501 = 1501"
+
+    content = HunkApplier.splice(original, [(1499, 1502, region.replace("= 1500", "= 0") + "\n")])
+    lines = content.splitlines()
+    assert lines[1500] == "value_1500 = 0"
+    assert len(lines) == 3000
+    assert content.endswith("value_2999 = 2999\n")
+
+
+def test_text_without_hunk_header_is_not_a_hunk():
+    assert parse_hunks("def main():\n    return 1\n") == []
+    assert parse_hunks("diff\n--- a.py\n+++ a.py\n-x = 1\n+x = 2\n") == []
+
+
+def test_context_less_addition_needs_explicit_insert_position():
+    content = "a\nb\nc\n"
+    insert_after_b = parse_hunks("@@ -2,0 +3,1 @@\n+x\n")
+    guessed = parse_hunks("@@ -2,1 +2,2 @@\n+x\n")
+
+    assert HunkApplier().apply(content, insert_after_b).content == "a\nb\nx\nc\n"
+    # 行数表示要替换原文件中的行，但没有给出这些行时无法可靠定位，交给模型处理
+    result = HunkApplier().apply(content, guessed)
+    assert result.failed == guessed and result.content == content
+    assert HunkApplier().apply("", guessed).content == "x\n"
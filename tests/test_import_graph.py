@@ -0,0 +1,49 @@
+from core.import_graph import (
+    ImportGraph,
+    analyze_python,
+    find_stale_dependents,
+    mentions_any,
+)
+
+
+def test_analyze_public_symbols_and_resolve_imports():
+    content = (
+        "import os\n"
+        "from core.ai import AIConfig\n"
+        "from . import sibling\n"
+        "from ..util import helper\n"
+        "VERSION = '1'\n"
+        "_cache = {}\n"
+        "class Loader:\n    pass\n"
+        "def _private():\n    pass\n"
+    )
+
+    info = analyze_python("pkg/sub/mod.py", content)
+
+    assert info.public_symbols == {"VERSION", "Loader"}
+    assert {"os", "core.ai", "core.ai.AIConfig", "pkg.sub", "pkg.sub.sibling", "pkg.util", "pkg.util.helper"} <= info.imports
+    assert analyze_python("bad.py", "def (:\n") is None
+
+
+def test_stale_dependents_reference_removed_symbols():
+    modules = {
+        "core/ai.py": analyze_python("core/ai.py", "class AIConfig:\n    pass\n"),
+        "core/a.py": analyze_python("core/a.py", "from core.ai import AIConfig\n"),
+        "core/b.py": analyze_python("core/b.py", "from .ai import AIConfig\n"),
+        "core/c.py": analyze_python("core/c.py", "from core import ai\n"),
+        "other.py": analyze_python("other.py", "x = 1\n"),
+    }
+    graph = ImportGraph(modules)
+    descriptions = {
+        "core/a.py": "使用AIConfig创建助手",
+        "core/b.py": "使用 AIConfigLoader",
+        "core/c.py": "读取 AIConfig",
+        "other.py": "提到 AIConfig 但没有导入",
+    }
+
+    assert graph.get_dependents("core/ai.py") == {"core/a.py", "core/b.py", "core/c.py"}
+    # 中文与标识符相邻时也能识别，更长的标识符不会误判
+    assert mentions_any("使用AIConfig创建", ["AIConfig"])
+    assert not mentions_any("AIConfigLoader", ["AIConfig"])
+    stale = find_stale_dependents(graph, {"core/ai.py": {"AIConfig"}}, descriptions, max_per_file=1)
+    assert stale == ["core/a.py"]
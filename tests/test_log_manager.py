@@ -0,0 +1,36 @@
+import json
+import os
+
+from core.blob_store import BlobStore
+from core.diff import DiffInfo
+from core.log_manager import LogConfig, LogManager
+
+
+def test_archive_stores_original_content_once(tmp_path):
+    log_manager = LogManager(LogConfig(str(tmp_path), 1))
+    original = "x = 1\n" * 1000
+
+    for _ in range(2):
+        round_dir = log_manager.archive_logs("sys", "prompt", "response", [
+            DiffInfo(file_name="a.py", content="diff", file_content=original, is_modify=True)
+        ])
+        log_manager.current_round += 1
+
+    # 修改日志中只记录引用，相同内容在 BlobStore 中只保存一份
+    with open(os.path.join(round_dir, log_manager.MODIFIED_FILES_FILE), "r", encoding="utf-8") as f:
+        diff_dicts = json.load(f)
+    assert diff_dicts[0]["file_content"] == ""
+    assert diff_dicts[0]["file_content_ref"] == BlobStore.hash_content(original)
+    blobs = [name for _, _, names in os.walk(tmp_path / BlobStore.BLOB_DIR) for name in names]
+    assert len(blobs) == 1
+
+    entries = log_manager.get_issue_log_entries(include_diff=True)
+    assert [log_manager.resolve_file_content(entry.modified_files[0]) for entry in entries] == [original, original]
+
+
+def test_resolve_inline_content_from_old_logs(tmp_path):
+    log_manager = LogManager(LogConfig(str(tmp_path), 1))
+
+    diff_info = DiffInfo(file_name="a.py", file_content="old\n", is_modify=True)
+
+    assert log_manager.resolve_file_content(diff_info) == "old\n"
@@ -0,0 +1,90 @@
+import time
+
+import httpx
+import openai
+import pytest
+
+from core.rate_limiter import RateLimiter, RetryPolicy, TokenBucket
+
+
+def _status_error(status_code, headers=None):
+    request = httpx.Request("POST", "https://api.example.com/v1/chat/completions")
+    response = httpx.Response(status_code, headers=headers or {}, request=request)
+    error_class = openai.RateLimitError if status_code == 429 else openai.InternalServerError
+    return error_class("error", response=response, body=None)
+
+
+def test_retry_after_header_is_honored():
+    policy = RetryPolicy(base_delay=1.0, max_delay=60.0)
+
+    assert policy.delay(0, _status_error(429, {"retry-after": "2"})) == 2.0
+    assert policy.delay(0, _status_error(429, {"retry-after-ms": "250"})) == 0.25
+    assert 0 <= policy.delay(3, _status_error(500)) <= 8.0
+    assert policy.is_retryable(_status_error(503))
+    assert not policy.is_retryable(ValueError("bad"))
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(requests_per_second=20, capacity=1)
+
+    start = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+
+    assert time.monotonic() - start >= 0.15
+    assert not bucket.acquire(blocking=False)
+
+
+def test_rate_limited_call_pauses_shared_bucket_and_retries():
+    limiter = RateLimiter(TokenBucket(), RetryPolicy(base_delay=0.01))
+    errors = [_status_error(429, {"retry-after": "0.1"})]
+
+    def request():
+        if errors:
+            raise errors.pop()
+        return "ok"
+
+    start = time.monotonic()
+    assert limiter.call(request, max_retries=2) == "ok"
+    assert time.monotonic() - start >= 0.1
+
+
+def test_no_retry_when_retry_if_rejects():
+    limiter = RateLimiter(TokenBucket(), RetryPolicy(base_delay=0.01))
+    calls = []
+
+    def request():
+        calls.append(1)
+        raise _status_error(500)
+
+    with pytest.raises(openai.InternalServerError):
+        limiter.call(request, max_retries=3, retry_if=lambda e: False)
+    assert len(calls) == 1
+
+    with pytest.raises(openai.InternalServerError):
+        limiter.call(request, max_retries=2)
+    assert len(calls) == 4
+
+
+def test_retry_after_429_does_not_consume_tokens():
+    bucket = TokenBucket(requests_per_second=0.01, capacity=1)
+    limiter = RateLimiter(bucket, RetryPolicy(base_delay=0.01))
+    errors = [_status_error(429, {"retry-after": "0.05"})]
+
+    def request():
+        if errors:
+            raise errors.pop()
+        return "ok"
+
+    assert limiter.call(request, max_retries=2) == "ok"
+    # 令牌只由发出请求的一方（ChatOpenAI）获取
+    assert bucket.acquire(blocking=False)
+
+
+def test_lowering_rate_does_not_refill_drained_bucket():
+    bucket = TokenBucket(requests_per_second=0.01, capacity=1)
+    assert bucket.acquire(blocking=False)
+
+    bucket.set_rate(0.005)
+
+    assert not bucket.acquire(blocking=False)
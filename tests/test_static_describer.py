@@ -0,0 +1,79 @@
+import multiprocessing
+
+from core.static_describer import (
+    StaticDescriber,
+    default_describer,
+    describe_files,
+    describe_python,
+)
+
+
+def test_describe_python_uses_docstring_definitions_and_imports():
+    content = '''"""
+配置加载模块
+
+第二段不会出现在描述中。
+"""
+import json
+from typing import Dict
+from .local import helper
+
+
+class Config:
+    pass
+
+
+class _Private:
+    pass
+
+
+def load(path):
+    pass
+'''
+
+    assert describe_python(content) == "配置加载模块；定义类 Config；定义函数 load；依赖 json、typing"
+
+
+def test_describe_python_falls_back_to_definition_docstring():
+    content = 'class Loader:\n    """读取配置文件"""\n'
+
+    assert describe_python(content) == "Loader: 读取配置文件；定义类 Loader"
+    # 没有任何文档字符串或无法解析时交给模型
+    assert describe_python("def f():\n    pass\n") is None
+    assert describe_python("def f(:\n") is None
+
+
+def test_register_and_describe_files():
+    describer = StaticDescriber()
+    describer.register([".md"], lambda content: content.splitlines()[0].lstrip("# "))
+
+    assert describer.describe("README.md", "# 项目说明\n") == "项目说明"
+    assert describer.describe("main.go", "package main\n") is None
+
+    files = [{"filepath": f"m{i}.py", "content": f'"""模块 {i}"""\n'} for i in range(40)]
+    files.append({"filepath": "plain.py", "content": "x = 1\n"})
+    descriptions = describe_files(files, max_workers=2)
+
+    assert len(descriptions) == 40
+    assert descriptions["m39.py"] == "模块 39"
+
+
+def _describe_markdown(content):
+    return content.splitlines()[0].lstrip("# ")
+
+
+def test_runtime_registered_describer_reaches_spawned_workers(monkeypatch):
+    monkeypatch.setattr(default_describer, "describers", dict(default_describer.describers))
+    default_describer.register([".md"], _describe_markdown)
+    files = [{"filepath": f"d{i}.md", "content": f"# 文档 {i}\n"} for i in range(40)]
+
+    # 文件数少时在当前进程中处理，文件数多时在 spawn 启动的进程池中处理，结果一致
+    in_process = describe_files(files[:3])
+    pooled = describe_files(files, max_workers=2, mp_context=multiprocessing.get_context("spawn"))
+
+    assert in_process == {f"d{i}.md": f"文档 {i}" for i in range(3)}
+    assert pooled == {f"d{i}.md": f"文档 {i}" for i in range(40)}
+
+    # 无法序列化的描述函数在当前进程中处理
+    default_describer.register([".md"], lambda content: "lambda")
+    assert set(describe_files(files).values()) == {"lambda"}